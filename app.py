@@ -1,9 +1,58 @@
+import cProfile
+import functools
+import json
+import marshal
+import os
+import pstats
+import time
+import uuid
+from contextlib import contextmanager
+
 import pandas as pd
 import streamlit as st
-from io import BytesIO
+from io import StringIO
 import openpyxl
 from streamlit_modal import Modal
 
+from rename import timing
+from rename.config import settings
+from rename.engine import (
+    clone_configs,
+    filter_by_parent_model,
+    parse_parent_models,
+    read_parent_models_file,
+    rename_suppliers,
+)
+from rename.export import FORMATS, available_formats, export_cache
+from rename.loader import (
+    MODEL_CONFIGS_FILE,
+    MODEL_SUPPLIERS_FILE,
+    SUPPLIER_FILE,
+    count_rows,
+    find_parent_models,
+    load_config_index,
+    load_config_scope,
+    load_supplier_scope,
+    load_tables,
+    read_table,
+    sample_suppliers,
+    scoped,
+    search_configs,
+    snapshot,
+    table_memory,
+    upload_registry,
+    workbook_cache,
+)
+from rename.jobs import job_queue
+from rename.journal import TABLES, journal_for
+from rename.pipeline import STAGES, ExecutionPlan, run_execution, writes_local
+from rename.rollback import STATUS_LABELS, RollbackError, commit_rollback, load_rollback_tables, plan_rollback
+from rename.rules import DEFAULT_CONFIG, DEFAULT_RULES, RuleError, RuleSet, load_rules, rules_path, save_rules
+from rename.schema import SchemaError
+from rename.selection import CloneSelection
+from rename.storage import ConflictError, StorageError, storage_stats
+from rename.validation import ISSUE_KINDS, POLICIES, POLICY_LABELS, ValidationError, validate
+
 # 配置页面样式
 st.set_page_config(
     page_title="模型重命名工具",
@@ -202,38 +251,879 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+UPLOAD_KEYS = {
+    'model_suppliers': 'uploaded_model_suppliers',
+    'model_configs': 'uploaded_model_configs',
+    'supplier': 'uploaded_supplier',
+}
+"""表名 → 会话中保存上传文件句柄的键"""
+
+def current_sources():
+    """当前使用的 (model_suppliers, model_configs, supplier) 数据源，优先使用上传的文件"""
+    model_suppliers_source = st.session_state.get('uploaded_model_suppliers') or MODEL_SUPPLIERS_FILE
+    model_configs_source = st.session_state.get('uploaded_model_configs') or MODEL_CONFIGS_FILE
+    supplier_source = st.session_state.get('uploaded_supplier') or SUPPLIER_FILE
+    return model_suppliers_source, model_configs_source, supplier_source
+
 def load_data():
-    """加载所有Excel文件"""
+    """记录文件版本并加载所有Excel文件（解析结果按文件指纹缓存，跨rerun复用），成功时返回True
+    
+    sqlite主存储下的本地文件不整表读取，用到的行在各处按索引查询（见 loader.load_scope）。
+    """
     try:
-        # 读取supplier表
-        supplier_df = pd.read_excel('supplier.xlsx')
+        sources = current_sources()
         
-        # 检查是否有上传的文件，优先使用上传的文件
-        if 'uploaded_model_suppliers' in st.session_state and st.session_state.uploaded_model_suppliers is not None:
-            model_suppliers_df = pd.read_excel(st.session_state.uploaded_model_suppliers)
+        # 记录本次读取的文件版本，执行时据此检查并发修改
+        st.session_state.loaded_versions = snapshot(sources[0], sources[1])
+        
+        # 需要解析xlsx的表并发解析，全部就绪后返回
+        if not any(scoped(source) for source in sources):
+            load_tables(*sources)
+        return True
+    except Exception as e:
+        st.error(f"读取文件时出错: {e}")
+        return False
+
+def page_range(total, key, page_size=None):
+    """返回当前页的 (起始, 结束) 位置，超过一页时显示翻页控件"""
+    page_size = page_size or settings.page_size
+    if total <= page_size:
+        return 0, total
+    
+    pages = (total + page_size - 1) // page_size
+    # 数据变少后上次的页码可能越界
+    if st.session_state.get(key, 1) > pages:
+        st.session_state[key] = pages
+    page = st.number_input(
+        f"页码（共 {pages} 页，{total} 条）",
+        min_value=1,
+        max_value=pages,
+        value=1,
+        step=1,
+        key=key
+    )
+    start = (page - 1) * page_size
+    return start, min(start + page_size, total)
+
+def paginate(frame, key, page_size=None):
+    """只返回当前页的数据，超过一页时显示翻页控件"""
+    start, stop = page_range(len(frame), key, page_size)
+    return frame.iloc[start:stop]
+
+def record_run(record):
+    """把一次运行的计时记入会话历史和累计统计，并按需写入JSONL"""
+    history = st.session_state.setdefault('perf_history', [])
+    history.append(record)
+    del history[:-settings.perf_history]
+    totals = st.session_state.setdefault('perf_totals', {})
+    for name, seconds in [('总计', record['total'])] + list(record['sections'].items()):
+        count, total = totals.get(name, (0, 0.0))
+        totals[name] = (count + 1, total + seconds)
+    if settings.perf_log:
+        session = st.session_state.setdefault('perf_session', uuid.uuid4().hex[:8])
+        timing.write_jsonl(dict(record, session=session), settings.perf_log)
+
+@contextmanager
+def timed_run(label):
+    """整页运行中作为一个环节计时；片段单独重新运行时作为一次独立的运行计时"""
+    if timing.active():
+        with timing.section(label):
+            yield
+        return
+    timing.begin(label)
+    try:
+        yield
+    finally:
+        record_run(timing.end())
+
+def timed(label):
+    """给片段函数计时的装饰器，放在 @st.fragment 下面"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed_run(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def profiled_run():
+    """侧边栏要求时对本次整页运行做cProfile分析，结果保存在session_state供下载"""
+    if not st.session_state.get('profile_next_run'):
+        yield
+        return
+    st.session_state.profile_next_run = False
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        summary = StringIO()
+        stats = pstats.Stats(profiler, stream=summary)
+        stats.sort_stats('cumulative').print_stats(25)
+        # 与 Stats.dump_stats 写出的文件格式相同
+        st.session_state.profile_result = {
+            'data': marshal.dumps(stats.stats),
+            'summary': summary.getvalue(),
+        }
+
+def render_perf_panel():
+    """侧边栏性能面板：最近几次运行各环节耗时、会话累计和单次cProfile"""
+    with st.expander("⏱️ 性能", expanded=False):
+        history = st.session_state.get('perf_history', [])
+        if history:
+            rows = [
+                dict({'运行': record['label'], '开始': record['started'][11:], '总计': record['total'] * 1000},
+                     **{name: seconds * 1000 for name, seconds in record['sections'].items()})
+                for record in reversed(history)
+            ]
+            st.caption(f"最近 {len(history)} 次运行（ms，不含本次）")
+            st.dataframe(pd.DataFrame(rows).round(1), width='stretch', hide_index=True)
+            totals = st.session_state.get('perf_totals', {})
+            st.caption("本会话累计")
+            st.dataframe(
+                pd.DataFrame(
+                    [(name, count, total * 1000 / count, total * 1000) for name, (count, total) in totals.items()],
+                    columns=['环节', '次数', '平均(ms)', '累计(ms)']
+                ).round(1),
+                width='stretch',
+                hide_index=True
+            )
         else:
-            model_suppliers_df = pd.read_excel('model_suppliers.xlsx')
+            st.caption("暂无记录")
+        
+        if table_memory:
+            st.caption("表内存（加载时按表结构压缩，所有会话共用）")
+            st.dataframe(
+                pd.DataFrame(
+                    [(name, before / 1e6, after / 1e6, (1 - after / before) * 100 if before else 0.0)
+                     for name, (before, after) in table_memory.items()],
+                    columns=['表', '压缩前(MB)', '压缩后(MB)', '节省(%)']
+                ).round(2),
+                width='stretch',
+                hide_index=True
+            )
+        
+        if st.button("分析下一次运行 (cProfile)", width='stretch'):
+            st.session_state.profile_next_run = True
+            st.rerun()
+        profile_result = st.session_state.get('profile_result')
+        if profile_result:
+            st.download_button(
+                "📥 下载 profile 数据",
+                data=profile_result['data'],
+                file_name="rename.prof",
+                mime="application/octet-stream",
+                width='stretch',
+                help="用 python -m pstats rename.prof 或 snakeviz 查看"
+            )
+            with st.expander("耗时最多的函数"):
+                st.code(profile_result['summary'])
+
+def load_current_rules():
+    """读取数据目录下的命名规则，配置有误时提示并改用默认规则"""
+    try:
+        return load_rules(rules_path(workbook_key()))
+    except (OSError, RuleError) as e:
+        st.error(f"❌ 命名规则配置有误，已改用默认规则: {e}")
+        return DEFAULT_RULES
+
+RULES_PREVIEW_LIMIT = 200
+"""命名规则预览最多展示的行数"""
+
+def rules_preview(rules, model_suppliers_df, supplier_index, parent_models, limit=RULES_PREVIEW_LIMIT):
+    """按规则对当前选中（未选择时为传入的全部）的model_suppliers行生成新名称
+
+    返回 (前limit行的预览（附每行生效的规则）, 总行数, 名称会改变的行数)。
+    """
+    rows = filter_by_parent_model(model_suppliers_df, parent_models) if parent_models else model_suppliers_df
+    supplier_names = supplier_index.map(rows['supplier_id'])
+    new_models = rules.apply(rows['supplier_id'], supplier_names, rows['parent_model'], rows['model'])
+    changed = int((new_models != rows['model'].astype('str')).sum())
+    head = rows.head(limit)
+    preview = pd.DataFrame({
+        'supplier_name': supplier_names.head(limit),
+        'parent_model': head['parent_model'],
+        '当前model': head['model'],
+        '新model': new_models.head(limit),
+        '规则': rules.explain(head['supplier_id'], supplier_names.head(limit), head['parent_model'], head['model']),
+    })
+    return preview, len(rows), changed
+
+@st.fragment
+@timed('rules')
+def render_rules_panel(model_suppliers_df, supplier_index, parent_models):
+    """侧边栏命名规则面板：编辑规则配置并预览生成的名称，保存后整页重新运行"""
+    with st.expander("🧩 命名规则", expanded=False):
+        path = rules_path(workbook_key())
+        exists = os.path.exists(path)
+        st.caption(f"配置文件: {os.path.basename(path)}（{'已加载' if exists else '不存在，使用默认规则'}）")
+        if 'rules_text' not in st.session_state:
+            if exists:
+                with open(path, encoding='utf-8') as f:
+                    st.session_state.rules_text = f.read()
+            else:
+                st.session_state.rules_text = json.dumps(DEFAULT_CONFIG, ensure_ascii=False, indent=2)
+        text = st.text_area("规则配置 (JSON):", key="rules_text", height=240,
+                            help="template 可用字段: {supplier_name} {parent_model} {supplier_id} {model}；"
+                                 "变换: lower/upper/strip/slug；suppliers 按供应商覆盖，exceptions 按正则匹配parent_model")
+        try:
+            draft = RuleSet.from_json(text)
+        except RuleError as e:
+            st.error(f"❌ {e}")
+            return
+        
+        # 预览按需计算，只展示前 RULES_PREVIEW_LIMIT 行
+        if st.toggle("👁️ 预览生成的名称", key="rules_preview_on"):
+            model_suppliers_source, _, supplier_source = current_sources()
+            scope = '（已选 Parent Model）' if parent_models else '（全部记录）'
+            if not parent_models and scoped(model_suppliers_source):
+                # sqlite主存储下不整表读取，未选择时只按前 RULES_PREVIEW_LIMIT 行预览
+                model_suppliers_df, supplier_index = sample_suppliers(model_suppliers_source, supplier_source,
+                                                                      RULES_PREVIEW_LIMIT)
+                scope = f'（共 {count_rows(model_suppliers_source)} 条记录中的前 {len(model_suppliers_df)} 条）'
+            preview, total, changed = rules_preview(draft, model_suppliers_df, supplier_index, parent_models)
+            shown = f"，显示前 {len(preview)} 条" if len(preview) < total else ''
+            st.caption(f"预览 {total} 条{scope}，{changed} 条名称会改变{shown}")
+            st.dataframe(preview, width='stretch', hide_index=True, height=240)
+        
+        if st.button("💾 保存规则", width='stretch'):
+            try:
+                save_rules(path, text)
+            except (OSError, RuleError) as e:
+                st.error(f"❌ 保存失败: {e}")
+            else:
+                st.rerun(scope='app')
+
+def release_upload(state_key):
+    """释放会话持有的上传文件，没有会话再引用时共享的解析结果随之释放"""
+    handle = st.session_state.get(state_key)
+    if handle is not None:
+        handle.release()
+    st.session_state[state_key] = None
+
+def register_upload(uploaded_file, state_key, table=None):
+    """解析并校验上传的文件，通过时保存到会话并返回True；不通过时显示原因
+
+    table为None时按组合工作簿登记其中的各张表（替换这些表之前上传的文件）。
+    被拒绝的文件按 file_id 记住原因，rerun时不再重复解析。
+    """
+    rejected = st.session_state.setdefault('rejected_uploads', {})
+    reason = rejected.get(state_key)
+    if reason is not None and reason[0] == uploaded_file.file_id:
+        st.error(reason[1])
+        return False
+    try:
+        if table is None:
+            handles = upload_registry.register_workbook(uploaded_file)
+        else:
+            handles = {table: upload_registry.register(uploaded_file, table)}
+    except SchemaError as e:
+        message = f"❌ {e}"
+    except Exception as e:
+        message = f"❌ 读取文件时出错: {e}"
+    else:
+        for name, handle in handles.items():
+            release_upload(UPLOAD_KEYS[name])
+            st.session_state[UPLOAD_KEYS[name]] = handle
+        rejected.pop(state_key, None)
+        return True
+    rejected[state_key] = (uploaded_file.file_id, message)
+    st.error(message)
+    return False
+
+@st.fragment
+@timed('upload')
+def render_upload_panel():
+    """侧边栏文件上传面板，独立于页面其余部分重新运行"""
+    # 文件上传
+    st.markdown('<h3 style="color: #1a1a1a; margin-bottom: 1rem;">📁 文件上传</h3>', unsafe_allow_html=True)
+    st.markdown('<p style="color: #666; font-size: 0.9rem; margin-bottom: 1rem;">可选择上传自定义的Excel文件：</p>', unsafe_allow_html=True)
+    
+    # 组合工作簿（如导出的 modified_models.xlsx）一次替换其中包含的各张表，各工作表并发解析
+    if st.session_state.get('uploaded_workbook') is None:
+        uploaded_workbook = st.file_uploader(
+            "上传组合工作簿:",
+            type=['xlsx'],
+            key="workbook_upload",
+            help="上传包含 model_suppliers、model_configs、supplier 工作表的xlsx（如导出的 modified_models.xlsx），一次替换其中包含的表"
+        )
+        
+        if uploaded_workbook is not None and register_upload(uploaded_workbook, 'uploaded_workbook'):
+            st.session_state.uploaded_workbook = uploaded_workbook.name
+            st.rerun()
+    else:
+        tables = [table for table, key in UPLOAD_KEYS.items()
+                  if getattr(st.session_state.get(key), 'sheet', None) is not None]
+        included = f"（{'、'.join(tables)}）" if tables else ''
+        st.success(f"✅ 组合工作簿 {st.session_state.uploaded_workbook} 已上传{included}")
+        if st.button("🔄 重新上传组合工作簿", key="resupload_workbook"):
+            for key in UPLOAD_KEYS.values():
+                release_upload(key)
+            st.session_state.uploaded_workbook = None
+            st.rerun()
+    
+    # Model Suppliers 文件上传（上传时解析并校验一次，之后各次rerun直接使用解析结果）
+    if st.session_state.get('uploaded_model_suppliers') is None:
+        uploaded_model_suppliers = st.file_uploader(
+            "上传 Model Suppliers 表:",
+            type=['xlsx'],
+            key="model_suppliers_upload",
+            help="上传自定义的 model_suppliers.xlsx 文件，需包含 id、parent_model、supplier_id、model 列"
+        )
+        
+        if uploaded_model_suppliers is not None and \
+                register_upload(uploaded_model_suppliers, 'uploaded_model_suppliers', 'model_suppliers'):
+            st.success("✅ Model Suppliers 文件已上传")
+            st.rerun()
+    else:
+        st.success("✅ Model Suppliers 文件已上传")
+        if st.button("🔄 重新上传 Model Suppliers", key="resupload_suppliers"):
+            release_upload('uploaded_model_suppliers')
+            st.rerun()
+    
+    # Model Configs 文件上传
+    if st.session_state.get('uploaded_model_configs') is None:
+        uploaded_model_configs = st.file_uploader(
+            "上传 Model Configs 表:",
+            type=['xlsx'],
+            key="model_configs_upload",
+            help="上传自定义的 model_configs.xlsx 文件，需包含 model 列"
+        )
+        
+        if uploaded_model_configs is not None and \
+                register_upload(uploaded_model_configs, 'uploaded_model_configs', 'model_configs'):
+            st.success("✅ Model Configs 文件已上传")
+            st.rerun()
+    else:
+        st.success("✅ Model Configs 文件已上传")
+        if st.button("🔄 重新上传 Model Configs", key="resupload_configs"):
+            release_upload('uploaded_model_configs')
+            st.rerun()
+    
+    # 显示当前使用的文件状态
+    st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 0.5rem; margin-top: 1rem;">📋 当前文件状态</h4>', unsafe_allow_html=True)
+    
+    uploaded = [st.session_state.get(key) for key in UPLOAD_KEYS.values()]
+    model_suppliers_status = "📤 自定义文件" if uploaded[0] is not None else "📄 默认文件"
+    model_configs_status = "📤 自定义文件" if uploaded[1] is not None else "📄 默认文件"
+    supplier_status = "📤 自定义文件" if uploaded[2] is not None else "📄 默认文件"
+    
+    st.write(f"**Model Suppliers**: {model_suppliers_status}")
+    st.write(f"**Model Configs**: {model_configs_status}")
+    st.write(f"**Supplier**: {supplier_status}")
+    if settings.sqlite_primary:
+        storage_label = '🗄️ SQLite主存储（xlsx仅导出时生成）'
+    elif settings.columnar_primary:
+        storage_label = '🗂️ 列式主存储（xlsx仅导出时生成）'
+    else:
+        storage_label = '📄 xlsx'
+    st.write(f"**存储**: {storage_label}")
+    upload_stats = upload_registry.stats()
+    if upload_stats['entries']:
+        st.caption(f"共享上传文件 {upload_stats['entries']} 份（{upload_stats['bytes'] / 1e6:.1f} MB，"
+                   f"{upload_stats['refs']} 个引用） / 累计解析 {upload_stats['parses']} 次")
+    
+    # 清除上传文件按钮
+    if any(handle is not None for handle in uploaded):
+        if st.button("🗑️ 清除上传文件", use_container_width=True):
+            for key in UPLOAD_KEYS.values():
+                release_upload(key)
+            st.session_state.uploaded_workbook = None
+            st.rerun()
+
+@st.fragment
+@timed('preview')
+def render_rename_preview(rename_result, batch_mode):
+    """重命名预览，翻页时只重新运行本片段"""
+    # 批量模式下先显示按parent_model汇总的统计
+    if batch_mode:
+        st.dataframe(
+            rename_result.summary().rename(columns={'records': '记录数', 'suppliers': '供应商数'}),
+            width='stretch',
+            hide_index=True
+        )
+    
+    # 修改预览 - 先显示汇总，卡片分页渲染
+    st.caption(f"共 {len(rename_result.changes)} 条修改，涉及 {rename_result.changes['supplier_id'].nunique()} 个供应商")
+    for change in paginate(rename_result.changes, key="preview_page").itertuples():
+        supplier_name = change.supplier_name
+        old_model = change.old_model
+        new_model = change.new_model
+        
+        st.markdown(f"""
+        <div style="padding: 1rem; margin: 0.5rem 0; background-color: #f8f9fa; border-radius: 4px; border-left: 4px solid #333;">
+            <div style="font-weight: 600; color: #1a1a1a;">ID: {change.id}</div>
+            <div style="color: #666; margin: 0.5rem 0;">
+                <span style="text-decoration: line-through; color: #999;">{old_model}</span>
+                <br>
+                <span style="color: #2e7d32; font-weight: 500;">→ {new_model}</span>
+            </div>
+            <div style="font-size: 0.9rem; color: #666;">
+                Supplier: {supplier_name} (ID: {change.supplier_id})
+            </div>
+        </div>
+        """, unsafe_allow_html=True)
+
+@st.fragment
+@timed('configs')
+def render_configs_section(model_suppliers_df, model_configs_source, supplier_index, parent_models,
+                           rename_result, versions, rules):
+    """Model Configs 处理和执行按钮，修改选择时只重新运行本片段
+    
+    参数沿用最近一次整页运行时的数据，versions即这份数据对应的文件版本；
+    model_configs按当前选择读取（sqlite主存储下只查询选中的源配置和新名称所在的行）。
+    """
+    # Model配置处理 - 使用Tabs优化布局
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.markdown('<h3 class="step-title">⚙️ Model Configs 处理</h3>', unsafe_allow_html=True)
+    
+    new_models_by_supplier = rename_result.new_models_by_supplier()
+    
+    # 供应商可选项只计算一次，选择结果供各标签页和执行共用
+    clone_selection = CloneSelection.from_changes(rename_result.changes)
+    
+    def format_supplier(supplier_id):
+        return f"{supplier_index.name(supplier_id)} (ID: {supplier_id})"
+    
+    # 使用Tabs来组织内容
+    tab1, tab2, tab3 = st.tabs(["📋 选择配置", "🎯 配置供应商", "📊 总体预览"])
+    
+    with tab1:
+        st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 1rem;">选择要复制的配置</h4>', unsafe_allow_html=True)
+        st.markdown('<p style="color: #666; font-size: 0.9rem; margin-bottom: 1rem;">从所有可用的Model Configs中选择要复制的配置：</p>', unsafe_allow_html=True)
+        
+        # 按前缀/子串在索引中检索，已选中的配置始终保留在候选项中
+        query = st.text_input(
+            "搜索 Model Configs:",
+            key="source_models_query",
+            placeholder="输入model名称的一部分，留空显示全部"
+        )
+        selected_models = st.session_state.get('source_models', [])
+        if query.strip():
+            matches = search_configs(model_configs_source, query, settings.search_limit)
+            available_models = list(dict.fromkeys(selected_models + matches))
+            st.caption(f"匹配 {len(matches)} 个配置（最多显示 {settings.search_limit} 个）")
+        elif scoped(model_configs_source):
+            # sqlite主存储下不整表读出名称，留空时只列出按名称排序的前 search_limit 个
+            available_models = list(dict.fromkeys(
+                selected_models + search_configs(model_configs_source, '', settings.search_limit)))
+            st.caption(f"共 {count_rows(model_configs_source)} 条配置，显示前 {settings.search_limit} 个，"
+                       f"输入名称可搜索其余的")
+        else:
+            available_models = load_config_index(model_configs_source).models
+        
+        selected_models = st.multiselect(
+            "选择 Model Configs:",
+            available_models,
+            key="source_models",
+            help="选择要复制到新供应商的配置"
+        )
+        # 复制和冲突检查用到的配置：选中的源配置和与新名称同名的已有配置
+        model_configs_df, config_index = load_config_scope(
+            model_configs_source, [*selected_models, *rename_result.changes['new_model']])
+        
+        # 显示选中配置的详细信息 - 使用网格布局
+        if selected_models:
+            st.markdown('<h5 style="color: #1a1a1a; margin-bottom: 1rem;">选中的配置详情:</h5>', unsafe_allow_html=True)
             
-        if 'uploaded_model_configs' in st.session_state and st.session_state.uploaded_model_configs is not None:
-            model_configs_df = pd.read_excel(st.session_state.uploaded_model_configs)
+            # 使用columns创建网格布局
+            cols = st.columns(min(3, len(selected_models)))
+            for i, model_name in enumerate(selected_models):
+                with cols[i % 3]:
+                    # 获取这个model在model_configs中的信息
+                    config_info = config_index.first_row(model_name)
+                    if config_info is not None:
+                        
+                        st.markdown(f"""
+                        <div style="padding: 1rem; margin: 0.5rem 0; background-color: #f8f9fa; border-radius: 8px; border-left: 4px solid #333; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+                            <div style="font-weight: 600; color: #1a1a1a; margin-bottom: 0.5rem;">{model_name}</div>
+                            <div style="font-size: 0.85rem; color: #666; line-height: 1.4;">
+                                <div>📝 ID: {config_info.get('id', 'N/A')}</div>
+                                <div>🔗 Parent: {config_info.get('parent_model', 'N/A')}</div>
+                                <div>📏 Context: {config_info.get('context_length', 'N/A')}</div>
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+    
+    with tab2:
+        st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 1rem;">配置目标供应商</h4>', unsafe_allow_html=True)
+        st.markdown('<p style="color: #666; font-size: 0.9rem; margin-bottom: 1rem;">为每个选中的配置单独选择目标供应商：</p>', unsafe_allow_html=True)
+        
+        if selected_models:
+            # 使用expander来组织每个配置的选择
+            for i, model_name in enumerate(selected_models):
+                with st.expander(f"🔧 配置 '{model_name}' 的供应商", expanded=i==0):
+                    # 选项直接是supplier_id，显示文本由format_func生成
+                    selected_suppliers = st.multiselect(
+                        f"为 {model_name} 选择供应商:",
+                        clone_selection.supplier_options,
+                        format_func=format_supplier,
+                        key=f"target_suppliers_{model_name}",
+                        help=f"选择要为 {model_name} 生成新配置的供应商"
+                    )
+                    clone_selection.select(model_name, selected_suppliers)
+                    
+                    if selected_suppliers:
+                        # 使用columns显示选中的供应商和预览
+                        col_a, col_b = st.columns([1, 1])
+                        
+                        with col_a:
+                            st.markdown('<h6 style="color: #1a1a1a; margin-bottom: 0.5rem;">📋 选中的供应商:</h6>', unsafe_allow_html=True)
+                            for supplier_id in selected_suppliers:
+                                supplier_name = supplier_index.name(supplier_id)
+                                st.markdown(f"""
+                                <div style="padding: 0.75rem; margin: 0.5rem 0; background-color: #f8f9fa; border-radius: 6px; border-left: 3px solid #2e7d32;">
+                                    <div style="font-weight: 600; color: #1a1a1a;">{supplier_name}</div>
+                                    <div style="font-size: 0.85rem; color: #666;">Supplier ID: {supplier_id}</div>
+                                </div>
+                                """, unsafe_allow_html=True)
+                        
+                        with col_b:
+                            st.markdown('<h6 style="color: #1a1a1a; margin-bottom: 0.5rem;">🔮 新配置预览:</h6>', unsafe_allow_html=True)
+                            for supplier_id in selected_suppliers:
+                                for _, new_model_name in new_models_by_supplier[supplier_id]:
+                                    st.markdown(f"""
+                                    <div style="padding: 0.75rem; margin: 0.5rem 0; background-color: #e8f5e8; border-radius: 6px; border-left: 3px solid #2e7d32;">
+                                        <div style="color: #2e7d32; font-weight: 600; font-size: 0.95rem;">{new_model_name}</div>
+                                    </div>
+                                    """, unsafe_allow_html=True)
+                    else:
+                        st.info("尚未选择供应商")
         else:
-            model_configs_df = pd.read_excel('model_configs.xlsx')
+            st.info("请先在'选择配置'标签页中选择要复制的配置")
+    
+    # 计算将要新增的配置并做冲突校验，总体预览和执行复用同一结果
+    clone_result = clone_configs(model_configs_df, rename_result.changes, clone_selection.selections, config_index)
+    plan = ExecutionPlan(
+        rename=rename_result,
+        clone=clone_result,
+        model_configs_df=model_configs_df,
+        versions=versions
+    )
+    report = validate(plan, config_index)
+    
+    with tab3:
+        st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 1rem;">📊 总体预览</h4>', unsafe_allow_html=True)
         
-        return supplier_df, model_suppliers_df, model_configs_df
-    except Exception as e:
-        st.error(f"读取文件时出错: {e}")
-        return None, None, None
+        # 冲突校验结果和处理策略
+        if not report.issues.empty:
+            counts = report.counts()
+            lines = "".join(
+                f"<div>{'⚠️' if kind != 'noop' else 'ℹ️'} {table}: {ISSUE_KINDS[kind]} {count} 个</div>"
+                for (table, kind), count in counts.items()
+            )
+            st.markdown(f"""
+            <div style="padding: 1rem; background-color: #fff8e1; border-radius: 8px; margin-bottom: 1rem; border-left: 4px solid #f9a825;">
+                <div style="font-size: 1.1rem; font-weight: 600; color: #1a1a1a; margin-bottom: 0.5rem;">🔍 冲突检查</div>
+                <div style="color: #666;">{lines}</div>
+            </div>
+            """, unsafe_allow_html=True)
+            with st.expander(f"查看 {len(report.issues)} 个问题", expanded=False):
+                issues = report.issues.assign(kind=report.issues['kind'].map(ISSUE_KINDS))
+                st.dataframe(paginate(issues, key="issues_page"), width='stretch', hide_index=True)
+        st.radio(
+            "名称冲突时:",
+            POLICIES,
+            format_func=POLICY_LABELS.get,
+            key="conflict_policy",
+            horizontal=True,
+            help="无变化的修改和新增总是被跳过"
+        )
+        
+        if selected_models:
+            if not clone_result.changes.empty:
+                # 统计信息
+                total_configs = len(clone_result.changes)
+                selected_count = len(clone_selection.configured_models())
+                
+                st.markdown(f"""
+                <div style="padding: 1rem; background-color: #f8f9fa; border-radius: 8px; margin-bottom: 1rem; border-left: 4px solid #333;">
+                    <div style="font-size: 1.1rem; font-weight: 600; color: #1a1a1a; margin-bottom: 0.5rem;">📈 生成统计</div>
+                    <div style="color: #666;">
+                        <div>🎯 已配置的模型: {selected_count} / {len(selected_models)}</div>
+                        <div>🔧 将生成的新配置: {total_configs} 个</div>
+                    </div>
+                </div>
+                """, unsafe_allow_html=True)
+                
+                # 详细预览 - 使用网格布局
+                st.markdown('<h5 style="color: #1a1a1a; margin-bottom: 1rem;">📋 详细预览:</h5>', unsafe_allow_html=True)
+                
+                for model_name, model_clones in clone_result.changes.groupby('source_model', sort=False, observed=True):
+                    with st.expander(f"📝 {model_name} ({len(model_clones)} 个新配置)", expanded=False):
+                        # 使用columns创建网格，卡片分页渲染
+                        page_clones = paginate(model_clones, key=f"clone_page_{model_name}")
+                        cols = st.columns(min(2, len(page_clones)))
+                        for i, clone in enumerate(page_clones.itertuples()):
+                            with cols[i % 2]:
+                                supplier_name = supplier_index.name(clone.supplier_id)
+                                new_model_name = clone.new_model
+                                
+                                st.markdown(f"""
+                                <div style="padding: 1rem; background-color: #e8f5e8; border-radius: 8px; border-left: 4px solid #2e7d32; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
+                                    <div style="color: #2e7d32; font-weight: 600; margin-bottom: 0.5rem;">{new_model_name}</div>
+                                    <div style="font-size: 0.85rem; color: #666;">
+                                        <div>🏢 供应商: {supplier_name}</div>
+                                        <div>🆔 ID: {clone.supplier_id}</div>
+                                        <div>📋 源配置: {model_name}</div>
+                                    </div>
+                                </div>
+                                """, unsafe_allow_html=True)
+            else:
+                st.warning("⚠️ 尚未为任何配置选择供应商")
+        else:
+            st.info("请先在'选择配置'标签页中选择要复制的配置")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    # 执行按钮
+    st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+    
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col2:
+        if st.session_state.get('execution_error'):
+            st.markdown(f'<div class="error-message">{st.session_state.execution_error}</div>', unsafe_allow_html=True)
+            st.session_state.execution_error = None
+        if not writes_local(versions):
+            st.caption("📤 当前使用上传的文件：执行结果只保存在本次会话中，请在执行后导出，不会写回本地文件")
+        
+        active_job = job_queue.get(st.session_state.get('active_job'))
+        if st.button("🚀 执行修改和新增", type="primary", use_container_width=True,
+                     disabled=active_job is not None and active_job.active):
+            # 提交到后台任务队列，按所选策略处理冲突后修改model_suppliers表并新增model_configs配置，
+            # 进度和结果由 render_job_progress 轮询
+            label = f"执行 {len(parent_models)} 个 Parent Model"
+            job = job_queue.submit(
+                workbook_key(),
+                label,
+                STAGES,
+                functools.partial(
+                    run_execution, model_suppliers_df, model_configs_df, supplier_index, parent_models,
+                    clone_selection.selections, versions, config_index, st.session_state.conflict_policy,
+                    label=label, rules=rules
+                )
+            )
+            st.session_state.active_job = job.id
+            st.session_state.current_step = 3
+            st.rerun()
+
+def workbook_key():
+    """后台任务串行化所用的键：数据文件所在目录"""
+    return os.path.dirname(os.path.abspath(MODEL_SUPPLIERS_FILE))
+
+def finish_job(job):
+    """任务结束后把结果写入会话：成功时记录修改并显示结果，失败时显示错误"""
+    st.session_state.active_job = None
+    record_run({
+        'label': job.label,
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(job.started or job.created)),
+        'total': (job.finished or time.time()) - (job.started or job.created),
+        'sections': job.timings,
+    })
+    if job.error is not None:
+        if isinstance(job.error, ValidationError):
+            st.session_state.execution_error = f"❌ {job.error}，请在总体预览中处理冲突或更换处理策略"
+        elif isinstance(job.error, ConflictError):
+            st.session_state.execution_error = f"⚠️ {job.error}，页面已刷新为最新数据，请确认预览后重新执行"
+        else:
+            st.session_state.execution_error = f"❌ 操作失败: {job.error}"
+        return
+    
+    # 修改记录已由 commit_plan 写入修改日志（使用上传的文件时不写文件也不记录）
+    resolved = job.result
+    
+    # 保存new_configs和本次执行的结果到session_state，供结果展示和导出使用
+    st.session_state.new_configs = resolved.clone.frame
+    st.session_state.executed_suppliers = resolved.rename.frame
+    st.session_state.executed_configs = resolved.model_configs_updated
+    st.session_state.execution_written = writes_local(resolved.versions)
+    st.session_state.execution_id = resolved.execution_id
+    st.session_state.execution_success = True
+    st.session_state.current_step = 4
+    st.session_state.success_modal_open = True
+
+@st.fragment(run_every=0.5)
+def render_job_progress(job_id):
+    """轮询后台任务进度，任务结束后整页重新运行以加载最新数据"""
+    job = job_queue.get(job_id)
+    if job is None:
+        st.session_state.active_job = None
+        st.rerun()
+    if job.active:
+        if job.stage is None:
+            ahead = sum(1 for other in job_queue.jobs(job.key) if other.active and other.created < job.created)
+            text = f"⏳ 排队中，前面还有 {ahead} 个任务" if ahead else "⏳ 即将开始..."
+        else:
+            text = f"⏳ {STAGES[job.stage]} ({job.stages.index(job.stage) + 1}/{len(job.stages)})"
+        st.progress(job.progress, text=text)
+        return
+    finish_job(job)
+    st.rerun()
+
+def export_sheets(new_configs_df, supplier_source):
+    """导出的各工作表；model_configs 为执行后的完整表，导出的xlsx可作为组合工作簿重新上传
+    
+    sqlite主存储下执行结果只含涉及的行，执行后的完整表从数据库读出。
+    """
+    if st.session_state.get('execution_written', True) and scoped(MODEL_SUPPLIERS_FILE):
+        model_suppliers_df, model_configs_df = read_table(MODEL_SUPPLIERS_FILE), read_table(MODEL_CONFIGS_FILE)
+    else:
+        model_suppliers_df = st.session_state.executed_suppliers
+        model_configs_df = st.session_state.executed_configs
+    return {
+        'model_suppliers': model_suppliers_df,
+        'model_configs': model_configs_df,
+        'supplier': read_table(supplier_source),
+        'new_model_configs': new_configs_df,
+    }
+
+@st.fragment
+@timed('export')
+def render_export_section(execution_id, sheets):
+    """导出面板，选择格式和生成文件时只重新运行本片段；sheets() 返回 {sheet名: DataFrame}，生成文件时才调用"""
+    col_format, col_action = st.columns([1, 2])
+    with col_format:
+        fmt = st.selectbox(
+            "导出格式:",
+            available_formats(),
+            format_func=lambda fmt: FORMATS[fmt][0],
+            key="export_format",
+            label_visibility="collapsed"
+        )
+    label, extension, mime = FORMATS[fmt]
+    with col_action:
+        if export_cache.cached(execution_id, fmt) or st.button(f"📦 生成 {label}", width='stretch'):
+            with st.spinner("正在生成导出文件..."):
+                data = export_cache.get(execution_id, fmt, sheets())
+            st.download_button(
+                label=f"📥 下载修改后的数据 ({label})",
+                data=data,
+                file_name=f"modified_models.{extension}",
+                mime=mime,
+                width='stretch'
+            )
 
-def get_supplier_name(supplier_df, supplier_id):
-    """根据supplier_id获取supplier_name"""
-    supplier_row = supplier_df[supplier_df['id'] == supplier_id]
-    if not supplier_row.empty:
-        return str(supplier_row.iloc[0]['supplier_name']).lower()
-    return f"unknown-{supplier_id}"
+@st.fragment
+@timed('log')
+def render_modification_log():
+    """修改记录面板：按条件从修改日志分页查询，筛选和翻页时只重新运行本片段"""
+    journal = journal_for(workbook_key())
+    if not journal.has_entries():
+        return
+    
+    st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+    st.markdown('<div class="card">', unsafe_allow_html=True)
+    st.markdown('<h3 class="step-title">📝 修改记录</h3>', unsafe_allow_html=True)
+    
+    executions = journal.executions(limit=settings.log_executions)
+    execution_labels = {
+        row['execution_id']: (f"{time.strftime('%m-%d %H:%M:%S', time.localtime(row['ts']))} · "
+                              f"{row['label'] or row['execution_id'][:8]} ({row['entries']} 条)")
+        for row in executions.to_dict('records')
+    }
+    col_table, col_parent, col_execution = st.columns([1, 1, 2])
+    with col_table:
+        table = st.selectbox("表", ['', *TABLES], format_func=lambda table: table or "全部", key="log_table")
+    with col_parent:
+        parent_model = st.text_input("Parent Model", placeholder="完整的parent_model", key="log_parent_model").strip()
+    with col_execution:
+        execution_id = st.selectbox(
+            "执行",
+            ['', *execution_labels],
+            format_func=lambda execution_id: execution_labels.get(execution_id, "全部"),
+            key="log_execution"
+        )
+    
+    if execution_id:
+        render_rollback(execution_id)
+    
+    # 按 (ts, seq) 游标翻页：log_cursors 保存已翻过各页最后一条记录的游标，筛选条件变化时回到第一页
+    filters = (journal.path, table, parent_model, execution_id)
+    if st.session_state.get('log_filters') != filters:
+        st.session_state.log_filters = filters
+        st.session_state.log_cursors = []
+    cursors = st.session_state.log_cursors
+    page_size = settings.log_page_size
+    entries = journal.query(table, parent_model, execution_id, limit=page_size + 1,
+                            before=cursors[-1] if cursors else None)
+    has_older = len(entries) > page_size
+    entries = entries.head(page_size)
+    st.caption(f"第 {len(cursors) + 1} 页，每页 {page_size} 条（最新的在前）")
+    
+    for log in entries.to_dict('records'):
+        logged_at = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(log['ts']))
+        if log['tbl'] == 'model_suppliers':
+            st.markdown(f"""
+            <div class="log-entry">
+                <div style="font-weight: 600;">model_suppliers · ID {log['row_id']}</div>
+                <div style="color: #666; margin: 0.25rem 0;">
+                    <span style="text-decoration: line-through;">{log['old_value']}</span>
+                    <br>
+                    <span style="color: #2e7d32;">→ {log['new_value']}</span>
+                </div>
+                <div style="font-size: 0.9rem; color: #666;">Supplier ID: {log['supplier_id']} · {logged_at}</div>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.markdown(f"""
+            <div class="log-entry">
+                <div style="font-weight: 600; color: #2e7d32;">model_configs · {log['model']}</div>
+                <div style="color: #666; margin: 0.25rem 0;">{log['action']} · 基于: {log['source_model']}</div>
+                <div style="font-size: 0.9rem; color: #666;">Supplier ID: {log['supplier_id']} · {logged_at}</div>
+            </div>
+            """, unsafe_allow_html=True)
+    
+    if cursors or has_older:
+        # 在回调里移动游标，点击后的这次重新运行就显示新的一页
+        last = entries.iloc[-1]
+        col_newer, col_older = st.columns(2)
+        with col_newer:
+            st.button("← 较新", key="log_newer", disabled=not cursors, width='stretch', on_click=cursors.pop)
+        with col_older:
+            st.button("较旧 →", key="log_older", disabled=not has_older, width='stretch', on_click=cursors.append,
+                      args=((float(last['ts']), int(last['seq'])),))
+    
+    st.markdown('</div>', unsafe_allow_html=True)
 
-def filter_by_parent_model(df, parent_model):
-    """根据parent_model筛选数据"""
-    return df[df['parent_model'] == parent_model].copy()
+def render_rollback(execution_id):
+    """回滚所选执行：先预览差异（dry-run），确认后按行写回本地数据文件"""
+    if st.session_state.get('rollback_message'):
+        st.success(st.session_state.pop('rollback_message'))
+    
+    # 预览要读取涉及的行并计算文件哈希，打开开关后才计算；开关按执行区分，切换执行时默认关闭
+    if not st.toggle("↩️ 回滚此次执行（预览差异）", key=f"rollback_preview_{execution_id}"):
+        return
+    with st.container(border=True):
+        # 回滚作用于本地数据文件（而非上传的文件）
+        versions = snapshot(MODEL_SUPPLIERS_FILE, MODEL_CONFIGS_FILE)
+        try:
+            model_suppliers_df, model_configs_df, config_index = load_rollback_tables(execution_id)
+            plan = plan_rollback(execution_id, model_suppliers_df, model_configs_df, versions, config_index)
+        except RollbackError as e:
+            st.error(str(e))
+            return
+        
+        if plan.changed_files:
+            st.caption(f"{', '.join(plan.changed_files)} 在该执行之后又被修改过，已逐行核对，被改动过的记录将跳过")
+        diff = plan.diff.assign(status=plan.diff['status'].map(STATUS_LABELS))
+        st.dataframe(diff, hide_index=True, width='stretch')
+        if plan.empty:
+            st.info("没有可回滚的修改")
+            return
+        
+        if st.button(f"↩️ 确认回滚（{(plan.diff['status'] == 'ok').sum()} 条）", key=f"rollback_{execution_id}"):
+            try:
+                commit_rollback(plan)
+            except ConflictError as e:
+                st.error(f"⚠️ {e}，请重新预览后再回滚")
+                return
+            except StorageError as e:
+                st.error(f"❌ 回滚失败: {e}")
+                return
+            st.session_state.rollback_message = f"✅ 已回滚执行 {execution_id[:8]}"
+            st.rerun()
 
 def main():
     # 页面标题
@@ -241,8 +1131,6 @@ def main():
     st.markdown('<p class="subtitle">批量重命名模型配置，支持自动生成供应商前缀</p>', unsafe_allow_html=True)
     
     # 初始化session state
-    if 'modification_log' not in st.session_state:
-        st.session_state.modification_log = []
     if 'current_step' not in st.session_state:
         st.session_state.current_step = 1
     if 'new_configs' not in st.session_state:
@@ -263,11 +1151,13 @@ def main():
         st.session_state.success_modal_open = False
     
     # 加载数据
-    supplier_df, model_suppliers_df, model_configs_df = load_data()
-    
-    if supplier_df is None:
-        st.error("无法加载数据文件")
-        return
+    with timing.section('load'):
+        if not load_data():
+            st.error("无法加载数据文件")
+            return
+        model_suppliers_source, model_configs_source, supplier_source = current_sources()
+        rules = load_current_rules()
+    versions = st.session_state.loaded_versions
     
     # 步骤指示器
     steps = ["选择模型", "预览修改", "执行操作", "查看结果"]
@@ -279,100 +1169,98 @@ def main():
     st.markdown(step_html, unsafe_allow_html=True)
     
     # 侧边栏：输入parent_model
-    with st.sidebar:
+    with st.sidebar, timing.section('sidebar'):
         st.markdown('<h3 style="color: #1a1a1a; margin-bottom: 1rem;">📋 筛选条件</h3>', unsafe_allow_html=True)
         
-        parent_model = st.text_input(
-            "输入 Parent Model:",
-            placeholder="例如: bce-reranker-base",
-            key="parent_model_input"
-        )
+        batch_mode = st.radio(
+            "处理模式:",
+            ["单个", "批量"],
+            horizontal=True,
+            key="rename_mode"
+        ) == "批量"
         
-        if parent_model:
-            # 筛选model_suppliers表
-            filtered_suppliers = filter_by_parent_model(model_suppliers_df, parent_model)
+        if batch_mode:
+            parent_models_text = st.text_area(
+                "粘贴 Parent Model 列表:",
+                placeholder="每行一个，或用逗号分隔",
+                key="parent_models_text"
+            )
+            parent_models_file = st.file_uploader(
+                "或上传 CSV/TXT 列表:",
+                type=['csv', 'txt'],
+                key="parent_models_file",
+                help="CSV优先读取 parent_model 列，否则读取第一列；TXT每行一个"
+            )
+            parent_model_pattern = st.text_input(
+                "或按通配符匹配:",
+                placeholder="例如: qwen3-*",
+                key="parent_model_pattern"
+            )
+            
+            parent_models = parse_parent_models(parent_models_text)
+            if parent_models_file is not None:
+                try:
+                    parent_models += read_parent_models_file(parent_models_file.getvalue(), parent_models_file.name)
+                except ValueError as e:
+                    st.error(str(e))
+            if parent_model_pattern:
+                parent_models += find_parent_models(model_suppliers_source, parent_model_pattern)
+            parent_models = list(dict.fromkeys(parent_models))
+        else:
+            parent_model = st.text_input(
+                "输入 Parent Model:",
+                placeholder="例如: bce-reranker-base",
+                key="parent_model_input"
+            )
+            parent_models = [parent_model] if parent_model else []
+        
+        # 重命名用到的行（sqlite主存储下只查询命中的行和与新名称重名的行）
+        model_suppliers_df, supplier_index = load_supplier_scope(model_suppliers_source, supplier_source,
+                                                                 parent_models, rules)
+        if parent_models:
+            # 筛选model_suppliers表（一次isin完成所有parent_model）
+            filtered_suppliers = filter_by_parent_model(model_suppliers_df, parent_models)
             
             if not filtered_suppliers.empty:
+                # 预览、执行和导出共用同一份重命名结果
+                rename_result = rename_suppliers(model_suppliers_df, supplier_index, parent_models, rules)
                 st.success(f"找到 {len(filtered_suppliers)} 条记录")
                 st.session_state.current_step = 2
+            elif batch_mode:
+                st.warning("列表中的 Parent Model 均未找到记录")
+                st.session_state.current_step = 1
             else:
                 st.warning(f"未找到 '{parent_model}' 的记录")
                 st.session_state.current_step = 1
+            
+            if batch_mode and not filtered_suppliers.empty:
+                missing_models = sorted(set(parent_models) - set(rename_result.changes['parent_model']))
+                st.caption(f"共 {len(parent_models)} 个 Parent Model，命中 {len(parent_models) - len(missing_models)} 个")
+                if missing_models:
+                    with st.expander(f"未找到的 Parent Model ({len(missing_models)})"):
+                        st.write(", ".join(missing_models))
         
         st.markdown('</div>', unsafe_allow_html=True)
         
         # 数据统计
         st.markdown('<h3 style="color: #1a1a1a; margin-bottom: 1rem;">📊 数据统计</h3>', unsafe_allow_html=True)
-        st.write(f"**Model Suppliers**: {len(model_suppliers_df)} 条记录")
-        st.write(f"**Model Configs**: {len(model_configs_df)} 条记录")
-        st.write(f"**Suppliers**: {len(supplier_df)} 个供应商")
+        st.write(f"**Model Suppliers**: {count_rows(model_suppliers_source)} 条记录")
+        st.write(f"**Model Configs**: {count_rows(model_configs_source)} 条记录")
+        st.write(f"**Suppliers**: {count_rows(supplier_source)} 个供应商")
+        cache_stats = workbook_cache.stats()
+        st.caption(f"缓存命中 {cache_stats['hits']} 次 / 未命中 {cache_stats['misses']} 次")
+        lock_stats = storage_stats.snapshot()
+        st.caption(f"写入锁等待 {lock_stats['last_wait'] * 1000:.0f} ms（最长 {lock_stats['max_wait'] * 1000:.0f} ms） / 版本冲突 {lock_stats['conflicts']} 次")
         st.markdown('</div>', unsafe_allow_html=True)
         
-        # 文件上传
-        st.markdown('<h3 style="color: #1a1a1a; margin-bottom: 1rem;">📁 文件上传</h3>', unsafe_allow_html=True)
-        st.markdown('<p style="color: #666; font-size: 0.9rem; margin-bottom: 1rem;">可选择上传自定义的Excel文件：</p>', unsafe_allow_html=True)
-        
-        # Model Suppliers 文件上传
-        if 'uploaded_model_suppliers' not in st.session_state or st.session_state.uploaded_model_suppliers is None:
-            uploaded_model_suppliers = st.file_uploader(
-                "上传 Model Suppliers 表:",
-                type=['xlsx'],
-                key="model_suppliers_upload",
-                help="上传自定义的 model_suppliers.xlsx 文件"
-            )
-            
-            if uploaded_model_suppliers is not None:
-                st.session_state.uploaded_model_suppliers = uploaded_model_suppliers
-                st.success("✅ Model Suppliers 文件已上传")
-                st.rerun()
-        else:
-            st.success("✅ Model Suppliers 文件已上传")
-            if st.button("🔄 重新上传 Model Suppliers", key="resupload_suppliers"):
-                st.session_state.uploaded_model_suppliers = None
-                st.rerun()
-        
-        # Model Configs 文件上传
-        if 'uploaded_model_configs' not in st.session_state or st.session_state.uploaded_model_configs is None:
-            uploaded_model_configs = st.file_uploader(
-                "上传 Model Configs 表:",
-                type=['xlsx'],
-                key="model_configs_upload",
-                help="上传自定义的 model_configs.xlsx 文件"
-            )
-            
-            if uploaded_model_configs is not None:
-                st.session_state.uploaded_model_configs = uploaded_model_configs
-                st.success("✅ Model Configs 文件已上传")
-                st.rerun()
-        else:
-            st.success("✅ Model Configs 文件已上传")
-            if st.button("🔄 重新上传 Model Configs", key="resupload_configs"):
-                st.session_state.uploaded_model_configs = None
-                st.rerun()
-        
-        # 显示当前使用的文件状态
-        st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 0.5rem; margin-top: 1rem;">📋 当前文件状态</h4>', unsafe_allow_html=True)
-        
-        model_suppliers_status = "📤 自定义文件" if 'uploaded_model_suppliers' in st.session_state and st.session_state.uploaded_model_suppliers is not None else "📄 默认文件"
-        model_configs_status = "📤 自定义文件" if 'uploaded_model_configs' in st.session_state and st.session_state.uploaded_model_configs is not None else "📄 默认文件"
-        
-        st.write(f"**Model Suppliers**: {model_suppliers_status}")
-        st.write(f"**Model Configs**: {model_configs_status}")
-        
-        # 清除上传文件按钮
-        if ('uploaded_model_suppliers' in st.session_state and st.session_state.uploaded_model_suppliers is not None) or \
-           ('uploaded_model_configs' in st.session_state and st.session_state.uploaded_model_configs is not None):
-            if st.button("🗑️ 清除上传文件", use_container_width=True):
-                if 'uploaded_model_suppliers' in st.session_state:
-                    st.session_state.uploaded_model_suppliers = None
-                if 'uploaded_model_configs' in st.session_state:
-                    st.session_state.uploaded_model_configs = None
-                st.rerun()
+        render_rules_panel(model_suppliers_df, supplier_index, parent_models)
+        render_upload_panel()
+        render_perf_panel()
         
         st.markdown('</div>', unsafe_allow_html=True)
     
     # 主要内容区域
-    if parent_model and 'filtered_suppliers' in locals() and not filtered_suppliers.empty:
+    if parent_models and 'filtered_suppliers' in locals() and not filtered_suppliers.empty:
         # 分栏布局
         col1, col2 = st.columns([1, 1])
         
@@ -389,286 +1277,16 @@ def main():
         with col2:
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.markdown('<h3 class="step-title">🔄 修改预览</h3>', unsafe_allow_html=True)
-            
-            # 修改预览
-            for idx, row in filtered_suppliers.iterrows():
-                supplier_name = get_supplier_name(supplier_df, row['supplier_id'])
-                old_model = row['model']
-                new_model = f"{supplier_name}-{parent_model.lower()}"
-                
-                st.markdown(f"""
-                <div style="padding: 1rem; margin: 0.5rem 0; background-color: #f8f9fa; border-radius: 4px; border-left: 4px solid #333;">
-                    <div style="font-weight: 600; color: #1a1a1a;">ID: {row['id']}</div>
-                    <div style="color: #666; margin: 0.5rem 0;">
-                        <span style="text-decoration: line-through; color: #999;">{old_model}</span>
-                        <br>
-                        <span style="color: #2e7d32; font-weight: 500;">→ {new_model}</span>
-                    </div>
-                    <div style="font-size: 0.9rem; color: #666;">
-                        Supplier: {supplier_name} (ID: {row['supplier_id']})
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+            render_rename_preview(rename_result, batch_mode)
             
             st.markdown('</div>', unsafe_allow_html=True)
         
         st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
         
-        # Model配置处理 - 使用Tabs优化布局
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('<h3 class="step-title">⚙️ Model Configs 处理</h3>', unsafe_allow_html=True)
-        
-        # 获取所有可用的model名称
-        available_models = model_configs_df['model'].unique().tolist()
-        
-        # 使用Tabs来组织内容
-        tab1, tab2, tab3 = st.tabs(["📋 选择配置", "🎯 配置供应商", "📊 总体预览"])
-        
-        with tab1:
-            st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 1rem;">选择要复制的配置</h4>', unsafe_allow_html=True)
-            st.markdown('<p style="color: #666; font-size: 0.9rem; margin-bottom: 1rem;">从所有可用的Model Configs中选择要复制的配置：</p>', unsafe_allow_html=True)
-            
-            selected_models = st.multiselect(
-                "选择 Model Configs:",
-                available_models,
-                key="source_models",
-                help="选择要复制到新供应商的配置"
-            )
-            
-            # 显示选中配置的详细信息 - 使用网格布局
-            if selected_models:
-                st.markdown('<h5 style="color: #1a1a1a; margin-bottom: 1rem;">选中的配置详情:</h5>', unsafe_allow_html=True)
-                
-                # 使用columns创建网格布局
-                cols = st.columns(min(3, len(selected_models)))
-                for i, model_name in enumerate(selected_models):
-                    with cols[i % 3]:
-                        # 获取这个model在model_configs中的信息
-                        model_config_info = model_configs_df[model_configs_df['model'] == model_name]
-                        if not model_config_info.empty:
-                            config_info = model_config_info.iloc[0]
-                            
-                            st.markdown(f"""
-                            <div style="padding: 1rem; margin: 0.5rem 0; background-color: #f8f9fa; border-radius: 8px; border-left: 4px solid #333; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                                <div style="font-weight: 600; color: #1a1a1a; margin-bottom: 0.5rem;">{model_name}</div>
-                                <div style="font-size: 0.85rem; color: #666; line-height: 1.4;">
-                                    <div>📝 ID: {config_info.get('id', 'N/A')}</div>
-                                    <div>🔗 Parent: {config_info.get('parent_model', 'N/A')}</div>
-                                    <div>📏 Context: {config_info.get('context_length', 'N/A')}</div>
-                                </div>
-                            </div>
-                            """, unsafe_allow_html=True)
-        
-        with tab2:
-            st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 1rem;">配置目标供应商</h4>', unsafe_allow_html=True)
-            st.markdown('<p style="color: #666; font-size: 0.9rem; margin-bottom: 1rem;">为每个选中的配置单独选择目标供应商：</p>', unsafe_allow_html=True)
-            
-            if selected_models:
-                # 为每个选中的model配置创建供应商选择
-                model_supplier_selections = {}
-                
-                # 使用expander来组织每个配置的选择
-                for i, model_name in enumerate(selected_models):
-                    with st.expander(f"🔧 配置 '{model_name}' 的供应商", expanded=i==0):
-                        # 创建供应商选择选项
-                        supplier_options = []
-                        for _, supplier_row in filtered_suppliers.iterrows():
-                            supplier_name = get_supplier_name(supplier_df, supplier_row['supplier_id'])
-                            supplier_options.append(f"{supplier_name} (ID: {supplier_row['supplier_id']})")
-                        
-                        selected_suppliers_display = st.multiselect(
-                            f"为 {model_name} 选择供应商:",
-                            supplier_options,
-                            key=f"target_suppliers_{i}",
-                            help=f"选择要为 {model_name} 生成新配置的供应商"
-                        )
-                        
-                        # 解析选中的供应商
-                        selected_suppliers = []
-                        if selected_suppliers_display:
-                            for supplier_display in selected_suppliers_display:
-                                # 从显示字符串中提取supplier_id
-                                supplier_id = int(supplier_display.split("ID: ")[1].split(")")[0])
-                                selected_suppliers.append(supplier_id)
-                        
-                        model_supplier_selections[model_name] = selected_suppliers
-                        
-                        if selected_suppliers:
-                            # 使用columns显示选中的供应商和预览
-                            col_a, col_b = st.columns([1, 1])
-                            
-                            with col_a:
-                                st.markdown('<h6 style="color: #1a1a1a; margin-bottom: 0.5rem;">📋 选中的供应商:</h6>', unsafe_allow_html=True)
-                                for supplier_id in selected_suppliers:
-                                    supplier_row = filtered_suppliers[filtered_suppliers['supplier_id'] == supplier_id].iloc[0]
-                                    supplier_name = get_supplier_name(supplier_df, supplier_id)
-                                    st.markdown(f"""
-                                    <div style="padding: 0.75rem; margin: 0.5rem 0; background-color: #f8f9fa; border-radius: 6px; border-left: 3px solid #2e7d32;">
-                                        <div style="font-weight: 600; color: #1a1a1a;">{supplier_name}</div>
-                                        <div style="font-size: 0.85rem; color: #666;">Supplier ID: {supplier_id}</div>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                            
-                            with col_b:
-                                st.markdown('<h6 style="color: #1a1a1a; margin-bottom: 0.5rem;">🔮 新配置预览:</h6>', unsafe_allow_html=True)
-                                for supplier_id in selected_suppliers:
-                                    supplier_row = filtered_suppliers[filtered_suppliers['supplier_id'] == supplier_id].iloc[0]
-                                    supplier_name = get_supplier_name(supplier_df, supplier_id)
-                                    new_model_name = f"{supplier_name}-{parent_model.lower()}"
-                                    
-                                    st.markdown(f"""
-                                    <div style="padding: 0.75rem; margin: 0.5rem 0; background-color: #e8f5e8; border-radius: 6px; border-left: 3px solid #2e7d32;">
-                                        <div style="color: #2e7d32; font-weight: 600; font-size: 0.95rem;">{new_model_name}</div>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                        else:
-                            st.info("尚未选择供应商")
-            else:
-                st.info("请先在'选择配置'标签页中选择要复制的配置")
-        
-        with tab3:
-            st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 1rem;">📊 总体预览</h4>', unsafe_allow_html=True)
-            
-            if selected_models:
-                # 重新获取选择结果
-                model_supplier_selections = {}
-                for i, model_name in enumerate(selected_models):
-                    supplier_options = []
-                    for _, supplier_row in filtered_suppliers.iterrows():
-                        supplier_name = get_supplier_name(supplier_df, supplier_row['supplier_id'])
-                        supplier_options.append(f"{supplier_name} (ID: {supplier_row['supplier_id']})")
-                    
-                    selected_suppliers_display = st.session_state.get(f"target_suppliers_{i}", [])
-                    selected_suppliers = []
-                    if selected_suppliers_display:
-                        for supplier_display in selected_suppliers_display:
-                            supplier_id = int(supplier_display.split("ID: ")[1].split(")")[0])
-                            selected_suppliers.append(supplier_id)
-                    
-                    model_supplier_selections[model_name] = selected_suppliers
-                
-                # 检查是否有任何配置选择了供应商
-                has_any_selection = any(len(suppliers) > 0 for suppliers in model_supplier_selections.values())
-                
-                if has_any_selection:
-                    # 统计信息
-                    total_configs = sum(len(suppliers) for suppliers in model_supplier_selections.values())
-                    selected_count = len([s for s in model_supplier_selections.values() if len(s) > 0])
-                    
-                    st.markdown(f"""
-                    <div style="padding: 1rem; background-color: #f8f9fa; border-radius: 8px; margin-bottom: 1rem; border-left: 4px solid #333;">
-                        <div style="font-size: 1.1rem; font-weight: 600; color: #1a1a1a; margin-bottom: 0.5rem;">📈 生成统计</div>
-                        <div style="color: #666;">
-                            <div>🎯 已配置的模型: {selected_count} / {len(selected_models)}</div>
-                            <div>🔧 将生成的新配置: {total_configs} 个</div>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    # 详细预览 - 使用网格布局
-                    st.markdown('<h5 style="color: #1a1a1a; margin-bottom: 1rem;">📋 详细预览:</h5>', unsafe_allow_html=True)
-                    
-                    for model_name, selected_suppliers in model_supplier_selections.items():
-                        if selected_suppliers:
-                            with st.expander(f"📝 {model_name} ({len(selected_suppliers)} 个新配置)", expanded=False):
-                                # 使用columns创建网格
-                                cols = st.columns(min(2, len(selected_suppliers)))
-                                for i, supplier_id in enumerate(selected_suppliers):
-                                    with cols[i % 2]:
-                                        supplier_row = filtered_suppliers[filtered_suppliers['supplier_id'] == supplier_id].iloc[0]
-                                        supplier_name = get_supplier_name(supplier_df, supplier_id)
-                                        new_model_name = f"{supplier_name}-{parent_model.lower()}"
-                                        
-                                        st.markdown(f"""
-                                        <div style="padding: 1rem; background-color: #e8f5e8; border-radius: 8px; border-left: 4px solid #2e7d32; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                                            <div style="color: #2e7d32; font-weight: 600; margin-bottom: 0.5rem;">{new_model_name}</div>
-                                            <div style="font-size: 0.85rem; color: #666;">
-                                                <div>🏢 供应商: {supplier_name}</div>
-                                                <div>🆔 ID: {supplier_id}</div>
-                                                <div>📋 源配置: {model_name}</div>
-                                            </div>
-                                        </div>
-                                        """, unsafe_allow_html=True)
-                else:
-                    st.warning("⚠️ 尚未为任何配置选择供应商")
-            else:
-                st.info("请先在'选择配置'标签页中选择要复制的配置")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # 执行按钮
-        st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
-        
-        col1, col2, col3 = st.columns([1, 2, 1])
-        with col2:
-            if st.button("🚀 执行修改和新增", type="primary", use_container_width=True):
-                st.session_state.current_step = 3
-                try:
-                    # 执行model_suppliers表修改 - 直接修改原始文件
-                    model_suppliers_df_modified = model_suppliers_df.copy()
-                    for idx, row in filtered_suppliers.iterrows():
-                        supplier_name = get_supplier_name(supplier_df, row['supplier_id'])
-                        old_model = row['model']
-                        new_model = f"{supplier_name}-{parent_model.lower()}"
-                        
-                        # 修改DataFrame中的值
-                        model_suppliers_df_modified.loc[model_suppliers_df_modified['id'] == row['id'], 'model'] = new_model
-                        
-                        # 记录修改
-                        st.session_state.modification_log.append({
-                            'table': 'model_suppliers',
-                            'action': '修改',
-                            'id': row['id'],
-                            'old_value': old_model,
-                            'new_value': new_model,
-                            'supplier_id': row['supplier_id']
-                        })
-                    
-                    # 保存修改到原始文件
-                    model_suppliers_df_modified.to_excel('model_suppliers.xlsx', index=False)
-                    
-                    # 执行model_configs表新增
-                    new_configs = []
-                    for model_name, selected_suppliers in model_supplier_selections.items():
-                        if selected_suppliers:  # 只为有选择供应商的配置生成
-                            original_config = model_configs_df[model_configs_df['model'] == model_name].iloc[0]
-                            
-                            # 只为选中的供应商生成配置
-                            for supplier_id in selected_suppliers:
-                                supplier_row = filtered_suppliers[filtered_suppliers['supplier_id'] == supplier_id].iloc[0]
-                                supplier_name = get_supplier_name(supplier_df, supplier_id)
-                                new_model_name = f"{supplier_name}-{parent_model.lower()}"
-                                
-                                new_config = original_config.copy()
-                                new_config['model'] = new_model_name
-                                # 移除添加supplier_id字段的行，保持原有字段结构
-                                new_configs.append(new_config)
-                                
-                                # 记录新增
-                                st.session_state.modification_log.append({
-                                    'table': 'model_configs',
-                                    'action': '新增',
-                                    'model': new_model_name,
-                                    'supplier_id': supplier_id,
-                                    'source_model': model_name
-                                })
-                    
-                    # 将新配置添加到原始model_configs文件
-                    if new_configs:
-                        new_configs_df = pd.DataFrame(new_configs)
-                        model_configs_df_updated = pd.concat([model_configs_df, new_configs_df], ignore_index=True)
-                        model_configs_df_updated.to_excel('model_configs.xlsx', index=False)
-                    
-                    # 保存new_configs到session_state
-                    st.session_state.new_configs = new_configs
-                    st.session_state.execution_success = True
-                    st.session_state.current_step = 4
-                    st.session_state.success_modal_open = True
-                    
-                    st.rerun()
-                    
-                except Exception as e:
-                    st.markdown(f'<div class="error-message">❌ 操作失败: {e}</div>', unsafe_allow_html=True)
+        render_configs_section(model_suppliers_df, model_configs_source, supplier_index, parent_models,
+                               rename_result, versions, rules)
+        if st.session_state.get('active_job'):
+            render_job_progress(st.session_state.active_job)
         
         # 如果执行成功，显示成功弹窗
         if st.session_state.success_modal_open:
@@ -683,6 +1301,8 @@ def main():
                             <div style="color: #666; font-size: 0.9rem;">
                                 <div>• 修改了 """ + str(len(filtered_suppliers)) + """ 条 model_suppliers 记录</div>
                                 <div>• 新增了 """ + str(len(st.session_state.new_configs)) + """ 条 model_configs 记录</div>
+                                """ + ("" if st.session_state.get('execution_written', True) else
+                                       "<div>• 数据来自上传的文件，未写回本地文件，请导出结果</div>") + """
                             </div>
                         </div>
                     </div>
@@ -696,89 +1316,25 @@ def main():
             st.session_state.success_confirmed = False    # 恢复session_state为False
             st.rerun()  # 重刷页面
         
-        # 显示修改后的数据 - 只在执行完成后显示
-        if st.session_state.current_step == 4 and st.session_state.execution_success and st.session_state.new_configs:
+        # 显示修改后的数据 - 只在执行完成后显示（使用上传的文件时即使没有新增配置也要能导出）
+        new_configs_df = pd.DataFrame(st.session_state.new_configs)
+        if st.session_state.execution_success and 'execution_id' in st.session_state and \
+                (len(new_configs_df) > 0 or not st.session_state.get('execution_written', True)):
             st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
             st.markdown('<div class="card">', unsafe_allow_html=True)
             st.markdown('<h3 class="step-title">📋 新增的 Model Configs</h3>', unsafe_allow_html=True)
             
-            new_configs_df = pd.DataFrame(st.session_state.new_configs)
             with st.expander("查看新增配置", expanded=True):
                 st.dataframe(new_configs_df, width='stretch', hide_index=True)
             
-            # 导出按钮
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                # 修改后的model_suppliers
-                final_suppliers = model_suppliers_df.copy()
-                for idx, row in filtered_suppliers.iterrows():
-                    supplier_name = get_supplier_name(supplier_df, row['supplier_id'])
-                    new_model_name = f"{supplier_name}-{parent_model.lower()}"
-                    final_suppliers.loc[final_suppliers['id'] == row['id'], 'model'] = new_model_name
-                
-                final_suppliers.to_excel(writer, sheet_name='model_suppliers', index=False)
-                new_configs_df.to_excel(writer, sheet_name='model_configs', index=False)
-                supplier_df.to_excel(writer, sheet_name='supplier', index=False)
-            
-            st.download_button(
-                label="📥 下载修改后的Excel文件",
-                data=output.getvalue(),
-                file_name="modified_models.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                use_container_width=True
-            )
+            # 导出按钮：点击后才生成文件，同一次执行的结果按格式缓存
+            render_export_section(st.session_state.execution_id,
+                                  functools.partial(export_sheets, new_configs_df, supplier_source))
             
             st.markdown('</div>', unsafe_allow_html=True)
     
-    # 显示修改记录
-    if st.session_state.modification_log:
-        st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
-        st.markdown('<div class="card">', unsafe_allow_html=True)
-        st.markdown('<h3 class="step-title">📝 修改记录</h3>', unsafe_allow_html=True)
-        
-        # 创建修改记录的DataFrame
-        log_df = pd.DataFrame(st.session_state.modification_log)
-        
-        # 分别显示不同表的记录
-        supplier_logs = log_df[log_df['table'] == 'model_suppliers']
-        config_logs = log_df[log_df['table'] == 'model_configs']
-        
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            if not supplier_logs.empty:
-                st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 1rem;">Model Suppliers 表修改</h4>', unsafe_allow_html=True)
-                for _, log in supplier_logs.iterrows():
-                    st.markdown(f"""
-                    <div class="log-entry">
-                        <div style="font-weight: 600;">ID {log['id']}</div>
-                        <div style="color: #666; margin: 0.25rem 0;">
-                            <span style="text-decoration: line-through;">{log['old_value']}</span>
-                            <br>
-                            <span style="color: #2e7d32;">→ {log['new_value']}</span>
-                        </div>
-                        <div style="font-size: 0.9rem; color: #666;">Supplier ID: {log['supplier_id']}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        with col2:
-            if not config_logs.empty:
-                st.markdown('<h4 style="color: #1a1a1a; margin-bottom: 1rem;">Model Configs 表新增</h4>', unsafe_allow_html=True)
-                for _, log in config_logs.iterrows():
-                    st.markdown(f"""
-                    <div class="log-entry">
-                        <div style="font-weight: 600; color: #2e7d32;">{log['model']}</div>
-                        <div style="color: #666; margin: 0.25rem 0;">基于: {log['source_model']}</div>
-                        <div style="font-size: 0.9rem; color: #666;">Supplier ID: {log['supplier_id']}</div>
-                    </div>
-                    """, unsafe_allow_html=True)
-        
-        # 清除记录按钮
-        if st.button("🗑️ 清除修改记录", use_container_width=True):
-            st.session_state.modification_log = []
-            st.rerun()
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+    render_modification_log()
 
 if __name__ == "__main__":
-    main()
+    with profiled_run(), timed_run('page'):
+        main()
@@ -0,0 +1 @@
+"""性能基准：用合成的大规模数据表测量加载/重命名/复制/写回/导出各环节耗时"""
@@ -0,0 +1,236 @@
+"""基准测试入口
+
+示例:
+    python -m benchmarks.bench --scale 1,10 --output bench.json
+    python -m benchmarks.bench --scale 10 --baseline bench.json --threshold 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import write_tables
+
+
+def _timed(results, name, func, repeat, setup=None):
+    """运行func repeat次，每次之前执行setup（不计时），返回最后一次的结果"""
+    runs = []
+    value = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        value = func()
+        runs.append(time.perf_counter() - start)
+    results[name] = {'median': statistics.median(runs), 'min': min(runs), 'runs': runs}
+    return value
+
+
+def run_scale(scale, repeat, seed=0, parents=20, sources=5):
+    """在临时目录生成一份数据并测量各环节，返回 {'rows': {...}, 'results': {环节: 耗时}}"""
+    from rename.configs import ConfigIndex
+    from rename.engine import clone_configs, filter_by_parent_model, rename_suppliers
+    from rename.export import available_formats, build_export
+    from rename.loader import (
+        MODEL_CONFIGS_FILE,
+        MODEL_SUPPLIERS_FILE,
+        SUPPLIER_FILE,
+        load_scope,
+        load_tables,
+        start_pool,
+        table_memory,
+        workbook_cache,
+    )
+    from rename.config import settings
+    from rename.pipeline import ExecutionPlan
+    from rename.storage import append_table, patch_table, replace_table
+    from rename.suppliers import SupplierIndex
+    from rename.validation import validate
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='rename-bench-') as work:
+        template = os.path.join(work, 'template')
+        data = os.path.join(work, 'data')
+        os.makedirs(template)
+        rows = write_tables(template, scale, seed)
+        paths = [os.path.join(data, name) for name in (MODEL_SUPPLIERS_FILE, MODEL_CONFIGS_FILE, SUPPLIER_FILE)]
+        model_suppliers_path, model_configs_path, supplier_path = paths
+
+        def fresh_copy():
+            """恢复原始xlsx并清空内存缓存和列式副本"""
+            shutil.rmtree(data, ignore_errors=True)
+            shutil.copytree(template, data)
+            workbook_cache.invalidate()
+
+        def fresh_store():
+            """恢复原始数据；sqlite主存储下先导入，写入环节不计导入时间"""
+            fresh_copy()
+            if settings.sqlite_primary:
+                load()
+
+        def drop_memory_cache():
+            workbook_cache.invalidate()
+
+        def load():
+            return load_tables(model_suppliers_path, model_configs_path, supplier_path)
+
+        def load_serial():
+            workers, settings.load_workers = settings.load_workers, 1
+            try:
+                return load()
+            finally:
+                settings.load_workers = workers
+
+        fresh_copy()
+        # 依次解析三个xlsx作为对照；load_xlsx 按 settings.load_workers 并发解析（进程池预先启动，不计启动时间）
+        _timed(results, 'load_xlsx_serial', load_serial, repeat, setup=fresh_copy)
+        start_pool()
+        _timed(results, 'load_xlsx', load, repeat, setup=fresh_copy)
+        _timed(results, 'load_sidecar', load, repeat, setup=drop_memory_cache)
+        supplier_df, model_suppliers_df, model_configs_df = _timed(results, 'load_cached', load, repeat)
+        memory = {name: {'before': before, 'after': after} for name, (before, after) in table_memory.items()}
+        config_index = _timed(results, 'config_index', lambda: ConfigIndex(model_configs_df), repeat)
+
+        # 取出现次数最多的parent_model，模拟一次批量操作
+        parent_models = model_suppliers_df['parent_model'].value_counts().index[:parents].tolist()
+        matched = _timed(results, 'filter', lambda: filter_by_parent_model(model_suppliers_df, parent_models), repeat)
+        supplier_index = _timed(results, 'supplier_index', lambda: SupplierIndex(supplier_df), repeat)
+        _timed(results, 'supplier_names', lambda: supplier_index.map(matched['supplier_id']), repeat)
+        rename = _timed(results, 'rename',
+                        lambda: rename_suppliers(model_suppliers_df, supplier_index, parent_models), repeat)
+
+        supplier_ids = rename.changes['supplier_id'].unique().tolist()
+        selections = {source_model: supplier_ids for source_model in config_index.models[:sources]}
+
+        if settings.sqlite_primary:
+            from rename import sqlstore
+
+            # sqlite主存储下页面和命令行不整表读取，改为按索引查询：筛选、供应商名称关联、源配置查找，
+            # 以及一次执行实际读取的全部数据（load_scope）
+            _timed(results, 'sqlite_filter',
+                   lambda: sqlstore.select_rows(model_suppliers_path, 'parent_model', parent_models), repeat)
+            _timed(results, 'sqlite_join',
+                   lambda: sqlstore.supplier_names(model_suppliers_path, supplier_path, parent_models), repeat)
+            _timed(results, 'sqlite_clone_lookup',
+                   lambda: sqlstore.select_rows(model_configs_path, 'model', config_index.models[:sources]), repeat)
+            _timed(results, 'sqlite_scope',
+                   lambda: load_scope(model_suppliers_path, model_configs_path, supplier_path, parent_models,
+                                      list(selections)), repeat)
+        clone = _timed(results, 'clone',
+                       lambda: clone_configs(model_configs_df, rename.changes, selections, config_index), repeat)
+        plan = ExecutionPlan(rename=rename, clone=clone, model_configs_df=model_configs_df)
+        _timed(results, 'validate', lambda: validate(plan, config_index), repeat)
+
+        model_configs_updated = pd.concat([model_configs_df, clone.frame], ignore_index=True)
+        changed = rename.changes[rename.changes['old_model'] != rename.changes['new_model']]
+        _timed(results, 'save_model_suppliers_full', lambda: replace_table(rename.frame, model_suppliers_path),
+               repeat, setup=fresh_store)
+        _timed(results, 'save_model_configs_full', lambda: replace_table(model_configs_updated, model_configs_path),
+               repeat, setup=fresh_store)
+        _timed(results, 'save_model_suppliers_patch',
+               lambda: patch_table(rename.frame, model_suppliers_path, changed), repeat, setup=fresh_store)
+        _timed(results, 'save_model_configs_append',
+               lambda: append_table(model_configs_updated, model_configs_path, clone.frame), repeat, setup=fresh_store)
+        # 与页面导出的工作表一致：执行后的两张完整表、supplier表和本次新增的配置
+        sheets = {'model_suppliers': rename.frame, 'model_configs': plan.model_configs_updated,
+                  'supplier': supplier_df, 'new_model_configs': clone.frame}
+        for fmt in available_formats():
+            _timed(results, f'export_{fmt}', lambda: build_export(sheets, fmt), repeat)
+
+    workbook_cache.invalidate()
+    return {
+        'rows': dict(rows, changes=len(rename.changes), clones=len(clone.frame)),
+        'store': settings.primary_store,
+        'load_workers': settings.load_workers,
+        'memory': memory,
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold, min_delta=0.005):
+    """与基线比较各环节的中位数耗时，返回 [(scale, 环节, 基线, 当前, 比例)] 中超出阈值的部分
+
+    变慢不足min_delta秒的环节不计入，避免毫秒级波动被当作回归。
+    """
+    regressions = []
+    for scale, entry in current['scales'].items():
+        base_entry = baseline.get('scales', {}).get(scale)
+        if base_entry is None:
+            continue
+        for name, timing in entry['results'].items():
+            base = base_entry['results'].get(name)
+            if base is None:
+                continue
+            before, after = base['median'], timing['median']
+            if after - before > min_delta and after > before * (1 + threshold):
+                regressions.append((scale, name, before, after, after / before if before else float('inf')))
+    return regressions
+
+
+def _parse_scales(value):
+    try:
+        return [float(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的规模列表: {value}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench', description='模型重命名工具性能基准')
+    parser.add_argument('--scale', type=_parse_scales, default=[1.0, 10.0],
+                        help='数据规模，相对当前数据量的倍数，逗号分隔（默认1,10）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个环节重复次数，取中位数（默认3）')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据的随机种子')
+    parser.add_argument('--output', metavar='PATH', help='结果写入的JSON文件')
+    parser.add_argument('--baseline', metavar='PATH', help='用于比较的基线JSON文件')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='相对基线变慢超过该比例视为回归（默认0.25）')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'scales': {},
+    }
+    for scale in args.scale:
+        label = f'{scale:g}'
+        entry = run_scale(scale, args.repeat, args.seed)
+        report['scales'][label] = entry
+        print(f"scale={label} rows={entry['rows']}")
+        for name, timing in entry['results'].items():
+            print(f"  {name:<28} {timing['median'] * 1000:10.2f} ms")
+        for name, usage in entry['memory'].items():
+            print(f"  memory {name:<21} {usage['before'] / 1e6:8.2f} MB -> {usage['after'] / 1e6:.2f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for scale, name, before, after, ratio in regressions:
+            print(f"回归: scale={scale} {name} {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({ratio:.2f}x)",
+                  file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"未发现超过 {args.threshold:.0%} 的回归")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""命名规则引擎吞吐量基准
+
+示例:
+    python -m benchmarks.rules_bench --rows 10000,100000
+    python -m benchmarks.rules_bench --rows 100000 --output rules.json
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import pandas as pd
+
+from benchmarks.bench import _timed
+from benchmarks.synthetic import generate_tables
+
+RULE_SETS = {
+    'default': None,
+    'overrides': {
+        'suppliers': {'azure': {'prefix': 'az/'}, '3': {'name': 'claude'}, 'google': {'template': '{parent_model}'}},
+        'exceptions': [
+            {'pattern': '^meta-', 'keep': True},
+            {'pattern': r'(?i)-model-0+\d$', 'suppliers': ['openai', 'groq'], 'suffix': '-preview'},
+        ],
+        'normalize': ['slug'],
+    },
+}
+"""基准使用的规则配置：默认规则，以及带供应商覆盖、正则例外和slug规范化的配置"""
+
+
+def _rows(count, seed):
+    """从合成数据中重复抽样出count行 (supplier_id, supplier_name, parent_model, model)"""
+    supplier_df, model_suppliers_df, _ = generate_tables(scale=max(1, count / 304), seed=seed)
+    rows = model_suppliers_df.sample(count, replace=True, random_state=seed).reset_index(drop=True)
+    names = dict(zip(supplier_df['id'], supplier_df['supplier_name']))
+    return rows['supplier_id'], rows['supplier_id'].map(names), rows['parent_model'], rows['model']
+
+
+def _per_row(supplier_names, parent_models):
+    # 逐行格式化的写法，作为对照
+    return pd.Series([f"{str(name).lower()}-{str(parent).lower()}"
+                      for name, parent in zip(supplier_names, parent_models)], index=parent_models.index)
+
+
+def run_rows(count, repeat, seed=0):
+    """对count行测量各规则配置的编译和生成耗时，返回 {'results': {环节: 耗时}, 'throughput': {环节: 行/秒}}"""
+    from rename.rules import RuleSet
+
+    supplier_ids, supplier_names, parent_models, models = _rows(count, seed)
+    results = {}
+    _timed(results, 'per_row_format', lambda: _per_row(supplier_names, parent_models), repeat)
+    for name, config in RULE_SETS.items():
+        rules = _timed(results, f'compile_{name}', lambda: RuleSet(config), repeat)
+        _timed(results, f'apply_{name}', lambda: rules.apply(supplier_ids, supplier_names, parent_models, models),
+               repeat)
+    throughput = {name: count / timing['median'] for name, timing in results.items()
+                  if not name.startswith('compile_') and timing['median']}
+    return {'results': results, 'throughput': throughput}
+
+
+def _parse_rows(value):
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的行数列表: {value}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.rules_bench', description='命名规则引擎吞吐量基准')
+    parser.add_argument('--rows', type=_parse_rows, default=[10000, 100000],
+                        help='每批行数，逗号分隔（默认10000,100000）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个环节重复次数，取中位数（默认3）')
+    parser.add_argument('--seed', type=int, default=0, help='合成数据的随机种子')
+    parser.add_argument('--output', metavar='PATH', help='结果写入的JSON文件')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'rows': {},
+    }
+    for count in args.rows:
+        entry = run_rows(count, args.repeat, args.seed)
+        report['rows'][str(count)] = entry
+        print(f"rows={count}")
+        for name, timing in entry['results'].items():
+            rate = entry['throughput'].get(name)
+            print(f"  {name:<20} {timing['median'] * 1000:10.2f} ms" + (f" {rate:14,.0f} 行/秒" if rate else ''))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""按真实表结构生成合成数据，scale=1 时行数与当前数据相当"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+BASE_ROWS = {'supplier': 31, 'model_suppliers': 304, 'model_configs': 735}
+
+MODEL_SUPPLIERS_COLUMNS = ['id', 'model', 'supplier_id', 'parent_model', 'context_length', 'max_output',
+                           'latency', 'throughput', 'context_window']
+MODEL_CONFIGS_COLUMNS = ['model', 'developer', 'developer_id', 'provider_id', 'model_name', 'model_ratio',
+                         'cache_ratio', 'completion_ratio', 'img_price_config', 'desc', 'desc_en', 'order', 'flag',
+                         'context_length', 'input_images', 'input_audios', 'latency', 'throughput', 'usage',
+                         'usage_en', 'modalities', 'features', 'tags', 'types', 'display_input', 'display_output',
+                         'billing_config', 'price_type', 'is_main_model']
+
+DEVELOPERS = ['OpenAI', 'Anthropic', 'Google', 'Qwen', 'DeepSeek', 'Meta', 'Mistral', 'Microsoft', 'Zhipu', 'Moonshot']
+SUPPLIER_NAMES = ['openai', 'azure', 'anthropic', 'google', 'bedrock', 'vertex', 'alicloud', 'bytedance', 'sophnet',
+                  'baidu', 'chutes', 'siliconflow', 'deepinfra', 'cerebras', 'groq', 'together', 'fireworks']
+FEATURES = ['thinking', 'tools', 'function_calling', 'structured_outputs', 'web_search']
+
+
+def _maybe(rng, values, ratio):
+    """按比例把一部分值置为缺失"""
+    values = pd.Series(values, dtype=object)
+    values[rng.random(len(values)) < ratio] = np.nan
+    return values
+
+
+def _usage(model):
+    return json.dumps({
+        'openai-python': 'from openai import OpenAI\n\nclient = OpenAI(base_url="https://aihubmix.com/v1")\n'
+                         f'completion = client.chat.completions.create(model="{model}", messages=[...])\n' * 4,
+        'python': f'fetch(\'https://aihubmix.com/v1/chat/completions\', {{ model: "{model}" }})\n' * 4,
+    }, indent=4, ensure_ascii=False)
+
+
+def _billing(model, ratio):
+    return json.dumps({
+        'model_name': model,
+        'default_tier': 'tier1',
+        'token_based_tier_configs': {'tier1': {'model_ratio': ratio, 'prompt_tokens_ratio': 1.0,
+                                               'completion_tokens_ratio': 4.0, 'cached_tokens_ratio': 0.1}},
+        'enabled_billing_items': ['prompt_tokens', 'completion_tokens', 'cached_tokens'],
+    }, indent=2)
+
+
+def generate_tables(scale=1, seed=0):
+    """返回 (supplier_df, model_suppliers_df, model_configs_df)"""
+    rng = np.random.default_rng(seed)
+    n_suppliers = max(1, round(BASE_ROWS['supplier'] * scale))
+    n_model_suppliers = max(1, round(BASE_ROWS['model_suppliers'] * scale))
+    n_model_configs = max(1, round(BASE_ROWS['model_configs'] * scale))
+
+    rounds, offsets = np.divmod(np.arange(n_suppliers), len(SUPPLIER_NAMES))
+    supplier_names = [SUPPLIER_NAMES[offset] + (str(r) if r else '') for r, offset in zip(rounds, offsets)]
+    supplier_df = pd.DataFrame({'id': np.arange(1, n_suppliers + 1), 'supplier_name': supplier_names})
+
+    # 每个parent_model平均对应约3个供应商，和真实数据接近
+    parent_pool = np.array([f'{DEVELOPERS[i % len(DEVELOPERS)].lower()}-model-{i:05d}'
+                            for i in range(max(1, n_model_suppliers // 3))])
+    parents = rng.choice(parent_pool, n_model_suppliers)
+    supplier_ids = rng.integers(1, n_suppliers + 1, n_model_suppliers)
+    prefixed = rng.random(n_model_suppliers) < 0.3
+    models = np.where(prefixed, np.char.add('s-', parents.astype(str)), parents)
+    context = rng.choice([8192.0, 32768.0, 131072.0, 1048576.0], n_model_suppliers)
+    model_suppliers_df = pd.DataFrame({
+        'id': np.arange(1, n_model_suppliers + 1),
+        'model': models,
+        'supplier_id': supplier_ids,
+        'parent_model': parents,
+        'context_length': context,
+        'max_output': _maybe(rng, rng.choice([4096.0, 8192.0, 32768.0], n_model_suppliers), 0.3).astype(float),
+        'latency': _maybe(rng, rng.uniform(0.2, 3.0, n_model_suppliers).round(2), 0.2).astype(float),
+        'throughput': _maybe(rng, rng.uniform(20, 300, n_model_suppliers).round(1), 0.2).astype(float),
+        'context_window': context,
+    }, columns=MODEL_SUPPLIERS_COLUMNS)
+
+    # model_configs 覆盖全部parent_model，其余为带前缀的变体
+    config_models = list(parent_pool) + [f'ahb-{parent_pool[i % len(parent_pool)]}-v{i}'
+                                         for i in range(max(0, n_model_configs - len(parent_pool)))]
+    config_models = config_models[:n_model_configs]
+    developer_idx = rng.integers(0, len(DEVELOPERS), n_model_configs)
+    ratios = rng.choice([0.05, 0.125, 0.5, 0.625, 1.25, 2.5], n_model_configs)
+    rich = rng.random(n_model_configs) < 0.4
+    model_configs_df = pd.DataFrame({
+        'model': config_models,
+        'developer': [DEVELOPERS[i] for i in developer_idx],
+        'developer_id': developer_idx.astype(float) + 1,
+        'provider_id': rng.integers(1, 40, n_model_configs).astype(float),
+        'model_name': [model.replace('-', ' ').title() for model in config_models],
+        'model_ratio': ratios,
+        'cache_ratio': 1.0,
+        'completion_ratio': rng.choice([1.0, 3.0, 4.0, 5.0, 8.0], n_model_configs),
+        'img_price_config': np.nan,
+        'desc': [f'{model} 是一款通用大模型，擅长推理、编程和多语言任务。' * 3 if r else np.nan
+                 for model, r in zip(config_models, rich)],
+        'desc_en': [f'{model} is a general purpose model for reasoning, coding and multilingual tasks. ' * 3
+                    if r else np.nan for model, r in zip(config_models, rich)],
+        'order': rng.integers(0, 2000, n_model_configs).astype(float),
+        'flag': rng.integers(0, 2, n_model_configs).astype(float),
+        # 与真实数据一样混合字符串和数字
+        'context_length': _maybe(rng, rng.choice(['128 K', '200 K', '1 M', 32768], n_model_configs), 0.5),
+        'input_images': np.nan,
+        'input_audios': np.nan,
+        'latency': _maybe(rng, rng.uniform(0.2, 3.0, n_model_configs).round(2), 0.5).astype(float),
+        'throughput': _maybe(rng, rng.uniform(20, 300, n_model_configs).round(1), 0.5).astype(float),
+        'usage': [_usage(model) if r else np.nan for model, r in zip(config_models, rich)],
+        'usage_en': [_usage(model) if r else np.nan for model, r in zip(config_models, rich)],
+        'modalities': _maybe(rng, rng.choice(['text', 'text,image', 'text,image,audio'], n_model_configs), 0.3),
+        'features': _maybe(rng, [','.join(rng.choice(FEATURES, 2, replace=False)) for _ in range(n_model_configs)], 0.3),
+        'tags': _maybe(rng, rng.choice(['best', 'sota', 'multi_modal,best'], n_model_configs), 0.6),
+        'types': _maybe(rng, rng.choice(['t2t', 'embedding', 'rerank'], n_model_configs), 0.3),
+        'display_input': np.nan,
+        'display_output': np.nan,
+        'billing_config': [_billing(model, ratio) if r else np.nan
+                           for model, ratio, r in zip(config_models, ratios, rich)],
+        'price_type': np.nan,
+        'is_main_model': rng.integers(0, 2, n_model_configs),
+    }, columns=MODEL_CONFIGS_COLUMNS)
+    return supplier_df, model_suppliers_df, model_configs_df
+
+
+def write_tables(directory, scale=1, seed=0):
+    """生成数据并写成三个xlsx文件，返回各表行数"""
+    from rename.loader import MODEL_CONFIGS_FILE, MODEL_SUPPLIERS_FILE, SUPPLIER_FILE
+
+    tables = generate_tables(scale, seed)
+    for filename, df in zip((SUPPLIER_FILE, MODEL_SUPPLIERS_FILE, MODEL_CONFIGS_FILE), tables):
+        df.to_excel(os.path.join(directory, filename), index=False, engine='openpyxl')
+    return {name: len(df) for name, df in zip(BASE_ROWS, tables)}
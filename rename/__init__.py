@@ -0,0 +1 @@
+"""模型重命名工具的核心逻辑（不依赖Streamlit）"""
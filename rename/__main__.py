@@ -0,0 +1,5 @@
+import sys
+
+from rename.cli import main
+
+sys.exit(main())
@@ -0,0 +1,257 @@
+"""命令行入口（不依赖Streamlit）
+
+示例:
+    python -m rename apply --parent bce-reranker-base --clone-from X --suppliers 11,12 --dry-run
+    python -m rename history
+    python -m rename rollback 3f2a9c... --dry-run
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def _parse_supplier_ids(value):
+    try:
+        return [int(part) for part in value.split(',') if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的supplier_id列表: {value}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m rename', description='模型重命名工具命令行')
+    parser.add_argument('--store', choices=['xlsx', 'columnar', 'sqlite'],
+                        help='主存储（默认取环境变量 RENAME_PRIMARY_STORE，未设置时为xlsx）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    apply_parser = subparsers.add_parser('apply', help='重命名model_suppliers并复制model_configs')
+    apply_parser.add_argument('--parent', action='append', default=[], metavar='PARENT_MODEL',
+                              help='要处理的parent_model，可重复或用逗号分隔')
+    apply_parser.add_argument('--parents-file', metavar='PATH', help='parent_model列表文件（CSV/TXT）')
+    apply_parser.add_argument('--pattern', help='按通配符匹配parent_model，例如 qwen3-*')
+    apply_parser.add_argument('--clone-from', action='append', default=[], metavar='MODEL',
+                              help='要复制的model_configs源配置，可重复')
+    apply_parser.add_argument('--suppliers', type=_parse_supplier_ids, metavar='IDS',
+                              help='复制配置的目标supplier_id，逗号分隔；不指定则为全部命中的供应商')
+    apply_parser.add_argument('--data-dir', default='.', help='Excel文件所在目录（默认当前目录）')
+    apply_parser.add_argument('--rules', metavar='PATH',
+                              help='命名规则配置（JSON），默认为数据目录下的 rename_rules.json，不存在时使用默认规则')
+    apply_parser.add_argument('--on-conflict', choices=['skip', 'overwrite', 'fail'], default='skip',
+                              help='model名称冲突时的处理策略（默认skip）')
+    apply_parser.add_argument('--dry-run', action='store_true', help='只显示将要进行的修改，不写入文件')
+    apply_parser.set_defaults(func=cmd_apply)
+
+    history_parser = subparsers.add_parser('history', help='列出修改日志中最近的执行')
+    history_parser.add_argument('--data-dir', default='.', help='Excel文件所在目录（默认当前目录）')
+    history_parser.add_argument('--limit', type=int, default=20, help='最多显示的条数（默认20）')
+    history_parser.set_defaults(func=cmd_history)
+
+    rollback_parser = subparsers.add_parser('rollback', help='按执行ID回滚一次执行')
+    rollback_parser.add_argument('execution_id', help='要回滚的执行ID（见 history）')
+    rollback_parser.add_argument('--data-dir', default='.', help='Excel文件所在目录（默认当前目录）')
+    rollback_parser.add_argument('--dry-run', action='store_true', help='只显示将要进行的修改，不写入文件')
+    rollback_parser.set_defaults(func=cmd_rollback)
+
+    export_parser = subparsers.add_parser('export', help='把当前数据导出为xlsx（列式/sqlite主存储模式下使用）')
+    export_parser.add_argument('--data-dir', default='.', help='Excel文件所在目录（默认当前目录）')
+    export_parser.set_defaults(func=cmd_export)
+    return parser
+
+
+def _collect_parent_models(args):
+    from rename.engine import parse_parent_models, read_parent_models_file
+
+    parent_models = parse_parent_models('\n'.join(args.parent))
+    if args.parents_file:
+        with open(args.parents_file, 'rb') as f:
+            parent_models += read_parent_models_file(f.read(), args.parents_file)
+    return parent_models
+
+
+def cmd_apply(args):
+    from rename.loader import (
+        MODEL_CONFIGS_FILE,
+        MODEL_SUPPLIERS_FILE,
+        SUPPLIER_FILE,
+        find_parent_models,
+        load_scope,
+        load_tables,
+        scoped,
+        snapshot,
+    )
+    from rename.engine import filter_by_parent_model
+    from rename.pipeline import build_plan, commit_plan
+    from rename.rules import RuleError, load_rules, rules_path
+    from rename.storage import StorageError
+    from rename.validation import ISSUE_KINDS, ValidationError, resolve, validate
+
+    model_suppliers_path = os.path.join(args.data_dir, MODEL_SUPPLIERS_FILE)
+    model_configs_path = os.path.join(args.data_dir, MODEL_CONFIGS_FILE)
+    supplier_path = os.path.join(args.data_dir, SUPPLIER_FILE)
+
+    if args.rules and not os.path.exists(args.rules):
+        print(f"错误: 找不到命名规则文件 {args.rules}", file=sys.stderr)
+        return 2
+    try:
+        rules = load_rules(args.rules or rules_path(args.data_dir))
+    except (OSError, RuleError) as e:
+        print(f"错误: 读取命名规则失败: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        parent_models = _collect_parent_models(args)
+    except (OSError, ValueError) as e:
+        print(f"错误: 读取parent_model列表文件失败: {e}", file=sys.stderr)
+        return 2
+
+    try:
+        versions = snapshot(model_suppliers_path, model_configs_path)
+        # 需要解析xlsx的表先一起并发解析；sqlite主存储下不整表读取，只按索引查询用到的行
+        if not scoped(model_suppliers_path):
+            load_tables(model_suppliers_path, model_configs_path, supplier_path)
+        if args.pattern:
+            parent_models += find_parent_models(model_suppliers_path, args.pattern)
+        parent_models = list(dict.fromkeys(parent_models))
+        model_suppliers_df, model_configs_df, supplier_index, config_index = load_scope(
+            model_suppliers_path, model_configs_path, supplier_path, parent_models, args.clone_from, rules)
+    except (OSError, ValueError) as e:
+        print(f"错误: 读取数据失败: {e}", file=sys.stderr)
+        return 2
+    if not parent_models:
+        print("错误: 请通过 --parent、--parents-file 或 --pattern 指定parent_model", file=sys.stderr)
+        return 2
+
+    missing_sources = [source_model for source_model in args.clone_from if source_model not in config_index]
+    if missing_sources:
+        print(f"错误: model_configs中不存在: {', '.join(missing_sources)}", file=sys.stderr)
+        return 2
+
+    supplier_ids = args.suppliers
+    if supplier_ids is None:
+        matched = filter_by_parent_model(model_suppliers_df, parent_models)
+        supplier_ids = list(dict.fromkeys(matched['supplier_id'].tolist()))
+    selections = {source_model: supplier_ids for source_model in args.clone_from}
+
+    plan = build_plan(model_suppliers_df, model_configs_df, supplier_index, parent_models, selections, versions,
+                      config_index, rules)
+    if plan.rename.changes.empty:
+        print("未找到匹配的model_suppliers记录", file=sys.stderr)
+        return 1
+
+    report = validate(plan, config_index)
+    if not report.issues.empty:
+        issues = report.issues.assign(kind=report.issues['kind'].map(ISSUE_KINDS))
+        print(f"冲突检查发现 {len(issues)} 个问题:", file=sys.stderr)
+        print(issues.to_string(index=False), file=sys.stderr)
+    try:
+        plan = resolve(plan, report, args.on_conflict)
+    except ValidationError as e:
+        print(f"错误: {e}（--on-conflict fail）", file=sys.stderr)
+        return 4
+    if plan.rename.changes.empty and plan.clone.frame.empty and plan.overwritten.empty:
+        # 修改都已生效或被跳过，不写文件也不记入修改日志
+        print("没有需要提交的修改")
+        return 0
+
+    print(f"model_suppliers 修改 {len(plan.rename.changes)} 条{':' if not plan.rename.changes.empty else ''}")
+    if not plan.rename.changes.empty:
+        print(plan.rename.changes.to_string(index=False))
+    if not plan.clone.changes.empty:
+        print(f"\nmodel_configs 新增 {len(plan.clone.changes)} 条:")
+        print(plan.clone.changes.to_string(index=False))
+    if not plan.overwritten.empty:
+        print(f"\nmodel_configs 覆盖 {len(plan.overwritten)} 条:")
+        print(plan.overwritten.to_string(index=False))
+
+    if args.dry_run:
+        print("\n(dry-run) 未写入任何文件")
+        return 0
+
+    try:
+        commit_plan(plan, model_suppliers_path, model_configs_path, label='命令行 apply')
+    except StorageError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 3
+    print(f"\n已提交: model_suppliers 修改 {len(plan.rename.changes)} 条, model_configs 新增 {len(plan.clone.frame)} 条, 覆盖 {len(plan.overwritten)} 条")
+    print(f"执行ID: {plan.execution_id}")
+    return 0
+
+
+def cmd_history(args):
+    from rename.journal import journal_for
+
+    executions = journal_for(args.data_dir).executions(limit=args.limit)
+    if executions.empty:
+        print("修改日志中还没有执行记录")
+        return 0
+    executions['ts'] = [time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)) for ts in executions['ts']]
+    print(executions[['execution_id', 'ts', 'label', 'entries']].to_string(index=False))
+    return 0
+
+
+def cmd_rollback(args):
+    from rename.loader import MODEL_CONFIGS_FILE, MODEL_SUPPLIERS_FILE, snapshot
+    from rename.rollback import STATUS_LABELS, RollbackError, commit_rollback, load_rollback_tables, plan_rollback
+    from rename.storage import StorageError
+
+    model_suppliers_path = os.path.join(args.data_dir, MODEL_SUPPLIERS_FILE)
+    model_configs_path = os.path.join(args.data_dir, MODEL_CONFIGS_FILE)
+    try:
+        versions = snapshot(model_suppliers_path, model_configs_path)
+        model_suppliers_df, model_configs_df, config_index = load_rollback_tables(
+            args.execution_id, model_suppliers_path, model_configs_path)
+        plan = plan_rollback(args.execution_id, model_suppliers_df, model_configs_df, versions, config_index,
+                             model_suppliers_path, model_configs_path)
+    except RollbackError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+    except (OSError, ValueError) as e:
+        print(f"错误: 读取数据失败: {e}", file=sys.stderr)
+        return 2
+
+    if plan.changed_files:
+        print(f"注意: {', '.join(plan.changed_files)} 在该执行之后又被修改过，已逐行核对", file=sys.stderr)
+    diff = plan.diff.assign(status=plan.diff['status'].map(STATUS_LABELS))
+    print(diff.to_string(index=False))
+
+    if args.dry_run:
+        print("\n(dry-run) 未写入任何文件")
+        return 0
+    if plan.empty:
+        print("\n没有可回滚的修改", file=sys.stderr)
+        return 1
+    try:
+        commit_rollback(plan, model_suppliers_path, model_configs_path)
+    except StorageError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 3
+    print(f"\n已回滚: model_suppliers 恢复 {len(plan.supplier_changes)} 条, model_configs "
+          f"删除 {len(plan.config_deletions)} 条, 还原 {len(plan.config_replacements)} 条")
+    print(f"执行ID: {plan.rollback_id}")
+    return 0
+
+
+def cmd_export(args):
+    from rename.config import settings
+    from rename.loader import MODEL_CONFIGS_FILE, MODEL_SUPPLIERS_FILE, SUPPLIER_FILE
+    from rename.storage import export_table, workbook_lock
+
+    if settings.primary_store == 'xlsx':
+        # xlsx本身就是主存储，整表重写会丢掉原有格式，也会使修改日志记录的文件哈希失效
+        print("错误: 主存储为xlsx时数据已在xlsx中，无需导出（请配合 --store columnar 或 --store sqlite 使用）",
+              file=sys.stderr)
+        return 2
+    with workbook_lock(args.data_dir):
+        for filename in (SUPPLIER_FILE, MODEL_SUPPLIERS_FILE, MODEL_CONFIGS_FILE):
+            path = os.path.join(args.data_dir, filename)
+            df = export_table(path)
+            print(f"已导出 {path} ({len(df)} 条记录)")
+    return 0
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.store:
+        from rename.config import settings
+        settings.primary_store = args.store
+    return args.func(args)
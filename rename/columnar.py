@@ -0,0 +1,115 @@
+"""xlsx表的列式副本（Arrow IPC / Feather）
+
+副本以内存映射方式读取，并在schema元数据中记录生成它的源文件指纹，源文件变化后自动重建。
+pyarrow不可用时所有函数退化为空操作，调用方继续直接读写xlsx。
+"""
+import json
+import os
+
+import pandas as pd
+
+from rename.config import settings
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - pyarrow是可选依赖
+    pa = None
+    feather = None
+
+_SOURCE_KEY = b'rename.source'
+_JSON_COLUMNS_KEY = b'rename.json_columns'
+
+
+def available():
+    return pa is not None
+
+
+def sidecar_path(path):
+    """源文件对应的列式副本路径"""
+    directory, filename = os.path.split(os.path.abspath(os.fspath(path)))
+    return os.path.join(directory, settings.cache_dir, os.path.splitext(filename)[0] + '.feather')
+
+
+def source_stamp(path):
+    """源文件的 mtime/size，用于判断副本是否过期"""
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _mixed_columns(df):
+    # Excel里同一列混有数字和文本时Arrow无法表示，这类列按JSON逐值编码以保留原始类型
+    return [column for column in df.columns
+            if df[column].dtype == object
+            and pd.api.types.infer_dtype(df[column], skipna=True) not in ('string', 'empty')]
+
+
+def write_sidecar(df, path, stamp=None):
+    """把表写成列式副本；stamp为None时表示副本本身就是主存储"""
+    if not available():
+        return None
+    target = sidecar_path(path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    json_columns = _mixed_columns(df)
+    encoded = df.copy() if json_columns else df
+    for column in json_columns:
+        encoded[column] = [json.dumps(value) for value in encoded[column]]
+
+    table = pa.Table.from_pandas(encoded, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_SOURCE_KEY] = json.dumps(stamp).encode()
+    metadata[_JSON_COLUMNS_KEY] = json.dumps([str(column) for column in json_columns]).encode()
+    table = table.replace_schema_metadata(metadata)
+
+    # 列式主存储模式下副本就是主存储；临时文件名按进程/线程区分，落盘后再原子替换
+    from rename.storage import atomic_output
+
+    with atomic_output(target) as tmp:
+        feather.write_feather(table, tmp, compression='uncompressed')
+    return target
+
+
+def is_fresh(path, stamp):
+    """列式副本存在且记录的源文件指纹与stamp一致（只读取schema元数据）"""
+    if not available():
+        return False
+    target = sidecar_path(path)
+    if not os.path.exists(target):
+        return False
+    try:
+        with pa.memory_map(target) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        # 副本损坏或写了一半时视为过期，读取时重新解析xlsx并重建
+        return False
+    return json.loads(metadata.get(_SOURCE_KEY, b'null')) == stamp
+
+
+def read_sidecar(path, stamp=None):
+    """读取列式副本；stamp不为None时要求与副本记录的源文件指纹一致，否则返回None"""
+    if not available():
+        return None
+    target = sidecar_path(path)
+    if not os.path.exists(target):
+        return None
+    table = feather.read_table(target, memory_map=True)
+    metadata = table.schema.metadata or {}
+    if stamp is not None and json.loads(metadata.get(_SOURCE_KEY, b'null')) != stamp:
+        return None
+    df = table.to_pandas()
+    for column in json.loads(metadata.get(_JSON_COLUMNS_KEY, b'[]')):
+        df[column] = pd.Series([json.loads(value) for value in df[column]], index=df.index, dtype=object)
+    return df
+
+
+def to_parquet(df, target):
+    """把表导出为Parquet（target为路径或可写的文件对象）；混合类型的列转为文本，空值保持为null"""
+    import pyarrow.parquet as parquet
+
+    json_columns = _mixed_columns(df)
+    if json_columns:
+        df = df.copy()
+        for column in json_columns:
+            df[column] = [None if value is None or value != value else str(value) for value in df[column]]
+    parquet.write_table(pa.Table.from_pandas(df, preserve_index=False), target)
@@ -0,0 +1,60 @@
+"""运行配置，默认值可通过环境变量覆盖"""
+import os
+from dataclasses import dataclass
+
+
+@dataclass
+class Settings:
+    cache_dir: str = '.rename_cache'
+    """列式副本所在目录，相对路径时相对于数据文件所在目录"""
+    primary_store: str = 'xlsx'
+    """主存储：xlsx（默认，列式副本只做读缓存）、columnar（列式副本为主）或 sqlite（SQLite数据库为主），
+    后两种模式下xlsx仅在导出时生成"""
+    sqlite_file: str = 'rename.sqlite'
+    """sqlite主存储的数据库文件，位于数据文件所在目录"""
+    page_size: int = 20
+    """预览卡片每页显示的条数"""
+    log_page_size: int = 20
+    """修改记录每页显示的条数"""
+    log_executions: int = 50
+    """修改记录中可按执行筛选的最近执行数"""
+    journal: str = '.rename_journal.sqlite'
+    """修改日志（SQLite）文件，相对路径时相对于数据文件所在目录"""
+    rules_file: str = 'rename_rules.json'
+    """命名规则配置（JSON，见 rename.rules），相对路径时相对于数据文件所在目录，不存在时使用默认规则"""
+    load_workers: int = min(3, os.cpu_count() or 1)
+    """并发解析xlsx工作表的进程数，为1时在当前进程依次解析"""
+    search_limit: int = 200
+    """配置搜索最多返回的候选条数"""
+    perf_history: int = 20
+    """侧边栏性能面板保留的最近运行次数"""
+    perf_log: str = ''
+    """性能记录的JSONL文件路径，为空时不写文件"""
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            cache_dir=os.environ.get('RENAME_CACHE_DIR', cls.cache_dir),
+            primary_store=os.environ.get('RENAME_PRIMARY_STORE', cls.primary_store),
+            sqlite_file=os.environ.get('RENAME_SQLITE_FILE', cls.sqlite_file),
+            page_size=int(os.environ.get('RENAME_PAGE_SIZE', cls.page_size)),
+            log_page_size=int(os.environ.get('RENAME_LOG_PAGE_SIZE', cls.log_page_size)),
+            log_executions=int(os.environ.get('RENAME_LOG_EXECUTIONS', cls.log_executions)),
+            journal=os.environ.get('RENAME_JOURNAL', cls.journal),
+            rules_file=os.environ.get('RENAME_RULES', cls.rules_file),
+            load_workers=int(os.environ.get('RENAME_LOAD_WORKERS', cls.load_workers)),
+            search_limit=int(os.environ.get('RENAME_SEARCH_LIMIT', cls.search_limit)),
+            perf_history=int(os.environ.get('RENAME_PERF_HISTORY', cls.perf_history)),
+            perf_log=os.environ.get('RENAME_PERF_LOG', cls.perf_log),
+        )
+
+    @property
+    def columnar_primary(self):
+        return self.primary_store == 'columnar'
+
+    @property
+    def sqlite_primary(self):
+        return self.primary_store == 'sqlite'
+
+
+settings = Settings.from_env()
@@ -0,0 +1,78 @@
+"""model_configs的model名称索引"""
+import bisect
+
+import pandas as pd
+
+NGRAM = 3
+
+
+class ConfigIndex:
+    """model → 行位置的哈希索引，附带排序后的名称列表和前缀/子串搜索结构，每份model_configs表构建一次"""
+
+    def __init__(self, model_configs_df):
+        self.frame = model_configs_df
+        positions = {}
+        for position, model in enumerate(model_configs_df['model'].tolist()):
+            if isinstance(model, str) or not pd.isna(model):
+                positions.setdefault(model, []).append(position)
+        self._positions = positions
+
+        self.models = sorted(positions, key=str)
+        """去重并排序后的model名称，供选择框使用"""
+        self._lowered = [str(model).lower() for model in self.models]
+        # 前缀搜索：按小写名称排序后二分查找
+        self._prefix_keys = sorted(range(len(self.models)), key=self._lowered.__getitem__)
+        self._prefix_sorted = [self._lowered[i] for i in self._prefix_keys]
+        # 子串搜索：n-gram倒排索引，先取各n-gram候选集的交集再逐个确认
+        grams = {}
+        for i, name in enumerate(self._lowered):
+            for gram in {name[j:j + NGRAM] for j in range(len(name) - NGRAM + 1)}:
+                grams.setdefault(gram, set()).add(i)
+        self._grams = grams
+
+    def __len__(self):
+        return len(self.models)
+
+    def __contains__(self, model):
+        return model in self._positions
+
+    def positions(self, model):
+        """model所在的全部行位置"""
+        return self._positions.get(model, [])
+
+    def first_position(self, model):
+        """model第一次出现的行位置（与原来的 .iloc[0] 一致），不存在时返回None"""
+        positions = self._positions.get(model)
+        return positions[0] if positions else None
+
+    def first_row(self, model):
+        """model第一次出现的那一行，不存在时返回None"""
+        position = self.first_position(model)
+        return None if position is None else self.frame.iloc[position]
+
+    def search(self, query, limit=None):
+        """按前缀优先、其次子串的顺序返回匹配的model（忽略大小写）"""
+        query = query.strip().lower()
+        if not query:
+            return self.models[:limit] if limit else list(self.models)
+
+        start = bisect.bisect_left(self._prefix_sorted, query)
+        prefix_hits = []
+        for i in range(start, len(self._prefix_sorted)):
+            if not self._prefix_sorted[i].startswith(query):
+                break
+            prefix_hits.append(self._prefix_keys[i])
+        prefix_hits.sort()
+
+        if len(query) < NGRAM:
+            candidates = range(len(self.models))
+        else:
+            grams = [self._grams.get(query[j:j + NGRAM], set()) for j in range(len(query) - NGRAM + 1)]
+            candidates = sorted(set.intersection(*grams))
+        seen = set(prefix_hits)
+        substring_hits = [i for i in candidates if i not in seen and query in self._lowered[i]]
+
+        hits = prefix_hits + substring_hits
+        if limit:
+            hits = hits[:limit]
+        return [self.models[i] for i in hits]
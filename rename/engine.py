@@ -0,0 +1,177 @@
+"""重命名与配置复制计算（纯pandas，不依赖Streamlit）"""
+import csv
+import fnmatch
+import io
+import re
+from dataclasses import dataclass
+
+import pandas as pd
+
+from rename.configs import ConfigIndex
+from rename.rules import DEFAULT_RULES
+from rename.schema import derive
+
+CHANGE_COLUMNS = ['id', 'supplier_id', 'supplier_name', 'parent_model', 'old_model', 'new_model']
+CLONE_COLUMNS = ['source_model', 'supplier_id', 'parent_model', 'new_model']
+
+
+@dataclass
+class RenameResult:
+    """一次重命名的计算结果"""
+
+    frame: pd.DataFrame
+    """修改后的完整model_suppliers表"""
+    changes: pd.DataFrame
+    """变更集，列为 CHANGE_COLUMNS，索引与原表一致"""
+
+    def new_models_by_supplier(self):
+        """supplier_id → [(parent_model, 新model名称), ...]"""
+        return targets_by_supplier(self.changes)
+
+    def summary(self):
+        """按parent_model汇总的记录数和供应商数"""
+        return (self.changes.groupby('parent_model', sort=False, observed=True)
+                .agg(records=('id', 'size'), suppliers=('supplier_id', 'nunique'))
+                .reset_index())
+
+
+@dataclass
+class CloneResult:
+    """一次配置复制的计算结果"""
+
+    frame: pd.DataFrame
+    """新增的model_configs行，列顺序与原表一致"""
+    changes: pd.DataFrame
+    """每条新增配置的来源，列为 CLONE_COLUMNS"""
+
+
+def targets_by_supplier(changes):
+    """从变更集构建 supplier_id → [(parent_model, 新model名称), ...]，批量模式下一个供应商可对应多个parent_model"""
+    targets = {}
+    for supplier_id, parent_model, new_model in zip(changes['supplier_id'].tolist(),
+                                                    changes['parent_model'].tolist(),
+                                                    changes['new_model'].tolist()):
+        names = targets.setdefault(supplier_id, [])
+        if (parent_model, new_model) not in names:
+            names.append((parent_model, new_model))
+    return targets
+
+
+def _as_list(parent_models):
+    if isinstance(parent_models, str):
+        return [parent_models]
+    return list(parent_models)
+
+
+def parse_parent_models(text):
+    """解析粘贴的parent_model列表（换行或逗号分隔），去重并保持顺序"""
+    names = (name.strip() for name in re.split(r'[\n,]', text or ''))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _decode(data, filename):
+    # Excel在中文Windows上另存的CSV为GBK编码，UTF-8解码失败时按GB18030（兼容GBK）解码
+    for encoding in ('utf-8-sig', 'gb18030'):
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    raise ValueError(f"无法识别 {filename} 的编码，请保存为UTF-8或GBK编码")
+
+
+def read_parent_models_file(data, filename):
+    """从上传的CSV/TXT内容中读取parent_model列表；CSV优先取parent_model列，否则取第一列
+
+    文件编码无法识别时抛出ValueError。
+    """
+    text = _decode(data, filename) if isinstance(data, bytes) else data
+    if not filename.lower().endswith('.csv'):
+        return parse_parent_models(text)
+    rows = [row for row in csv.reader(io.StringIO(text)) if row]
+    if not rows:
+        return []
+    column = 0
+    header = [cell.strip() for cell in rows[0]]
+    if 'parent_model' in header:
+        column = header.index('parent_model')
+        rows = rows[1:]
+    return parse_parent_models('\n'.join(row[column] for row in rows if len(row) > column))
+
+
+def match_parent_models(parent_model_series, pattern):
+    """返回匹配通配符（如 qwen3-*）的所有parent_model"""
+    candidates = pd.Series(parent_model_series.dropna().unique()).astype(str)
+    return candidates[candidates.str.match(fnmatch.translate(pattern))].tolist()
+
+
+def parent_model_mask(df, parent_models):
+    """parent_model属于给定集合的行"""
+    return df['parent_model'].isin(_as_list(parent_models))
+
+
+def filter_by_parent_model(df, parent_models):
+    """根据parent_model筛选数据，可传单个名称或多个名称"""
+    return df[parent_model_mask(df, parent_models)].copy()
+
+
+def rename_suppliers(model_suppliers_df, supplier_index, parent_models, rules=None):
+    """一次性计算所有新model值，返回新表和变更集；原表不会被修改
+
+    新名称由命名规则（rules，默认为 <supplier_name小写>-<parent_model小写>）对整列生成。
+    """
+    mask = parent_model_mask(model_suppliers_df, parent_models)
+    matched = model_suppliers_df.loc[mask]
+    supplier_names = supplier_index.map(matched['supplier_id'])
+    new_models = (rules or DEFAULT_RULES).apply(matched['supplier_id'], supplier_names, matched['parent_model'],
+                                                matched['model'])
+
+    frame = derive(model_suppliers_df)
+    frame.loc[mask, 'model'] = new_models
+
+    changes = pd.DataFrame({
+        'id': matched['id'],
+        'supplier_id': matched['supplier_id'],
+        'supplier_name': supplier_names,
+        'parent_model': matched['parent_model'],
+        'old_model': matched['model'],
+        'new_model': new_models,
+    }, columns=CHANGE_COLUMNS)
+    return RenameResult(frame=frame, changes=changes)
+
+
+def clone_configs(model_configs_df, changes, selections, config_index=None):
+    """按 {源配置model: [supplier_id, ...]} 复制配置，新model名称取自重命名变更集
+
+    源配置通过config_index定位（同名配置取第一条），不传时临时构建；源配置不存在时抛出KeyError。
+    (源配置, 供应商) 选择与变更集按supplier_id整体连接，再一次take出所有新行，
+    保留原表的列顺序和dtype。
+    """
+    if selections:
+        if config_index is None:
+            config_index = ConfigIndex(model_configs_df)
+        missing = [source_model for source_model in selections if source_model not in config_index]
+        if missing:
+            raise KeyError(f"model_configs中不存在: {', '.join(map(str, missing))}")
+    empty = CloneResult(frame=model_configs_df.iloc[0:0].reset_index(drop=True),
+                        changes=pd.DataFrame(columns=CLONE_COLUMNS))
+    pairs = pd.DataFrame(
+        [(source_model, supplier_id) for source_model, supplier_ids in selections.items()
+         for supplier_id in supplier_ids],
+        columns=['source_model', 'supplier_id'],
+    )
+    targets = changes[['supplier_id', 'parent_model', 'new_model']].drop_duplicates()
+    if pairs.empty or targets.empty:
+        return empty
+
+    # 内连接保持左侧（选择）顺序，每个供应商内按变更集顺序展开
+    pairs['supplier_id'] = pairs['supplier_id'].astype(targets['supplier_id'].dtype)
+    clone_changes = pairs.merge(targets, on='supplier_id', how='inner')[CLONE_COLUMNS]
+    if clone_changes.empty:
+        # 选中的供应商都不在变更集中
+        return empty
+    positions = clone_changes['source_model'].map(
+        {source_model: config_index.first_position(source_model) for source_model in selections}
+    )
+    frame = model_configs_df.take(positions.to_numpy()).reset_index(drop=True)
+    frame['model'] = clone_changes['new_model'].to_numpy()
+    return CloneResult(frame=frame, changes=clone_changes)
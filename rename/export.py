@@ -0,0 +1,100 @@
+"""导出修改结果：xlsx用openpyxl只写模式逐行写出，另提供CSV/Parquet/JSONL（每张表一个文件，打包为zip）"""
+import math
+import threading
+import zipfile
+from collections import OrderedDict
+from io import BytesIO
+
+import pandas as pd
+
+from rename import columnar
+
+FORMATS = {
+    'xlsx': ('Excel (xlsx)', 'xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('CSV (zip)', 'zip', 'application/zip'),
+    'parquet': ('Parquet (zip)', 'zip', 'application/zip'),
+    'jsonl': ('JSONL (zip)', 'zip', 'application/zip'),
+}
+"""格式 → (显示名称, 文件扩展名, MIME类型)"""
+CHUNK_ROWS = 5000
+
+
+def available_formats():
+    """当前环境可用的导出格式（Parquet依赖pyarrow）"""
+    return [fmt for fmt in FORMATS if fmt != 'parquet' or columnar.available()]
+
+
+def _cell(value):
+    # openpyxl不接受NaN/NaT，空值写成空单元格
+    if value is None or (isinstance(value, float) and math.isnan(value)) or value is pd.NaT:
+        return None
+    return value
+
+
+def write_xlsx(sheets, output):
+    """{sheet名: DataFrame} 写成一个xlsx；只写模式下每行写出后即落到临时文件，内存占用不随行数增长"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    for name, df in sheets.items():
+        worksheet = workbook.create_sheet(title=name)
+        worksheet.append([str(column) for column in df.columns])
+        for start in range(0, len(df), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS].astype(object)
+            for row in chunk.itertuples(index=False, name=None):
+                worksheet.append([_cell(value) for value in row])
+    workbook.save(output)
+
+
+def _write_member(archive, filename, df, fmt):
+    with archive.open(filename, 'w') as member:
+        if fmt == 'csv':
+            # utf-8-sig 让Excel直接打开时中文不乱码
+            df.to_csv(member, index=False, encoding='utf-8-sig')
+        elif fmt == 'jsonl':
+            df.to_json(member, orient='records', lines=True, force_ascii=False)
+        else:
+            columnar.to_parquet(df, member)
+
+
+def build_export(sheets, fmt='xlsx'):
+    """按格式生成导出文件的内容（bytes）"""
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    output = BytesIO()
+    if fmt == 'xlsx':
+        write_xlsx(sheets, output)
+    else:
+        with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, df in sheets.items():
+                _write_member(archive, f'{name}.{fmt}', df, fmt)
+    return output.getvalue()
+
+
+class ExportCache:
+    """按 (执行ID, 格式) 缓存导出结果，只保留最近几份（进程内所有会话共享）"""
+
+    def __init__(self, max_entries=8):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, execution_id, fmt, sheets):
+        key = (execution_id, fmt)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        data = build_export(sheets, fmt)
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+    def cached(self, execution_id, fmt):
+        with self._lock:
+            return (execution_id, fmt) in self._entries
+
+
+export_cache = ExportCache()
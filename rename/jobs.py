@@ -0,0 +1,126 @@
+"""后台任务队列：执行在服务器进程的工作线程中运行，不依赖发起它的脚本运行
+
+同一目录（同一组工作簿）的任务由单个工作线程按提交顺序串行执行；
+任务状态保存在进程内，页面rerun、刷新或websocket重连后仍可按任务ID查询。
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from rename import timing
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+@dataclass
+class Job:
+    """一个后台任务的状态，字段由工作线程更新，读取方只读"""
+
+    id: str
+    key: str
+    """串行化所用的键（工作簿所在目录）"""
+    label: str
+    stages: list
+    status: str = QUEUED
+    stage: str = None
+    """当前阶段，取自stages"""
+    error: Exception = None
+    result: object = None
+    created: float = field(default_factory=time.time)
+    started: float = None
+    finished: float = None
+    timings: dict = field(default_factory=dict)
+    """各阶段耗时（秒）"""
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def progress(self):
+        """0~1，按已完成的阶段数计算"""
+        if self.status == DONE:
+            return 1.0
+        if self.stage is None:
+            return 0.0
+        return self.stages.index(self.stage) / len(self.stages)
+
+
+class JobQueue:
+    """按键串行执行任务，已结束的任务只保留最近 keep_finished 个"""
+
+    def __init__(self, keep_finished=50):
+        self.keep_finished = keep_finished
+        self._jobs = {}
+        self._executors = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, label, stages, func):
+        """提交任务；func(progress=...) 在工作线程中运行，progress(stage)用于报告阶段，返回值存入job.result"""
+        job = Job(id=uuid.uuid4().hex, key=key, label=label, stages=list(stages))
+        with self._lock:
+            self._jobs[job.id] = job
+            executor = self._executors.get(key)
+            if executor is None:
+                executor = self._executors[key] = ThreadPoolExecutor(max_workers=1,
+                                                                      thread_name_prefix='rename-job')
+            self._prune()
+        executor.submit(self._run, job, func)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, key=None):
+        """按提交顺序返回任务（可按键过滤）"""
+        with self._lock:
+            return [job for job in self._jobs.values() if key is None or job.key == key]
+
+    def pending(self, key):
+        """该键下尚未结束的任务数"""
+        return sum(1 for job in self.jobs(key) if job.active)
+
+    def _run(self, job, func):
+        job.status = RUNNING
+        job.started = time.time()
+        run = timing.begin(job.label)
+        stage_section = None
+
+        def progress(stage):
+            nonlocal stage_section
+            if stage_section is not None:
+                stage_section.__exit__(None, None, None)
+            job.stage = stage
+            stage_section = timing.section(stage)
+            stage_section.__enter__()
+
+        try:
+            job.result = func(progress=progress)
+            job.status = DONE
+        except Exception as e:
+            logger.exception("任务 %s 失败", job.label)
+            job.error = e
+            job.status = FAILED
+        finally:
+            if stage_section is not None:
+                stage_section.__exit__(None, None, None)
+            timing.end()
+            job.timings = dict(run.sections)
+            job.finished = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+
+job_queue = JobQueue()
@@ -0,0 +1,249 @@
+"""修改日志：每次执行写入的修改逐条追加到数据目录下的SQLite文件，只增不改
+
+entries 每行一条修改，按 (时间, seq) 及 表名/parent_model/执行ID + (时间, seq) 建索引，
+修改记录面板按条件以 (时间, seq) 为游标分页查询，翻页不随日志变长而变慢；
+model_configs的记录带写入后整行内容的哈希（row_hash），回滚时据此判断该行之后是否又被改过；
+executions 每行一次执行，记录写入前后两个数据文件的内容哈希，供核对和回滚使用。
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+import pandas as pd
+
+from rename import sqlstore
+from rename.config import settings
+from rename.loader import storage_path
+
+logger = logging.getLogger(__name__)
+
+TABLES = ('model_suppliers', 'model_configs')
+ENTRY_COLUMNS = ['seq', 'execution_id', 'ts', 'tbl', 'action', 'row_id', 'position', 'supplier_id',
+                 'parent_model', 'model', 'old_value', 'new_value', 'source_model', 'row_hash']
+EXECUTION_COLUMNS = ['execution_id', 'ts', 'label', 'model_suppliers_before', 'model_suppliers_after',
+                     'model_configs_before', 'model_configs_after', 'entries']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+    execution_id TEXT PRIMARY KEY,
+    ts REAL NOT NULL,
+    label TEXT,
+    model_suppliers_before TEXT,
+    model_suppliers_after TEXT,
+    model_configs_before TEXT,
+    model_configs_after TEXT,
+    entries INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    execution_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    tbl TEXT NOT NULL,
+    action TEXT NOT NULL,
+    row_id INTEGER,
+    position INTEGER,
+    supplier_id INTEGER,
+    parent_model TEXT,
+    model TEXT,
+    old_value TEXT,
+    new_value TEXT,
+    source_model TEXT,
+    row_hash TEXT
+);
+DROP INDEX IF EXISTS entries_tbl;
+DROP INDEX IF EXISTS entries_parent_model;
+DROP INDEX IF EXISTS entries_execution;
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts, seq);
+CREATE INDEX IF NOT EXISTS entries_tbl_ts ON entries (tbl, ts, seq);
+CREATE INDEX IF NOT EXISTS entries_parent_model_ts ON entries (parent_model, ts, seq);
+CREATE INDEX IF NOT EXISTS entries_execution_ts ON entries (execution_id, ts, seq);
+CREATE INDEX IF NOT EXISTS executions_ts ON executions (ts);
+CREATE TRIGGER IF NOT EXISTS entries_no_update BEFORE UPDATE ON entries
+    BEGIN SELECT RAISE(ABORT, 'journal is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS entries_no_delete BEFORE DELETE ON entries
+    BEGIN SELECT RAISE(ABORT, 'journal is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS executions_no_update BEFORE UPDATE ON executions
+    BEGIN SELECT RAISE(ABORT, 'journal is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS executions_no_delete BEFORE DELETE ON executions
+    BEGIN SELECT RAISE(ABORT, 'journal is append-only'); END;
+"""
+
+
+def file_hash(path):
+    """数据文件（列式主存储模式下为列式副本）内容的sha256，文件不存在时为None
+
+    sqlite主存储模式下各表共用一个数据库文件，改为记录表的版本号。
+    """
+    if settings.sqlite_primary:
+        table_version = sqlstore.version(path)
+        if table_version is not None:
+            return f'sqlite:{table_version}'
+    path = storage_path(os.path.abspath(path))
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _value(value):
+    # numpy标量和NaN转成sqlite可以保存的值
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _canonical(value):
+    # 与dtype无关的取值：空值为None，整数值的浮点数按整数（读写Excel后整数列可能变成浮点数）
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return None
+    value = _value(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def row_hash(row):
+    """一行内容（Series）的哈希，只取决于列名和取值，不受读写后dtype变化的影响"""
+    values = pd.Series([repr(_canonical(value)) for value in row.tolist()], index=row.index.astype(str),
+                       dtype=object)
+    return format(int(pd.util.hash_pandas_object(values, index=True).sum()), '016x')
+
+
+def plan_entries(plan):
+    """执行计划对应的修改记录（不含seq/execution_id/ts），按 ENTRY_COLUMNS 顺序
+
+    position记录行标签：即行位置，sqlite主存储下为rowid（读出的行只是表的一部分）。
+    """
+    rows = []
+    changes = plan.rename.changes
+    for position, change in zip(changes.index.tolist(), changes.to_dict('records')):
+        rows.append(('model_suppliers', '修改', change['id'], position, change['supplier_id'],
+                     change['parent_model'], change['new_model'], change['old_model'], change['new_model'], None,
+                     None))
+    # 新配置追加在表尾；sqlite主存储下的rowid写入时才确定，不记录位置，回滚时按model查找
+    start = None if settings.sqlite_primary else len(plan.model_configs_df)
+    for offset, clone in enumerate(plan.clone.changes.to_dict('records')):
+        position = None if start is None else start + offset
+        rows.append(('model_configs', '新增', None, position, clone['supplier_id'], clone['parent_model'],
+                     clone['new_model'], None, clone['new_model'], clone['source_model'],
+                     row_hash(plan.clone.frame.iloc[offset])))
+    # 覆盖记录保存被覆盖的原行（JSON），回滚时据此恢复；覆盖后的内容已在model_configs_df的原位置
+    for (position, previous), clone in zip(plan.replaced.iterrows(), plan.overwritten.to_dict('records')):
+        rows.append(('model_configs', '覆盖', None, position, clone['supplier_id'], clone['parent_model'],
+                     clone['new_model'], previous.to_json(force_ascii=False), clone['new_model'],
+                     clone['source_model'], row_hash(plan.model_configs_df.loc[position])))
+    return [tuple(_value(value) for value in row) for row in rows]
+
+
+class Journal:
+    """一个数据目录的修改日志；每次操作单独打开连接，可在多个线程中共用"""
+
+    def __init__(self, path):
+        self.path = path
+        self._ready = False
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(_SCHEMA)
+            columns = [row[1] for row in connection.execute('PRAGMA table_info(entries)')]
+            if 'row_hash' not in columns:
+                # 旧版日志没有row_hash列，补上后旧记录为NULL
+                connection.execute('ALTER TABLE entries ADD COLUMN row_hash TEXT')
+            self._ready = True
+        return closing(connection)
+
+    def record(self, execution_id, entries, hashes, label=None):
+        """在一个事务里追加一次执行及其全部修改记录；hashes为 {表名: (写入前哈希, 写入后哈希)}"""
+        ts = time.time()
+        suppliers = hashes.get('model_suppliers', (None, None))
+        configs = hashes.get('model_configs', (None, None))
+        with self._connect() as connection, connection:
+            connection.execute(
+                'INSERT INTO executions VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (execution_id, ts, label, *suppliers, *configs, len(entries)))
+            connection.executemany(
+                'INSERT INTO entries (execution_id, ts, tbl, action, row_id, position, supplier_id, parent_model,'
+                ' model, old_value, new_value, source_model, row_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(execution_id, ts, *entry) for entry in entries])
+
+    @staticmethod
+    def _where(table=None, parent_model=None, execution_id=None, before=None):
+        clauses, params = [], []
+        for column, value in (('tbl', table), ('parent_model', parent_model), ('execution_id', execution_id)):
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+        if before is not None:
+            clauses.append('(ts, seq) < (?, ?)')
+            params += [float(before[0]), int(before[1])]
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def has_entries(self):
+        """日志中是否有修改记录（只查第一行，不随日志变长而变慢）"""
+        with self._connect() as connection:
+            return connection.execute('SELECT EXISTS (SELECT 1 FROM entries LIMIT 1)').fetchone()[0] == 1
+
+    def query(self, table=None, parent_model=None, execution_id=None, limit=None, before=None):
+        """按条件查询修改记录，最新的在前，列为 ENTRY_COLUMNS
+
+        before为上一页最后一条记录的 (ts, seq)，只返回比它更早的记录（游标分页，走索引，不用OFFSET）。
+        """
+        where, params = self._where(table, parent_model, execution_id, before)
+        sql = f'SELECT {", ".join(ENTRY_COLUMNS)} FROM entries{where} ORDER BY ts DESC, seq DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._connect() as connection:
+            return pd.DataFrame(connection.execute(sql, params).fetchall(), columns=ENTRY_COLUMNS)
+
+    def execution(self, execution_id):
+        """一次执行的记录（dict，键为 EXECUTION_COLUMNS），不存在时为None"""
+        with self._connect() as connection:
+            row = connection.execute(f'SELECT {", ".join(EXECUTION_COLUMNS)} FROM executions WHERE execution_id = ?',
+                                     (execution_id,)).fetchone()
+        return dict(zip(EXECUTION_COLUMNS, row)) if row else None
+
+    def executions(self, limit=None):
+        """最近的执行，最新的在前，列为 EXECUTION_COLUMNS"""
+        sql = f'SELECT {", ".join(EXECUTION_COLUMNS)} FROM executions ORDER BY ts DESC'
+        params = []
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._connect() as connection:
+            return pd.DataFrame(connection.execute(sql, params).fetchall(), columns=EXECUTION_COLUMNS)
+
+
+_journals = {}
+
+
+def journal_for(directory='.'):
+    """数据目录对应的修改日志（settings.journal 为绝对路径时所有目录共用一个文件）"""
+    path = os.path.join(os.path.abspath(directory), os.path.expanduser(settings.journal))
+    journal = _journals.get(path)
+    if journal is None:
+        journal = _journals[path] = Journal(path)
+    return journal
+
+
+@contextmanager
+def journaled(directory, paths, execution_id, entries, label=None):
+    """包住一次写入（需在工作簿锁内）：写入成功后把修改记录和写入前后的文件哈希追加到修改日志
+
+    paths为 {表名: 文件路径}。文件已经写入，日志写失败只记录错误，不影响本次写入的结果。
+    """
+    before = {table: file_hash(path) for table, path in paths.items()}
+    yield
+    try:
+        hashes = {table: (before[table], file_hash(path)) for table, path in paths.items()}
+        journal_for(directory).record(execution_id, entries, hashes, label)
+    except Exception:
+        logger.exception("写入修改日志失败（执行 %s）", execution_id)
@@ -0,0 +1,544 @@
+"""Excel工作簿的加载与缓存
+
+解析结果按数据源指纹缓存在进程内，Streamlit的每次rerun和所有会话共享同一份。
+缓存中的DataFrame是共享对象，调用方修改前必须先 copy()。
+本地文件优先从列式副本读取（见 rename.columnar），只有xlsx变化后才重新解析；
+sqlite主存储模式下从数据库读取（见 rename.sqlstore），指纹为表的版本号，不整表读出，
+用到的行按索引查询（见 load_scope 等）。
+上传的文件由 upload_registry 按内容哈希解析一次并校验表结构，所有会话共用同一份；
+按表名命名工作表的组合工作簿（如导出的 modified_models.xlsx）可一次上传多张表。
+多张表都需要解析xlsx时交给进程池并发解析（见 parse_sheets），冷启动耗时接近最慢的一张。
+解析后按表结构压缩（见 rename.schema.compact），压缩前后的内存记录在 table_memory 中。
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import pandas as pd
+
+from rename import columnar, sqlstore, timing
+from rename.config import settings
+from rename.configs import ConfigIndex
+from rename.schema import REQUIRED_COLUMNS, compact, memory_usage, validate
+from rename.suppliers import SupplierIndex
+
+logger = logging.getLogger(__name__)
+
+SUPPLIER_FILE = 'supplier.xlsx'
+MODEL_SUPPLIERS_FILE = 'model_suppliers.xlsx'
+MODEL_CONFIGS_FILE = 'model_configs.xlsx'
+WORKBOOK_SHEETS = ('model_suppliers', 'model_configs', 'supplier')
+"""组合工作簿中按表名命名的工作表，与导出的 modified_models.xlsx 一致"""
+PARALLEL_MIN_BYTES = 1_000_000
+"""进程池尚未启动时，待解析的xlsx合计小于该大小就在当前进程依次解析（启动进程池比解析本身还慢）"""
+
+
+def _is_path(source):
+    return isinstance(source, (str, os.PathLike))
+
+
+table_memory = {}
+"""数据源名称 → (压缩前字节数, 压缩后字节数)，每次解析后更新"""
+
+
+def _compact(df, table, name):
+    if table not in REQUIRED_COLUMNS:
+        return df
+    before = memory_usage(df)
+    with timing.section('compact'):
+        df = compact(df, table)
+    table_memory[name] = (before, memory_usage(df))
+    return df
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _read_excel(source, sheet_name=0):
+    # 在工作进程中运行，source为路径或xlsx内容
+    if isinstance(source, bytes):
+        source = BytesIO(source)
+    return pd.read_excel(source, sheet_name=sheet_name)
+
+
+def _warm_up():
+    # 工作进程预先导入openpyxl，第一次解析时不再包含导入时间
+    import openpyxl  # noqa: F401
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # fork会把Streamlit服务器的线程和锁状态一起复制，工作进程改用forkserver/spawn启动
+            method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            _pool = ProcessPoolExecutor(settings.load_workers, mp_context=multiprocessing.get_context(method))
+        return _pool
+
+
+def start_pool():
+    """提前启动解析进程池（settings.load_workers > 1 时），返回是否启用了进程池"""
+    if settings.load_workers <= 1:
+        return False
+    executor = _executor()
+    for future in [executor.submit(_warm_up) for _ in range(settings.load_workers)]:
+        future.result()
+    return True
+
+
+def _size(source):
+    return len(source) if isinstance(source, bytes) else os.path.getsize(source)
+
+
+def parse_sheets(jobs):
+    """解析多个工作表，jobs为 [(路径或xlsx内容, 工作表名或序号)]，全部完成后按顺序返回DataFrame列表
+
+    settings.load_workers > 1 时在进程池中并发解析，总耗时接近最慢的一张；
+    进程池尚未启动且数据量小于 PARALLEL_MIN_BYTES 时在当前进程依次解析。
+    """
+    global _pool
+    if len(jobs) > 1 and settings.load_workers > 1:
+        sources = {id(source): source for source, _ in jobs}
+        if _pool is not None or sum(_size(source) for source in sources.values()) >= PARALLEL_MIN_BYTES:
+            executor = _executor()
+            try:
+                futures = [executor.submit(_read_excel, *job) for job in jobs]
+                return [future.result() for future in futures]
+            except BrokenProcessPool as e:
+                # 工作进程异常退出（如被OOM杀掉），丢弃进程池，这次改为依次解析
+                logger.warning("并发解析失败，改为依次解析: %s", e)
+                with _pool_lock:
+                    if _pool is executor:
+                        _pool = None
+                executor.shutdown(wait=False, cancel_futures=True)
+    return [_read_excel(*job) for job in jobs]
+
+
+def storage_path(path):
+    """实际保存数据的文件：列式/sqlite主存储模式下为已存在的列式副本/数据库，否则为xlsx本身"""
+    if settings.sqlite_primary:
+        database = sqlstore.database_path(os.path.dirname(os.path.abspath(path)))
+        if os.path.exists(database):
+            return database
+    if settings.columnar_primary and columnar.available():
+        sidecar = columnar.sidecar_path(path)
+        if os.path.exists(sidecar):
+            return sidecar
+    return path
+
+
+def snapshot(*sources):
+    """记录本地文件数据源当前的指纹 {绝对路径: 指纹}，上传的文件不记录"""
+    versions = {}
+    for source in sources:
+        if _is_path(source):
+            fp = fingerprint(source)
+            versions[fp[1]] = fp
+    return versions
+
+
+def _ensure_sidecar(path):
+    # 列式主存储的数据保存在列式副本中；还没有副本时先从xlsx生成，否则第一次读取后指纹会从xlsx变成副本
+    if columnar.available() and not os.path.exists(columnar.sidecar_path(path)) and os.path.exists(path):
+        refresh_sidecar(pd.read_excel(path), path, None)
+
+
+def fingerprint(source):
+    """计算数据源指纹：本地文件为 路径+mtime+size（sqlite主存储为 路径+表版本号），上传文件为内容哈希"""
+    if _is_path(source):
+        path = os.path.abspath(os.fspath(source))
+        if settings.sqlite_primary:
+            table_version = sqlstore.ensure_table(path)
+            if table_version is not None:
+                return ('file', path, 'sqlite', table_version)
+        if settings.columnar_primary:
+            _ensure_sidecar(path)
+        stat = os.stat(storage_path(path))
+        return ('file', path, stat.st_mtime_ns, stat.st_size)
+    if isinstance(source, UploadedTable):
+        return ('bytes',) + source.key
+    return ('bytes', hashlib.sha256(source.getvalue()).hexdigest())
+
+
+class WorkbookCache:
+    """按 (数据源指纹, 类型) 缓存解析结果，并统计命中/未命中次数"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source, kind, builder):
+        """命中则直接返回缓存，否则调用builder()构建并写入缓存"""
+        fp = fingerprint(source)
+        key = (fp, kind)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+        value = builder()
+        with self._lock:
+            self.misses += 1
+            if fp[0] == 'file':
+                # 同一路径的旧版本已经失效，顺手清掉
+                stale = [k for k in self._entries
+                         if k[1] == kind and k[0][0] == 'file' and k[0][1] == fp[1] and k[0] != fp]
+                for k in stale:
+                    del self._entries[k]
+            self._entries[key] = value
+        return value
+
+    def contains(self, source, kind):
+        key = (fingerprint(source), kind)
+        with self._lock:
+            return key in self._entries
+
+    def invalidate(self, path=None, digest=None):
+        """使某个本地文件或某个上传内容（包括其中所有工作表，都不传则为全部）的缓存失效"""
+        with self._lock:
+            if path is None and digest is None:
+                self._entries.clear()
+                return
+            if digest is not None:
+                stale = [k for k in self._entries if k[0][:2] == ('bytes', digest)]
+            else:
+                path = os.path.abspath(os.fspath(path))
+                stale = [k for k in self._entries if k[0][0] == 'file' and k[0][1] == path]
+            for key in stale:
+                del self._entries[key]
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+workbook_cache = WorkbookCache()
+
+
+class UploadedTable:
+    """会话持有的上传文件句柄，数据保存在 upload_registry 中；句柄被释放或回收时引用计数减一"""
+
+    def __init__(self, name, digest, table, sheet=None):
+        self.name = name
+        self.digest = digest
+        self.table = table
+        self.sheet = sheet
+        """组合工作簿中的工作表名，单表文件为None（读取第一个工作表）"""
+        self._finalizer = None
+
+    @property
+    def key(self):
+        return (self.digest, self.sheet)
+
+    def release(self):
+        """释放对共享数据的引用，可重复调用"""
+        if self._finalizer is not None:
+            self._finalizer()
+
+
+class UploadRegistry:
+    """上传文件的解析结果，按内容哈希在所有会话间共享，按引用计数释放"""
+
+    def __init__(self):
+        self._frames = {}
+        self._refs = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self.parses = 0
+
+    def register(self, uploaded_file, table):
+        """哈希并解析一次上传的文件，按表结构校验（不符时抛出SchemaError），返回 UploadedTable
+
+        同样内容的文件已被其他会话上传过时直接共用已解析的DataFrame。
+        """
+        return self._register(uploaded_file, {table: None})[table]
+
+    def register_workbook(self, uploaded_file):
+        """登记组合工作簿中按表名命名的工作表（见 WORKBOOK_SHEETS），各工作表并发解析，返回 {表名: UploadedTable}
+
+        没有任何这样的工作表时抛出ValueError，某个工作表不符合表结构时抛出SchemaError。
+        """
+        with pd.ExcelFile(BytesIO(uploaded_file.getvalue())) as workbook:
+            sheets = [sheet for sheet in WORKBOOK_SHEETS if sheet in workbook.sheet_names]
+        if not sheets:
+            raise ValueError(f"工作簿中没有 {'、'.join(WORKBOOK_SHEETS)} 中的任何一个工作表")
+        return self._register(uploaded_file, {sheet: sheet for sheet in sheets})
+
+    def _register(self, uploaded_file, sheets):
+        # sheets为 {表名: 工作表名}，工作表名为None时读取第一个工作表
+        name = getattr(uploaded_file, 'name', 'upload')
+        data = uploaded_file.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            frames = {table: self._frames.get((digest, sheet)) for table, sheet in sheets.items()}
+            sizes = {table: self._sizes.get((digest, sheet)) for table, sheet in sheets.items()
+                     if frames[table] is not None}
+        missing = [table for table, df in frames.items() if df is None]
+        for table, df in frames.items():
+            if df is not None:
+                validate(df, table)
+        if missing:
+            labels = {table: name if sheets[table] is None else f"{name}[{sheets[table]}]" for table in missing}
+            with timing.section(f"parse {', '.join(labels.values())}"):
+                parsed = parse_sheets([(data, 0 if sheets[table] is None else sheets[table]) for table in missing])
+            for table, df in zip(missing, parsed):
+                validate(df, table)
+            for table, df in zip(missing, parsed):
+                frames[table] = _compact(df, table, labels[table])
+                sizes[table] = memory_usage(frames[table])
+            with self._lock:
+                self.parses += len(missing)
+        handles = {}
+        with self._lock:
+            for table, sheet in sheets.items():
+                key = (digest, sheet)
+                # 并发上传同一文件时以先写入的为准
+                if key not in self._frames:
+                    self._frames[key] = frames[table]
+                    self._sizes[key] = sizes[table]
+                self._refs[key] = self._refs.get(key, 0) + 1
+                handles[table] = UploadedTable(name, digest, table, sheet)
+        for handle in handles.values():
+            handle._finalizer = weakref.finalize(handle, self._release, handle.key)
+        return handles
+
+    def _release(self, key):
+        with self._lock:
+            refs = self._refs.get(key, 0) - 1
+            if refs > 0:
+                self._refs[key] = refs
+                return
+            self._refs.pop(key, None)
+            self._frames.pop(key, None)
+            self._sizes.pop(key, None)
+        # 没有会话再使用这份内容，连同派生的索引一起释放
+        workbook_cache.invalidate(digest=key[0])
+
+    def frame(self, handle):
+        with self._lock:
+            df = self._frames.get(handle.key)
+        if df is None:
+            raise KeyError(f"上传的文件 {handle.name} 已被清除")
+        return df
+
+    def stats(self):
+        """返回共享的上传文件数、会话引用数、解析次数和占用内存（字节）"""
+        with self._lock:
+            return {
+                'entries': len(self._frames),
+                'refs': sum(self._refs.values()),
+                'parses': self.parses,
+                'bytes': sum(self._sizes.values()),
+            }
+
+
+upload_registry = UploadRegistry()
+
+
+def refresh_sidecar(df, path, stamp):
+    """尽力刷新列式副本，失败只记录日志"""
+    try:
+        columnar.write_sidecar(df, path, stamp)
+    except Exception as e:
+        # 列式副本只是加速手段，写失败时继续使用xlsx
+        logger.warning("写入 %s 的列式副本失败: %s", path, e)
+
+
+def _needs_parse(path):
+    """读取本地文件时是否要解析xlsx（列式副本不存在或已过期）"""
+    if settings.sqlite_primary:
+        return False
+    if settings.columnar_primary:
+        return not (columnar.available() and os.path.exists(columnar.sidecar_path(path)))
+    return not columnar.is_fresh(path, columnar.source_stamp(path))
+
+
+def _read_path(path, parsed=None):
+    # parsed为 load_tables 预先并发解析的 (源文件stamp, DataFrame)
+    if settings.sqlite_primary:
+        return sqlstore.read_table(path)
+    if parsed is not None:
+        stamp, df = parsed
+        # 解析之后xlsx又被修改，或列式副本已由其他线程生成时，不使用预先解析的结果
+        if stamp == columnar.source_stamp(path) and not (
+                settings.columnar_primary and os.path.exists(columnar.sidecar_path(path))):
+            refresh_sidecar(df, path, None if settings.columnar_primary else stamp)
+            return df
+    if settings.columnar_primary:
+        try:
+            df = columnar.read_sidecar(path)
+        except (OSError, ValueError) as e:
+            # 副本就是主存储，不能退回可能已过期的xlsx
+            raise ValueError(f"列式主存储 {columnar.sidecar_path(path)} 已损坏，无法读取（{e}）；"
+                             f"请从备份恢复，或删除该文件后从xlsx重新导入") from e
+        if df is None:
+            df = pd.read_excel(path)
+            refresh_sidecar(df, path, None)
+        return df
+
+    stamp = columnar.source_stamp(path)
+    try:
+        df = columnar.read_sidecar(path, stamp)
+    except Exception as e:
+        logger.warning("读取 %s 的列式副本失败，改为解析xlsx: %s", path, e)
+        df = None
+    if df is None:
+        df = pd.read_excel(path)
+        refresh_sidecar(df, path, stamp)
+    return df
+
+
+def _parse_source(source, parsed=None):
+    if isinstance(source, UploadedTable):
+        return upload_registry.frame(source)
+    name = os.path.basename(source) if _is_path(source) else getattr(source, 'name', 'upload')
+    with timing.section(f"parse {name}"):
+        if _is_path(source):
+            return _compact(_read_path(source, parsed), os.path.splitext(name)[0], name)
+        return pd.read_excel(BytesIO(source.getvalue()))
+
+
+def read_table(source, parsed=None):
+    """读取一个Excel表（带缓存），source为文件路径、UploadedTable或上传的文件对象"""
+    return workbook_cache.get(source, 'frame', lambda: _parse_source(source, parsed))
+
+
+def _prefetch(sources):
+    """未命中缓存且需要解析xlsx的本地文件有多个时一起并发解析，返回 {绝对路径: (源文件stamp, DataFrame)}"""
+    pending = {}
+    for source in sources:
+        if _is_path(source) and not workbook_cache.contains(source, 'frame'):
+            path = os.path.abspath(os.fspath(source))
+            if path not in pending and _needs_parse(path):
+                # 先记下stamp再解析，解析期间文件被修改时读取时能发现
+                pending[path] = columnar.source_stamp(path)
+    if len(pending) < 2:
+        return {}
+    with timing.section(f"parse {', '.join(os.path.basename(path) for path in pending)}"):
+        frames = parse_sheets([(path, 0) for path in pending])
+    return {path: (stamp, df) for (path, stamp), df in zip(pending.items(), frames)}
+
+
+def load_tables(model_suppliers_source=MODEL_SUPPLIERS_FILE, model_configs_source=MODEL_CONFIGS_FILE,
+                supplier_source=SUPPLIER_FILE):
+    """读取三张表，返回 (supplier_df, model_suppliers_df, model_configs_df)
+
+    需要解析xlsx的本地文件先一起并发解析，全部就绪后再返回。
+    """
+    sources = (supplier_source, model_suppliers_source, model_configs_source)
+    parsed = _prefetch(sources)
+
+    def read(source):
+        return read_table(source, parsed.get(os.path.abspath(os.fspath(source))) if _is_path(source) else None)
+
+    return tuple(read(source) for source in sources)
+
+
+def load_supplier_index(source=SUPPLIER_FILE):
+    """获取supplier表对应的SupplierIndex（带缓存，随supplier表一起失效）"""
+    return workbook_cache.get(source, 'supplier_index', lambda: SupplierIndex(read_table(source)))
+
+
+def load_config_index(source=MODEL_CONFIGS_FILE):
+    """获取model_configs表对应的ConfigIndex（带缓存，随model_configs表一起失效）"""
+    return workbook_cache.get(source, 'config_index', lambda: ConfigIndex(read_table(source)))
+
+
+def scoped(source):
+    """是否按需查询：sqlite主存储下的本地文件不整表读出，只按索引查询用到的行（行标签为rowid）"""
+    return settings.sqlite_primary and _is_path(source)
+
+
+def count_rows(source):
+    """表的行数；按需查询的表读取数据库中维护的行数"""
+    if scoped(source):
+        return sqlstore.row_count(source)
+    return len(read_table(source))
+
+
+def find_parent_models(source, pattern):
+    """model_suppliers中匹配通配符（如 qwen3-*）的parent_model，按首次出现的顺序返回"""
+    from rename.engine import match_parent_models
+
+    if scoped(source):
+        return sqlstore.match_parent_models(source, pattern)
+    return match_parent_models(read_table(source)['parent_model'], pattern)
+
+
+def search_configs(source, query, limit):
+    """按前缀优先、其次子串的顺序搜索model_configs的model名称，最多limit个"""
+    if scoped(source):
+        return sqlstore.search_models(source, query, limit)
+    return load_config_index(source).search(query, limit=limit)
+
+
+def load_rows(source, column, values):
+    """column取值在values中的行；按需查询的表按索引查询，其他数据源返回整张表"""
+    if scoped(source):
+        return sqlstore.select_rows(source, column, values)
+    return read_table(source)
+
+
+def load_supplier_scope(model_suppliers_source=MODEL_SUPPLIERS_FILE, supplier_source=SUPPLIER_FILE,
+                        parent_models=(), rules=None):
+    """重命名所需的model_suppliers行和SupplierIndex，返回 (model_suppliers_df, supplier_index)
+
+    按需查询时只读出parent_model命中的行，加上model与其新名称重名的行（冲突检查要用），
+    供应商名称按supplier_id关联supplier表查询；其他数据源为整张表和整份索引。
+    """
+    if not scoped(model_suppliers_source):
+        return read_table(model_suppliers_source), load_supplier_index(supplier_source)
+    from rename.engine import rename_suppliers
+
+    matched = sqlstore.select_rows(model_suppliers_source, 'parent_model', parent_models)
+    if scoped(supplier_source):
+        supplier_index = SupplierIndex(sqlstore.supplier_names(model_suppliers_source, supplier_source,
+                                                               parent_models))
+    else:
+        supplier_index = load_supplier_index(supplier_source)
+    new_models = rename_suppliers(matched, supplier_index, parent_models, rules).changes['new_model']
+    taken = sqlstore.select_rows(model_suppliers_source, 'model', new_models)
+    rows = pd.concat([matched, taken[~taken.index.isin(matched.index)]]).sort_index()
+    return rows, supplier_index
+
+
+def load_config_scope(model_configs_source=MODEL_CONFIGS_FILE, models=()):
+    """复制配置所需的model_configs行和ConfigIndex，返回 (model_configs_df, config_index)
+
+    按需查询时只读出model在models中的行（源配置和新名称），其他数据源为整张表和整份索引。
+    """
+    if not scoped(model_configs_source):
+        return read_table(model_configs_source), load_config_index(model_configs_source)
+    rows = sqlstore.select_rows(model_configs_source, 'model', models)
+    return rows, ConfigIndex(rows)
+
+
+def load_scope(model_suppliers_source=MODEL_SUPPLIERS_FILE, model_configs_source=MODEL_CONFIGS_FILE,
+               supplier_source=SUPPLIER_FILE, parent_models=(), source_models=(), rules=None):
+    """一次执行所需的数据，返回 (model_suppliers_df, model_configs_df, supplier_index, config_index)"""
+    from rename.engine import rename_suppliers
+
+    model_suppliers_df, supplier_index = load_supplier_scope(model_suppliers_source, supplier_source,
+                                                             parent_models, rules)
+    new_models = rename_suppliers(model_suppliers_df, supplier_index, parent_models, rules).changes['new_model']
+    model_configs_df, config_index = load_config_scope(model_configs_source, [*source_models, *new_models])
+    return model_suppliers_df, model_configs_df, supplier_index, config_index
+
+
+def sample_suppliers(model_suppliers_source=MODEL_SUPPLIERS_FILE, supplier_source=SUPPLIER_FILE, limit=200):
+    """按行顺序的前limit行model_suppliers及其SupplierIndex（未选择parent_model时预览命名规则用）"""
+    if not scoped(model_suppliers_source):
+        return read_table(model_suppliers_source).head(limit), load_supplier_index(supplier_source)
+    rows = sqlstore.head(model_suppliers_source, limit)
+    if scoped(supplier_source):
+        return rows, SupplierIndex(sqlstore.select_rows(supplier_source, 'id', rows['supplier_id']))
+    return rows, load_supplier_index(supplier_source)
@@ -0,0 +1,147 @@
+"""执行流程：计算重命名/复制计划并写回文件，UI和命令行共用"""
+import os
+import uuid
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from rename.config import settings
+from rename.configs import ConfigIndex
+from rename.engine import CLONE_COLUMNS, CloneResult, RenameResult, clone_configs, rename_suppliers
+from rename.journal import journaled, plan_entries
+from rename.loader import MODEL_CONFIGS_FILE, MODEL_SUPPLIERS_FILE
+from rename.storage import (
+    StorageError,
+    append_table,
+    check_versions,
+    edit_table,
+    patch_table,
+    replace_table,
+    transaction,
+    workbook_lock,
+)
+from rename.validation import resolve, validate
+
+
+@dataclass
+class ExecutionPlan:
+    """一次执行要写入的全部内容"""
+
+    rename: RenameResult
+    clone: CloneResult
+    model_configs_df: pd.DataFrame
+    """计算计划时的model_configs表，新配置追加在它后面（sqlite主存储下只含涉及的行，见 loader.load_scope）"""
+    versions: dict = field(default_factory=dict)
+    """计算计划所依据的本地文件指纹（见 loader.snapshot），提交前据此检查并发修改"""
+    rewrite_configs: bool = False
+    """model_configs_df本身有改动（覆盖已有配置），需整表写回（sqlite主存储下逐行替换）"""
+    overwritten: pd.DataFrame = field(default_factory=lambda: pd.DataFrame(columns=CLONE_COLUMNS))
+    """被新配置覆盖的已有配置，列为 CLONE_COLUMNS"""
+    replaced: pd.DataFrame = None
+    """被覆盖的原配置行，与overwritten逐行对应，index为model_configs_df中的行标签（sqlite主存储下为rowid）"""
+    execution_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    """执行ID，写入修改日志，也用作导出缓存的键"""
+
+    def __post_init__(self):
+        if self.replaced is None:
+            self.replaced = self.model_configs_df.iloc[:0]
+
+    @property
+    def model_configs_updated(self):
+        """执行后完整的model_configs表（已覆盖的配置在原位置，新配置追加在后面）"""
+        return pd.concat([self.model_configs_df, self.clone.frame], ignore_index=True)
+
+
+STAGES = {
+    'validate': '检查文件版本',
+    'rename': '计算重命名',
+    'clone': '复制配置并检查冲突',
+    'write_suppliers': '写入 model_suppliers',
+    'write_configs': '写入 model_configs',
+}
+"""一次执行依次经过的阶段 → 显示名称"""
+
+
+def _no_progress(stage):
+    pass
+
+
+def writes_local(versions, model_suppliers_path=MODEL_SUPPLIERS_FILE, model_configs_path=MODEL_CONFIGS_FILE):
+    """两张表是否都读自要写回的本地文件；任一张来自上传的文件时执行只在内存中进行，结果通过导出获取"""
+    return all(os.path.abspath(path) in versions for path in (model_suppliers_path, model_configs_path))
+
+
+def build_plan(model_suppliers_df, model_configs_df, supplier_index, parent_models, selections=None, versions=None,
+               config_index=None, rules=None):
+    """根据parent_model和 {源配置: [supplier_id]} 选择计算执行计划（未经冲突校验，见 validation）"""
+    rename = rename_suppliers(model_suppliers_df, supplier_index, parent_models, rules)
+    clone = clone_configs(model_configs_df, rename.changes, selections or {}, config_index)
+    return ExecutionPlan(rename=rename, clone=clone, model_configs_df=model_configs_df, versions=versions or {})
+
+
+def commit_plan(plan, model_suppliers_path=MODEL_SUPPLIERS_FILE, model_configs_path=MODEL_CONFIGS_FILE, progress=None,
+                label=None):
+    """在工作簿锁内检查版本并写回两张表，文件在读取后被修改过时抛出ConflictError
+
+    只改动变化的单元格、只追加新行（覆盖已有配置时整表写回，sqlite主存储下逐行替换）；计划依据的是上传的文件时抛出StorageError，
+    上传的数据不会写回本地文件。写入成功后在锁内把本次修改追加到数据目录的修改日志。
+    progress(stage) 在开始写每张表前调用，label 为日志中记录的执行说明。
+    """
+    if not writes_local(plan.versions, model_suppliers_path, model_configs_path):
+        raise StorageError("数据来自上传的文件，不会写回本地文件")
+    progress = progress or _no_progress
+    directory = os.path.dirname(os.path.abspath(model_suppliers_path))
+    paths = {'model_suppliers': model_suppliers_path, 'model_configs': model_configs_path}
+    with workbook_lock(directory):
+        check_versions(plan.versions)
+        # sqlite主存储模式下两张表在一个事务中提交，事务提交后再记录日志
+        with journaled(directory, paths, plan.execution_id, plan_entries(plan), label), transaction(directory):
+            _write_plan(plan, model_suppliers_path, model_configs_path, progress)
+
+
+def _write_plan(plan, model_suppliers_path, model_configs_path, progress):
+    progress('write_suppliers')
+    changes = plan.rename.changes
+    changed = changes[changes['old_model'] != changes['new_model']]
+    if not changed.empty:
+        patch_table(plan.rename.frame, model_suppliers_path, changed)
+
+    progress('write_configs')
+    if plan.rewrite_configs and not settings.sqlite_primary:
+        replace_table(plan.model_configs_updated, model_configs_path)
+        return
+    if plan.rewrite_configs:
+        # sqlite主存储下计划只含涉及的行，被覆盖的配置按rowid逐行替换
+        rows = plan.model_configs_df.loc[plan.replaced.index]
+        edit_table(plan.model_configs_updated, model_configs_path,
+                   [(label, model, row.to_dict())
+                    for (label, row), model in zip(rows.iterrows(), plan.replaced['model'].tolist())])
+    if not plan.clone.frame.empty:
+        append_table(plan.model_configs_updated, model_configs_path, plan.clone.frame)
+
+
+def run_execution(model_suppliers_df, model_configs_df, supplier_index, parent_models, selections, versions,
+                  config_index=None, policy='skip', model_suppliers_path=MODEL_SUPPLIERS_FILE,
+                  model_configs_path=MODEL_CONFIGS_FILE, progress=None, label=None, rules=None):
+    """按 STAGES 顺序完成一次执行：计算、冲突处理并写回，返回实际提交的执行计划
+
+    供后台任务调用；文件版本先检查一次以便尽早失败，写入时在锁内还会再检查。
+    rules为命名规则（见 rename.rules），不传时使用默认规则。
+    数据来自上传的文件时（见 writes_local）只计算和处理冲突，不写文件也不记入修改日志。
+    """
+    progress = progress or _no_progress
+    progress('validate')
+    check_versions(versions)
+
+    progress('rename')
+    rename = rename_suppliers(model_suppliers_df, supplier_index, parent_models, rules)
+
+    progress('clone')
+    clone = clone_configs(model_configs_df, rename.changes, selections, config_index)
+    plan = ExecutionPlan(rename=rename, clone=clone, model_configs_df=model_configs_df, versions=versions)
+    plan = resolve(plan, validate(plan, config_index or ConfigIndex(model_configs_df)), policy)
+    if not writes_local(versions, model_suppliers_path, model_configs_path):
+        return plan
+
+    commit_plan(plan, model_suppliers_path, model_configs_path, progress, label)
+    return plan
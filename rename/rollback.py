@@ -0,0 +1,249 @@
+"""按执行ID回滚：根据修改日志恢复model_suppliers的原model、删除新增的配置、还原被覆盖的配置
+
+日志记录了每条修改所在的行标签（行位置，sqlite主存储下为rowid），回滚时先按它核对主键，
+不符时才建立 主键→位置 索引；sqlite主存储下只按日志中的id和model查询涉及的行（见 load_rollback_tables）。
+model_configs的行还要与日志中写入后内容的哈希一致，之后又被改过的行跳过。
+写回时只改动涉及的单元格和行；回滚本身也作为一次执行追加到修改日志。
+"""
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from rename.journal import file_hash, journal_for, journaled, row_hash
+from rename.loader import MODEL_CONFIGS_FILE, MODEL_SUPPLIERS_FILE, load_config_scope, load_rows
+from rename.schema import derive
+from rename.storage import check_versions, edit_table, patch_table, transaction, workbook_lock
+
+DIFF_COLUMNS = ['table', 'action', 'model', 'supplier_id', 'position', 'current', 'restored', 'status']
+ACTIONS = {'修改': '恢复原名', '新增': '删除', '覆盖': '还原', '还原': '还原'}
+"""日志中的操作 → 回滚时的操作，不在其中的（如回滚产生的删除）不支持回滚"""
+STATUS_LABELS = {
+    'ok': '可回滚',
+    'changed': '之后已被修改，跳过',
+    'missing': '记录已不存在，跳过',
+    'unsupported': '不支持回滚，跳过',
+}
+
+
+class RollbackError(Exception):
+    """要回滚的执行在修改日志中不存在"""
+
+
+@dataclass
+class RollbackPlan:
+    """一次回滚要写入的内容，diff即dry-run时展示的差异"""
+
+    execution_id: str
+    diff: pd.DataFrame
+    """每条日志记录一行，列为 DIFF_COLUMNS"""
+    model_suppliers_df: pd.DataFrame
+    """回滚后的model_suppliers表"""
+    model_configs_df: pd.DataFrame
+    """回滚后的model_configs表"""
+    supplier_changes: pd.DataFrame
+    """model_suppliers要恢复的model，列为 id/new_model，索引为原表中的行标签"""
+    config_replacements: list
+    """[(行标签, model, {列名: 值})]"""
+    config_deletions: list
+    """[(行标签, model)]"""
+    changed_files: list = field(default_factory=list)
+    """该执行之后又被写入过的表，回滚时逐行核对"""
+    versions: dict = field(default_factory=dict)
+    rollback_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    entries: list = field(default_factory=list)
+    """回滚本身要追加到修改日志的记录"""
+
+    @property
+    def empty(self):
+        return self.supplier_changes.empty and not self.config_replacements and not self.config_deletions
+
+
+def _positions(values):
+    """值 → 第一次出现的位置"""
+    positions = {}
+    for position, value in enumerate(values):
+        positions.setdefault(value, position)
+    return positions
+
+
+def _label_positions(index):
+    """行标签 → 行位置；整张表的标签就是位置，sqlite主存储下读出的部分行以rowid为标签"""
+    if isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1:
+        return lambda label: label
+    positions = dict(zip(index.tolist(), range(len(index))))
+    return positions.get
+
+
+def _locate(values, position, key, lookup):
+    """先按日志中的位置核对，不符时用lookup(key)查找，找不到时为None"""
+    if position is not None and 0 <= position < len(values) and values[position] == key:
+        return position
+    return lookup(key)
+
+
+def _lazy(build):
+    cache = []
+
+    def get():
+        if not cache:
+            cache.append(build())
+        return cache[0]
+
+    return get
+
+
+def _with_categories(df, rows):
+    """分类列补上要写回的取值（分类列不能写入分类以外的值）"""
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            values = {row.get(column) for row in rows} - {None}
+            missing = [value for value in values if value not in df[column].cat.categories]
+            if missing:
+                df[column] = df[column].cat.add_categories(missing)
+    return df
+
+
+def load_rollback_tables(execution_id, model_suppliers_path=MODEL_SUPPLIERS_FILE,
+                         model_configs_path=MODEL_CONFIGS_FILE):
+    """回滚要核对的数据，返回 (model_suppliers_df, model_configs_df, config_index)
+
+    sqlite主存储下只按日志中的id和model查询涉及的行，其他模式下为整张表。
+    """
+    entries = journal_for(os.path.dirname(os.path.abspath(model_suppliers_path))).query(execution_id=execution_id)
+    suppliers = entries[entries['tbl'] == 'model_suppliers']
+    configs = entries[entries['tbl'] == 'model_configs']
+    model_suppliers_df = load_rows(model_suppliers_path, 'id', suppliers['row_id'].dropna().astype(int).tolist())
+    model_configs_df, config_index = load_config_scope(model_configs_path, configs['model'].dropna().tolist())
+    return model_suppliers_df, model_configs_df, config_index
+
+
+def plan_rollback(execution_id, model_suppliers_df, model_configs_df, versions=None, config_index=None,
+                  model_suppliers_path=MODEL_SUPPLIERS_FILE, model_configs_path=MODEL_CONFIGS_FILE):
+    """根据修改日志计算回滚计划（不写文件），执行不存在时抛出RollbackError"""
+    journal = journal_for(os.path.dirname(os.path.abspath(model_suppliers_path)))
+    execution = journal.execution(execution_id)
+    if execution is None:
+        raise RollbackError(f"修改日志中没有执行 {execution_id}")
+    entries = journal.query(execution_id=execution_id).iloc[::-1]
+    changed_files = [table for table, path in (('model_suppliers', model_suppliers_path),
+                                               ('model_configs', model_configs_path))
+                     if file_hash(path) != execution[f'{table}_after']]
+
+    ids = model_suppliers_df['id'].tolist()
+    models = model_suppliers_df['model'].tolist()
+    config_models = model_configs_df['model'].tolist()
+    supplier_labels, config_labels = model_suppliers_df.index, model_configs_df.index
+    supplier_position = _label_positions(supplier_labels)
+    config_position = _label_positions(config_labels)
+    id_index = _lazy(lambda: _positions(ids))
+    find_supplier = lambda row_id: id_index().get(row_id)
+    if config_index is not None:
+        find_config = config_index.first_position
+    else:
+        model_index = _lazy(lambda: _positions(config_models))
+        find_config = lambda model: model_index().get(model)
+
+    diff, rollback_entries = [], []
+    supplier_positions, supplier_values = [], []
+    replacements, deletions = [], []
+    for entry in entries.to_dict('records'):
+        label = None if pd.isna(entry['position']) else int(entry['position'])
+        action = ACTIONS.get(entry['action'])
+        current = restored = None
+        status = 'ok'
+        if action is None:
+            status = 'unsupported'
+        elif entry['tbl'] == 'model_suppliers':
+            position = _locate(ids, None if label is None else supplier_position(label), entry['row_id'],
+                               find_supplier)
+            if position is None:
+                status = 'missing'
+            else:
+                label = int(supplier_labels[position])
+                current, restored = models[position], entry['old_value']
+                if current != entry['new_value']:
+                    status = 'changed'
+                else:
+                    supplier_positions.append(position)
+                    supplier_values.append(restored)
+                    rollback_entries.append(('model_suppliers', '修改', entry['row_id'], label,
+                                             entry['supplier_id'], entry['parent_model'], restored, current,
+                                             restored, None, None))
+        else:
+            position = _locate(config_models, None if label is None else config_position(label), entry['model'],
+                               find_config)
+            if position is None:
+                status = 'missing'
+            else:
+                label = int(config_labels[position])
+                current = config_models[position]
+                row = model_configs_df.iloc[position]
+                # 旧版日志没有row_hash，只按model核对
+                if pd.notna(entry['row_hash']) and row_hash(row) != entry['row_hash']:
+                    status = 'changed'
+                elif action == '删除':
+                    deletions.append((position, current))
+                    rollback_entries.append(('model_configs', '删除', None, label, entry['supplier_id'],
+                                             entry['parent_model'], current, row.to_json(force_ascii=False),
+                                             None, None, None))
+                else:
+                    values = json.loads(entry['old_value'])
+                    restored = values.get('model')
+                    replacements.append((position, current, values))
+                    restored_row = pd.Series([values.get(column) for column in model_configs_df.columns],
+                                             index=model_configs_df.columns)
+                    rollback_entries.append(('model_configs', '还原', None, label, entry['supplier_id'],
+                                             entry['parent_model'], restored, row.to_json(force_ascii=False),
+                                             restored, None, row_hash(restored_row)))
+        diff.append((entry['tbl'], action or entry['action'], entry['model'], entry['supplier_id'], label,
+                     current, restored, status))
+
+    model_suppliers_updated = model_suppliers_df
+    supplier_changes = pd.DataFrame({
+        'id': [ids[position] for position in supplier_positions],
+        'new_model': supplier_values,
+    }, index=model_suppliers_df.index[supplier_positions])
+    if supplier_positions:
+        model_suppliers_updated = derive(model_suppliers_df)
+        model_suppliers_updated.loc[supplier_changes.index, 'model'] = supplier_changes['new_model']
+
+    model_configs_updated = model_configs_df
+    if replacements or deletions:
+        model_configs_updated = _with_categories(derive(model_configs_df),
+                                                 [values for _, _, values in replacements])
+        for position, _, values in replacements:
+            model_configs_updated.iloc[position] = [values.get(column) for column in model_configs_df.columns]
+        model_configs_updated = model_configs_updated.drop(
+            index=model_configs_df.index[[position for position, _ in deletions]]).reset_index(drop=True)
+
+    return RollbackPlan(
+        execution_id=execution_id,
+        diff=pd.DataFrame(diff, columns=DIFF_COLUMNS),
+        model_suppliers_df=model_suppliers_updated,
+        model_configs_df=model_configs_updated,
+        supplier_changes=supplier_changes,
+        config_replacements=[(int(config_labels[position]), model, values)
+                             for position, model, values in replacements],
+        config_deletions=[(int(config_labels[position]), model) for position, model in deletions],
+        changed_files=changed_files,
+        versions=versions or {},
+        entries=rollback_entries,
+    )
+
+
+def commit_rollback(plan, model_suppliers_path=MODEL_SUPPLIERS_FILE, model_configs_path=MODEL_CONFIGS_FILE):
+    """在工作簿锁内检查版本并写回回滚计划，文件在读取后被修改过时抛出ConflictError"""
+    directory = os.path.dirname(os.path.abspath(model_suppliers_path))
+    paths = {'model_suppliers': model_suppliers_path, 'model_configs': model_configs_path}
+    with workbook_lock(directory):
+        check_versions(plan.versions)
+        with journaled(directory, paths, plan.rollback_id, plan.entries, f"回滚 {plan.execution_id[:8]}"), \
+                transaction(directory):
+            if not plan.supplier_changes.empty:
+                patch_table(plan.model_suppliers_df, model_suppliers_path, plan.supplier_changes)
+            if plan.config_replacements or plan.config_deletions:
+                edit_table(plan.model_configs_df, model_configs_path, plan.config_replacements,
+                           plan.config_deletions)
@@ -0,0 +1,279 @@
+"""命名规则：新model名称由规则配置生成，规则编译一次后对整列做向量化字符串运算
+
+规则配置为JSON（默认为数据目录下的 rename_rules.json，见 settings.rules_file），文件不存在时使用 DEFAULT_CONFIG。
+示例:
+    {
+        "template": "{supplier_name}-{parent_model}",
+        "fields": {"supplier_name": ["lower"], "parent_model": ["lower"]},
+        "suppliers": {"azure": {"prefix": "az/"}, "8": {"name": "volc"}},
+        "exceptions": [
+            {"pattern": "^text-embedding-", "keep": true},
+            {"pattern": "(?i)^sora-", "suppliers": ["openai"], "template": "{parent_model}"}
+        ]
+    }
+
+每条规则可设置 template、fields（字段 → 变换列表）、prefix、suffix、normalize（对整个结果的变换）和
+name（替换模板中的supplier_name）；suppliers 按supplier_id或supplier_name（不区分大小写）覆盖默认规则中的这些项，
+exceptions 按正则匹配parent_model，第一条匹配的生效，keep 为 true 时保留原model。
+优先级：exceptions > suppliers > 默认规则。
+"""
+import json
+import os
+import re
+import string
+import threading
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from rename.config import settings
+from rename.storage import atomic_output
+
+FIELDS = ('supplier_name', 'parent_model', 'supplier_id', 'model')
+"""模板中可用的字段"""
+TRANSFORMS = {
+    'lower': lambda values: values.str.lower(),
+    'upper': lambda values: values.str.upper(),
+    'strip': lambda values: values.str.strip(),
+    # ASCII字母、数字、下划线和点以外的字符（含连字符）连续出现时替换为一个连字符
+    'slug': lambda values: values.str.replace(r'[^0-9A-Za-z_.]+', '-', regex=True).str.strip('-'),
+}
+"""可用的字符串变换，均为整列运算"""
+RULE_KEYS = {'template', 'fields', 'prefix', 'suffix', 'normalize', 'name'}
+EXCEPTION_KEYS = RULE_KEYS | {'pattern', 'suppliers', 'keep'}
+DEFAULT_CONFIG = {
+    'template': '{supplier_name}-{parent_model}',
+    'fields': {'supplier_name': ['lower'], 'parent_model': ['lower']},
+    'prefix': '',
+    'suffix': '',
+    'normalize': [],
+    'suppliers': {},
+    'exceptions': [],
+}
+"""默认规则：<supplier_name小写>-<parent_model小写>"""
+
+
+class RuleError(ValueError):
+    """规则配置不正确"""
+
+
+def _transforms(names, where):
+    if not isinstance(names, list) or any(name not in TRANSFORMS for name in names):
+        raise RuleError(f"{where} 的变换必须是 {', '.join(TRANSFORMS)} 组成的列表: {names!r}")
+    return [TRANSFORMS[name] for name in names]
+
+
+class Rule:
+    """编译后的一条规则：模板拆成字面量和字段，字段和结果的变换都作用于整列"""
+
+    def __init__(self, spec, where='默认规则'):
+        template = spec.get('template', '')
+        if not isinstance(template, str) or not template:
+            raise RuleError(f"{where} 缺少模板")
+        try:
+            parsed = list(string.Formatter().parse(template))
+        except ValueError as e:
+            raise RuleError(f"{where} 的模板格式不正确: {e}") from None
+        self.parts = []
+        for literal, field, format_spec, conversion in parsed:
+            if literal:
+                self.parts.append((literal, None))
+            if field is None:
+                continue
+            if field not in FIELDS or format_spec or conversion:
+                raise RuleError(f"{where} 的模板中有未知字段 {{{field}}}，可用字段: {', '.join(FIELDS)}")
+            self.parts.append((None, field))
+        self.used = {field for _, field in self.parts if field is not None}
+        """模板中用到的字段"""
+        fields = spec.get('fields', {})
+        if not isinstance(fields, dict) or any(field not in FIELDS for field in fields):
+            raise RuleError(f"{where} 的 fields 只能包含 {', '.join(FIELDS)}")
+        self.fields = {field: _transforms(names, f"{where} 的 {field}") for field, names in fields.items()}
+        self.normalize = _transforms(spec.get('normalize', []), f"{where} 的 normalize")
+        self.prefix = str(spec.get('prefix') or '')
+        self.suffix = str(spec.get('suffix') or '')
+        self.name = spec.get('name')
+
+    def apply(self, columns):
+        """columns为 {字段: 字符串Series}（同一索引），返回生成的名称"""
+        index = columns['parent_model'].index
+        values = {}
+        for field in self.used:
+            if field == 'supplier_name' and self.name is not None:
+                column = pd.Series(str(self.name), index=index, dtype='str')
+            else:
+                column = columns[field]
+            for transform in self.fields.get(field, []):
+                column = transform(column)
+            values[field] = column
+        result = None
+        for literal, field in self.parts:
+            piece = literal if field is None else values[field]
+            result = piece if result is None else result + piece
+        if isinstance(result, str) or result is None:
+            # 模板中没有字段时每行都是同一个名称
+            result = pd.Series(result or '', index=index, dtype='str')
+        if self.prefix:
+            result = self.prefix + result
+        if self.suffix:
+            result = result + self.suffix
+        for transform in self.normalize:
+            result = transform(result)
+        return result
+
+
+def _merge(base, override):
+    spec = dict(base, **override)
+    spec['fields'] = dict(base.get('fields', {}), **override.get('fields', {}))
+    return spec
+
+
+class RuleSet:
+    """一份规则配置编译后的结果，apply() 对整批行生成新名称"""
+
+    def __init__(self, config=None):
+        config = DEFAULT_CONFIG if config is None else config
+        if not isinstance(config, dict):
+            raise RuleError("规则配置必须是JSON对象")
+        unknown = set(config) - RULE_KEYS - {'suppliers', 'exceptions'}
+        if unknown:
+            raise RuleError(f"规则配置中有未知的键: {', '.join(sorted(unknown))}")
+        self.config = config
+        base = _merge(DEFAULT_CONFIG, {key: config[key] for key in RULE_KEYS if key in config})
+        self.default = Rule(base)
+
+        suppliers = config.get('suppliers', {})
+        if not isinstance(suppliers, dict):
+            raise RuleError("suppliers 必须是 {supplier_id或名称: 规则} 对象")
+        self.suppliers = []
+        for key, override in suppliers.items():
+            where = f"供应商 {key}"
+            if not isinstance(override, dict) or set(override) - RULE_KEYS:
+                raise RuleError(f"{where} 的规则只能包含 {', '.join(sorted(RULE_KEYS))}")
+            self.suppliers.append((str(key).lower(), where, Rule(_merge(base, override), where)))
+
+        exceptions = config.get('exceptions', [])
+        if not isinstance(exceptions, list):
+            raise RuleError("exceptions 必须是列表")
+        self.exceptions = []
+        for number, exception in enumerate(exceptions, 1):
+            where = f"例外 {number}"
+            if not isinstance(exception, dict) or set(exception) - EXCEPTION_KEYS or 'pattern' not in exception:
+                raise RuleError(f"{where} 必须包含 pattern，且只能包含 {', '.join(sorted(EXCEPTION_KEYS))}")
+            try:
+                re.compile(exception['pattern'])
+            except re.error as e:
+                raise RuleError(f"{where} 的正则表达式不正确: {e}") from None
+            keys = {str(key).lower() for key in exception.get('suppliers', [])}
+            rule = None if exception.get('keep') else Rule(
+                _merge(base, {key: value for key, value in exception.items() if key in RULE_KEYS}), where)
+            self.exceptions.append((exception['pattern'], keys, where, rule))
+
+        # 只把用得到的字段转成字符串列
+        rules = [self.default] + [rule for _, _, rule in self.suppliers] + \
+                [rule for _, _, _, rule in self.exceptions if rule is not None]
+        self.fields = {'parent_model'}.union(*(rule.used for rule in rules))
+        if self.suppliers or any(keys for _, keys, _, _ in self.exceptions):
+            self.fields |= {'supplier_id', 'supplier_name'}
+        if any(rule is None for _, _, _, rule in self.exceptions):
+            self.fields.add('model')
+
+    @classmethod
+    def from_json(cls, text):
+        try:
+            return cls(json.loads(text))
+        except json.JSONDecodeError as e:
+            raise RuleError(f"规则配置不是有效的JSON: {e}") from None
+
+    def _assign(self, columns):
+        """按优先级把每行分给一条规则，返回 [(规则说明, 行掩码, Rule或None)]，None表示保留原model"""
+        taken = np.zeros(len(columns['parent_model']), dtype=bool)
+        assignments = []
+        supplier_keys = None
+        if self.suppliers or any(keys for _, keys, _, _ in self.exceptions):
+            supplier_keys = (columns['supplier_id'], columns['supplier_name'].str.lower())
+
+        def matches(keys):
+            ids, names = supplier_keys
+            return (ids.isin(keys) | names.isin(keys)).to_numpy()
+
+        for pattern, keys, where, rule in self.exceptions:
+            mask = columns['parent_model'].str.contains(pattern, regex=True).to_numpy(dtype=bool, na_value=False)
+            if keys:
+                mask = mask & matches(keys)
+            mask = mask & ~taken
+            if mask.any():
+                assignments.append((where, mask, rule))
+                taken |= mask
+        for key, where, rule in self.suppliers:
+            mask = matches({key}) & ~taken
+            if mask.any():
+                assignments.append((where, mask, rule))
+                taken |= mask
+        if not taken.all():
+            assignments.append(('默认规则', ~taken, self.default))
+        return assignments
+
+    def _columns(self, supplier_ids, supplier_names, parent_models, models):
+        if models is None:
+            models = pd.Series(np.nan, index=parent_models.index)
+        sources = {'supplier_id': supplier_ids, 'supplier_name': supplier_names, 'parent_model': parent_models,
+                   'model': models}
+        return {field: sources[field].astype('str') for field in self.fields}
+
+    def apply(self, supplier_ids, supplier_names, parent_models, models=None):
+        """按规则生成新model名称，参数为同一索引的Series（models为原model，keep例外需要），返回同索引的Series"""
+        columns = self._columns(supplier_ids, supplier_names, parent_models, models)
+        assignments = self._assign(columns)
+        if len(assignments) == 1 and assignments[0][2] is not None:
+            return assignments[0][2].apply(columns)
+        result = pd.Series('', index=parent_models.index, dtype='str')
+        for _, mask, rule in assignments:
+            subset = {field: column[mask] for field, column in columns.items()}
+            values = subset['model'] if rule is None else rule.apply(subset)
+            result[mask] = values.to_numpy()
+        return result
+
+    def explain(self, supplier_ids, supplier_names, parent_models, models=None):
+        """每行生效的规则说明（同一索引的Series），供预览使用"""
+        columns = self._columns(supplier_ids, supplier_names, parent_models, models)
+        labels = pd.Series('', index=parent_models.index, dtype='str')
+        for where, mask, rule in self._assign(columns):
+            labels[mask] = where if rule is not None else f"{where}（保留原名）"
+        return labels
+
+
+DEFAULT_RULES = RuleSet()
+
+_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _compile(path, mtime_ns, size):
+    with open(path, encoding='utf-8') as f:
+        return RuleSet.from_json(f.read())
+
+
+def rules_path(directory='.'):
+    """数据目录对应的规则配置文件（settings.rules_file 为绝对路径时所有目录共用）"""
+    return os.path.join(os.path.abspath(directory), os.path.expanduser(settings.rules_file))
+
+
+def load_rules(path):
+    """读取并编译规则配置（按文件修改时间缓存），文件不存在时返回 DEFAULT_RULES，配置不正确时抛出RuleError"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return DEFAULT_RULES
+    with _lock:
+        return _compile(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def save_rules(path, text):
+    """校验并原子写入规则配置，返回编译后的RuleSet，配置不正确时抛出RuleError且不写文件"""
+    rules = RuleSet.from_json(text)
+    with atomic_output(path) as tmp:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+    return rules
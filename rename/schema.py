@@ -0,0 +1,134 @@
+"""各表的必需列及其类型：上传文件时据此校验，加载后据此压缩内存表示"""
+import numpy as np
+import pandas as pd
+
+REQUIRED_COLUMNS = {
+    'supplier': {'id': 'integer', 'supplier_name': 'string'},
+    'model_suppliers': {'id': 'integer', 'supplier_id': 'integer', 'parent_model': 'string', 'model': 'string'},
+    'model_configs': {'model': 'string'},
+}
+"""表 → {必需列: 类型}，必需列不允许空值"""
+ID_COLUMNS = {
+    'supplier': ['id'],
+    'model_suppliers': ['id', 'supplier_id'],
+}
+"""整数主键/外键列，加载后压缩为能容纳其取值的最小整数类型"""
+WRITABLE_COLUMNS = {
+    'model_suppliers': ['model'],
+    'model_configs': ['model'],
+}
+"""执行时会写入新值的文本列，保持为字符串（分类列不能写入分类以外的值）"""
+COPY_ON_WRITE = int(pd.__version__.split('.')[0]) >= 3 or pd.options.mode.copy_on_write is True
+TABLE_LABELS = {
+    'supplier': 'Supplier',
+    'model_suppliers': 'Model Suppliers',
+    'model_configs': 'Model Configs',
+}
+
+
+class SchemaError(ValueError):
+    """表缺少必需列或类型不符"""
+
+    def __init__(self, table, problems):
+        self.table = table
+        self.problems = problems
+        super().__init__(f"{TABLE_LABELS.get(table, table)} 表格式不正确: {'；'.join(problems)}")
+
+
+def _integral(series):
+    if pd.api.types.is_integer_dtype(series.dtype):
+        return True
+    if pd.api.types.is_float_dtype(series.dtype):
+        return bool((series.dropna() % 1 == 0).all())
+    return False
+
+
+def _text(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.cat.categories.to_series()
+    return pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty')
+
+
+def check(df, table):
+    """返回df不符合表结构的问题列表，为空表示通过"""
+    problems = []
+    missing = [column for column in REQUIRED_COLUMNS[table] if column not in df.columns]
+    if missing:
+        problems.append(f"缺少列 {', '.join(missing)}")
+    for column, kind in REQUIRED_COLUMNS[table].items():
+        if column not in df.columns:
+            continue
+        values = df[column]
+        nulls = int(values.isna().sum())
+        if nulls:
+            problems.append(f"{column} 有 {nulls} 个空值")
+            if nulls == len(values):
+                continue
+        if kind == 'integer' and not _integral(values):
+            problems.append(f"{column} 应为整数")
+        elif kind == 'string' and not _text(values):
+            problems.append(f"{column} 应为文本")
+    return problems
+
+
+def validate(df, table):
+    """不符合表结构时抛出SchemaError"""
+    problems = check(df, table)
+    if problems:
+        raise SchemaError(table, problems)
+    return df
+
+
+def memory_usage(df):
+    """DataFrame占用的内存（字节，含字符串内容）"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _string_dtype():
+    # 空值为NaN的Arrow字符串：pandas 2.3起用 na_value 指定，2.1/2.2 为 'pyarrow_numpy'
+    try:
+        return pd.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        return pd.StringDtype('pyarrow_numpy')
+
+
+def _arrow_string(series):
+    # pandas 3 默认已是Arrow字符串；旧版本读出的object文本列尽量转换，不支持时（如没有pyarrow）保持原样
+    if series.dtype != object:
+        return series
+    try:
+        return series.astype(_string_dtype())
+    except (ImportError, TypeError, ValueError):
+        return series
+
+
+def compact(df, table):
+    """按表结构压缩内存表示，返回新的DataFrame（未改动的列与df共享数据）
+
+    整数id列压缩为最小整数类型；只读文本列（如parent_model）存为分类比字符串更省内存时存为分类，
+    其余文本列（包括会被写入的model）存为Arrow字符串。取值和列顺序不变。
+    """
+    if df.empty:
+        return df
+    compacted = df.copy(deep=False)
+    for column in ID_COLUMNS.get(table, []):
+        if column in df.columns and pd.api.types.is_integer_dtype(df[column].dtype):
+            compacted[column] = pd.to_numeric(df[column], downcast='integer')
+    writable = WRITABLE_COLUMNS.get(table, [])
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype) or not pd.api.types.is_string_dtype(values.dtype) \
+                or not _text(values):
+            continue
+        values = _arrow_string(values)
+        if column not in writable:
+            categories = values.astype('category')
+            if categories.memory_usage(deep=True) < values.memory_usage(deep=True):
+                values = categories
+        compacted[column] = values
+    return compacted
+
+
+def derive(df):
+    """要修改的副本：写时复制下只共享数据，被写入的列才会复制；旧版pandas回退为深拷贝"""
+    return df.copy(deep=not COPY_ON_WRITE)
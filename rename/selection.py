@@ -0,0 +1,26 @@
+"""配置复制的选择模型"""
+from dataclasses import dataclass, field
+
+
+@dataclass
+class CloneSelection:
+    """源配置model → 目标supplier_id列表，每次渲染构建一次，UI各处和执行共用"""
+
+    supplier_options: list
+    """可选的目标supplier_id（去重，保持在变更集中的顺序）"""
+    selections: dict = field(default_factory=dict)
+
+    @classmethod
+    def from_changes(cls, changes):
+        """用重命名变更集中出现的供应商作为可选项"""
+        return cls(supplier_options=list(dict.fromkeys(changes['supplier_id'].tolist())))
+
+    def select(self, source_model, supplier_ids):
+        """记录某个源配置选中的供应商，忽略不在可选项中的id"""
+        allowed = set(self.supplier_options)
+        self.selections[source_model] = [supplier_id for supplier_id in supplier_ids if supplier_id in allowed]
+        return self.selections[source_model]
+
+    def configured_models(self):
+        """已选择了至少一个供应商的源配置"""
+        return [source_model for source_model, supplier_ids in self.selections.items() if supplier_ids]
@@ -0,0 +1,416 @@
+"""可选的SQLite主存储：三张表保存在数据目录下的一个SQLite文件里，按常用查询列建索引
+
+设置 RENAME_PRIMARY_STORE=sqlite（或命令行 --store sqlite）启用。表第一次被读取时从同名xlsx导入，
+之后读写都在数据库中进行，xlsx只在 python -m rename export 时生成。
+筛选、供应商名称关联、源配置查找和名称搜索都按索引查询，只读出用到的行（见 loader.load_scope），
+读出的行以rowid（_row）为行标签，写入时按主键或rowid定位。
+每张表记录一个版本号（每次写入加一）和行数；transaction() 内的多次写入在同一个事务中提交。
+"""
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from rename.config import settings
+
+INDEXES = {
+    'supplier': ['id'],
+    'model_suppliers': ['id', 'parent_model', 'supplier_id', 'model'],
+    'model_configs': ['model'],
+}
+"""表 → 建索引的列"""
+NOCASE_INDEXES = {
+    'model_configs': ['model'],
+}
+"""表 → 忽略大小写建索引的列（按前缀搜索名称时使用）"""
+ROW_COLUMN = '_row'
+"""行顺序列（rowid），读出的表按它排序，与xlsx中的行顺序一致"""
+MAX_PARAMS = 900
+
+_local = threading.local()
+_upgraded = set()
+"""本进程中已检查过旧版结构的数据库和 (数据库, 表)"""
+
+
+def database_path(directory):
+    return os.path.join(os.path.abspath(os.fspath(directory)), settings.sqlite_file)
+
+
+def _locate(path):
+    """数据文件路径 → (数据库路径, 表名)"""
+    path = os.path.abspath(os.fspath(path))
+    return database_path(os.path.dirname(path)), os.path.splitext(os.path.basename(path))[0]
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _column_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    if pd.api.types.is_string_dtype(dtype) and dtype != object:
+        return 'TEXT'
+    # 混合类型的列不声明类型，数字和文本按原样保存
+    return ''
+
+
+def _stored_dtype(dtype):
+    # 加载层压缩出的分类和小整数类型（见 rename.schema.compact）按原始类型保存
+    if isinstance(dtype, pd.CategoricalDtype):
+        return dtype.categories.dtype
+    if pd.api.types.is_signed_integer_dtype(dtype):
+        return np.dtype('int64')
+    return dtype
+
+
+def _value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value
+
+
+def _rows(df):
+    for values in df.itertuples(index=False, name=None):
+        yield tuple(_value(value) for value in values)
+
+
+def _open(database):
+    connection = sqlite3.connect(database, timeout=30)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('CREATE TABLE IF NOT EXISTS _tables '
+                       '(name TEXT PRIMARY KEY, version INTEGER NOT NULL, dtypes TEXT NOT NULL, row_count INTEGER)')
+    if database not in _upgraded:
+        # 旧版数据库的_tables没有行数列，补上后由 _upgrade 按表填入
+        if 'row_count' not in [row[1] for row in connection.execute('PRAGMA table_info(_tables)')]:
+            try:
+                connection.execute('ALTER TABLE _tables ADD COLUMN row_count INTEGER')
+                connection.commit()
+            except sqlite3.OperationalError:
+                # 其他连接已经补上
+                pass
+        _upgraded.add(database)
+    return connection
+
+
+@contextmanager
+def _connect(database):
+    """当前线程在该数据库上有进行中的事务时复用其连接，否则单独打开一个连接，结束时提交"""
+    active = getattr(_local, 'transactions', {}).get(database)
+    if active is not None:
+        yield active
+        return
+    connection = _open(database)
+    try:
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+@contextmanager
+def transaction(directory):
+    """同一目录下各表的写入在一个事务中提交，出错时全部回滚；可以嵌套"""
+    database = database_path(directory)
+    transactions = _local.__dict__.setdefault('transactions', {})
+    if database in transactions:
+        yield
+        return
+    connection = _open(database)
+    connection.execute('BEGIN IMMEDIATE')
+    transactions[database] = connection
+    try:
+        with connection:
+            yield
+    finally:
+        del transactions[database]
+        connection.close()
+
+
+def _dtypes(connection, table):
+    row = connection.execute('SELECT dtypes FROM _tables WHERE name = ?', (table,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _bump(connection, table, dtypes=None, rows=0):
+    """版本号加一；dtypes不为None时为整表写入，行数即rows，否则行数增加rows"""
+    if dtypes is not None:
+        connection.execute('INSERT INTO _tables VALUES (?, 1, ?, ?) ON CONFLICT(name) DO UPDATE SET '
+                           'version = version + 1, dtypes = excluded.dtypes, row_count = excluded.row_count',
+                           (table, json.dumps(dtypes), rows))
+    else:
+        connection.execute('UPDATE _tables SET version = version + 1, row_count = row_count + ? WHERE name = ?',
+                           (rows, table))
+
+
+def _create_indexes(connection, table, columns):
+    for column in INDEXES.get(table, []):
+        if column in columns:
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {_quote(f"{table}_{column}")} '
+                               f'ON {_quote(table)} ({_quote(column)})')
+    for column in NOCASE_INDEXES.get(table, []):
+        if column in columns:
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {_quote(f"{table}_{column}_nocase")} '
+                               f'ON {_quote(table)} ({_quote(column)} COLLATE NOCASE)')
+
+
+def _upgrade(database, table):
+    """旧版数据库的表补上索引和行数（本进程中每张表只检查一次）"""
+    if (database, table) in _upgraded:
+        return
+    with _connect(database) as connection:
+        dtypes = _dtypes(connection, table)
+        if dtypes is not None:
+            _create_indexes(connection, table, [column for column, _ in dtypes])
+            connection.execute(f'UPDATE _tables SET row_count = (SELECT COUNT(*) FROM {_quote(table)}) '
+                               f'WHERE name = ? AND row_count IS NULL', (table,))
+    _upgraded.add((database, table))
+
+
+def version(path):
+    """表的版本号，数据库或表不存在时为None"""
+    database, table = _locate(path)
+    if not os.path.exists(database):
+        return None
+    with _connect(database) as connection:
+        row = connection.execute('SELECT version FROM _tables WHERE name = ?', (table,)).fetchone()
+    return row[0] if row else None
+
+
+def write_table(df, path):
+    """整表写入（导入或整表替换），建好索引"""
+    database, table = _locate(path)
+    stored = {column: _stored_dtype(dtype) for column, dtype in df.dtypes.items()}
+    dtypes = [[str(column), str(dtype)] for column, dtype in stored.items()]
+    columns = ', '.join(f'{_quote(column)} {_column_type(dtype)}'.rstrip() for column, dtype in stored.items())
+    with _connect(database) as connection:
+        connection.execute(f'DROP TABLE IF EXISTS {_quote(table)}')
+        connection.execute(f'CREATE TABLE {_quote(table)} ({ROW_COLUMN} INTEGER PRIMARY KEY, {columns})')
+        _create_indexes(connection, table, df.columns)
+        _insert(connection, table, df)
+        _bump(connection, table, dtypes, len(df))
+
+
+def _insert(connection, table, df):
+    placeholders = ', '.join('?' * len(df.columns))
+    names = ', '.join(_quote(column) for column in df.columns)
+    connection.executemany(f'INSERT INTO {_quote(table)} ({names}) VALUES ({placeholders})', _rows(df))
+
+
+def _frame(rows, dtypes, labeled=False):
+    """查询出的行 → DataFrame；labeled时第一列为rowid，作为行标签"""
+    columns = [column for column, _ in dtypes]
+    df = pd.DataFrame.from_records(rows, columns=[ROW_COLUMN, *columns] if labeled else columns)
+    if labeled:
+        df = df.set_index(ROW_COLUMN).rename_axis(None)
+    for column, dtype in dtypes:
+        if dtype != 'object':
+            try:
+                df[column] = df[column].astype(dtype)
+            except (TypeError, ValueError):
+                # 整数列出现空值等情况时保留读出的类型
+                pass
+    return df
+
+
+def ensure_table(path):
+    """表不存在时从同名xlsx导入，返回表的版本号；xlsx也不存在时为None"""
+    table_version = version(path)
+    if table_version is not None:
+        _upgrade(*_locate(path))
+        return table_version
+    if not os.path.exists(path):
+        return None
+    df = pd.read_excel(path)
+    database, _ = _locate(path)
+    with transaction(os.path.dirname(database)):
+        # 解析期间可能已被其他线程或进程导入
+        if version(path) is None:
+            write_table(df, path)
+        return version(path)
+
+
+def read_table(path):
+    """按行顺序读出整张表（导出等需要完整表时使用，行标签为行位置），表不存在时先从同名xlsx导入"""
+    database, table = _locate(path)
+    ensure_table(path)
+    with _connect(database) as connection:
+        dtypes = _dtypes(connection, table)
+        names = ', '.join(_quote(column) for column, _ in dtypes)
+        cursor = connection.execute(f'SELECT {names} FROM {_quote(table)} ORDER BY {ROW_COLUMN}')
+        return _frame(cursor.fetchall(), dtypes)
+
+
+def append_rows(path, rows):
+    """按表的列顺序追加行"""
+    if rows.empty:
+        return 0
+    ensure_table(path)
+    database, table = _locate(path)
+    with _connect(database) as connection:
+        columns = [column for column, _ in _dtypes(connection, table)]
+        _insert(connection, table, rows.reindex(columns=columns))
+        _bump(connection, table, rows=len(rows))
+    return len(rows)
+
+
+def update_cells(path, key_column, column, updates):
+    """按主键修改单元格，updates为 [(主键值, 新值), ...]；主键不存在时抛出KeyError"""
+    ensure_table(path)
+    database, table = _locate(path)
+    with _connect(database) as connection:
+        for key, value in updates:
+            cursor = connection.execute(
+                f'UPDATE {_quote(table)} SET {_quote(column)} = ? WHERE {_quote(key_column)} = ?',
+                (_value(value), _value(key)))
+            if cursor.rowcount == 0:
+                raise KeyError(f"{table} 中找不到 {key_column}={key} 的行")
+        _bump(connection, table)
+    return len(updates)
+
+
+def _row_at(connection, table, key_column, rowid, key):
+    """先按rowid（主键查找）核对主键列，不符时按主键列（索引）查找第一行，返回rowid"""
+    if rowid is not None:
+        row = connection.execute(f'SELECT {_quote(key_column)} FROM {_quote(table)} WHERE {ROW_COLUMN} = ?',
+                                 (int(rowid),)).fetchone()
+        if row is not None and row[0] == key:
+            return int(rowid)
+    row = connection.execute(f'SELECT {ROW_COLUMN} FROM {_quote(table)} WHERE {_quote(key_column)} = ? '
+                             f'ORDER BY {ROW_COLUMN} LIMIT 1', (_value(key),)).fetchone()
+    if row is None:
+        raise KeyError(f"{table} 中找不到 {key_column}={key} 的行")
+    return row[0]
+
+
+def edit_rows(path, key_column, replacements=(), deletions=()):
+    """整行替换或删除行，参数同 storage.edit_table，其中的行标签为读出时的rowid"""
+    ensure_table(path)
+    database, table = _locate(path)
+    with _connect(database) as connection:
+        columns = [column for column, _ in _dtypes(connection, table)]
+        replace_at = [(_row_at(connection, table, key_column, rowid, key), values)
+                      for rowid, key, values in replacements]
+        delete_at = [_row_at(connection, table, key_column, rowid, key) for rowid, key in deletions]
+        for rowid, values in replace_at:
+            assignments = [(column, _value(values[column])) for column in columns if column in values]
+            connection.execute(
+                f'UPDATE {_quote(table)} SET {", ".join(f"{_quote(column)} = ?" for column, _ in assignments)} '
+                f'WHERE {ROW_COLUMN} = ?', [value for _, value in assignments] + [rowid])
+        connection.executemany(f'DELETE FROM {_quote(table)} WHERE {ROW_COLUMN} = ?',
+                               [(rowid,) for rowid in delete_at])
+        _bump(connection, table, rows=-len(delete_at))
+    return len(replace_at) + len(delete_at)
+
+
+def row_count(path):
+    """表的行数（随写入维护，不扫描表），表不存在时先从同名xlsx导入"""
+    database, table = _locate(path)
+    ensure_table(path)
+    with _connect(database) as connection:
+        return connection.execute('SELECT row_count FROM _tables WHERE name = ?', (table,)).fetchone()[0]
+
+
+def _chunks(values):
+    values = list(dict.fromkeys(_value(value) for value in values))
+    for start in range(0, len(values), MAX_PARAMS):
+        yield values[start:start + MAX_PARAMS]
+
+
+def select_rows(path, column, values):
+    """column取值在values中的行（按索引查询），按行顺序返回，行标签为rowid"""
+    database, table = _locate(path)
+    ensure_table(path)
+    with _connect(database) as connection:
+        dtypes = _dtypes(connection, table)
+        names = ', '.join(_quote(name) for name, _ in dtypes)
+        rows = []
+        for chunk in _chunks(values):
+            rows += connection.execute(
+                f'SELECT {ROW_COLUMN}, {names} FROM {_quote(table)} '
+                f'WHERE {_quote(column)} IN ({", ".join("?" * len(chunk))})', chunk).fetchall()
+    rows.sort(key=lambda row: row[0])
+    return _frame(rows, dtypes, labeled=True)
+
+
+def head(path, limit):
+    """按行顺序读出前limit行，行标签为rowid"""
+    database, table = _locate(path)
+    ensure_table(path)
+    with _connect(database) as connection:
+        dtypes = _dtypes(connection, table)
+        names = ', '.join(_quote(name) for name, _ in dtypes)
+        cursor = connection.execute(f'SELECT {ROW_COLUMN}, {names} FROM {_quote(table)} '
+                                    f'ORDER BY {ROW_COLUMN} LIMIT ?', (limit,))
+        return _frame(cursor.fetchall(), dtypes, labeled=True)
+
+
+def match_parent_models(path, pattern):
+    """按通配符匹配model_suppliers中的parent_model（GLOB，与fnmatch一样区分大小写），按首次出现的顺序去重返回
+
+    通配符前的固定前缀可以利用parent_model索引缩小扫描范围。
+    """
+    database, table = _locate(path)
+    ensure_table(path)
+    with _connect(database) as connection:
+        rows = connection.execute(f'SELECT parent_model FROM {_quote(table)} WHERE parent_model GLOB ? '
+                                  f'GROUP BY parent_model ORDER BY MIN({ROW_COLUMN})',
+                                  (pattern.replace('[!', '[^'),)).fetchall()
+    return [row[0] for row in rows]
+
+
+def supplier_names(model_suppliers_path, supplier_path, parent_models):
+    """parent_model命中的model_suppliers行引用的供应商（按supplier_id关联supplier表），列为 id/supplier_name
+
+    两张表须在同一个数据库中；按supplier表的行顺序返回，与 SupplierIndex 取第一条的行为一致。
+    """
+    database, model_suppliers = _locate(model_suppliers_path)
+    _, supplier = _locate(supplier_path)
+    ensure_table(model_suppliers_path)
+    ensure_table(supplier_path)
+    rows = []
+    with _connect(database) as connection:
+        for chunk in _chunks(parent_models):
+            rows += connection.execute(
+                f'SELECT s.{ROW_COLUMN}, s.id, s.supplier_name FROM {_quote(supplier)} s '
+                f'WHERE s.id IN (SELECT m.supplier_id FROM {_quote(model_suppliers)} m '
+                f'WHERE m.parent_model IN ({", ".join("?" * len(chunk))}))', chunk).fetchall()
+    rows = sorted(set(rows))
+    return pd.DataFrame([row[1:] for row in rows], columns=['id', 'supplier_name'])
+
+
+def _like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_models(path, query, limit):
+    """按前缀优先、其次子串的顺序返回匹配的model（忽略ASCII字母的大小写），同 ConfigIndex.search
+
+    前缀按忽略大小写的索引查找；子串按名称顺序扫描model索引，凑满limit个即停止。
+    """
+    database, table = _locate(path)
+    ensure_table(path)
+    query = query.strip()
+    with _connect(database) as connection:
+        if not query:
+            rows = connection.execute(f'SELECT DISTINCT model FROM {_quote(table)} WHERE model IS NOT NULL '
+                                      f'ORDER BY model LIMIT ?', (limit,)).fetchall()
+            return [row[0] for row in rows]
+        prefix = _like(query) + '%'
+        hits = [row[0] for row in connection.execute(
+            f"SELECT DISTINCT model FROM {_quote(table)} WHERE model LIKE ? ESCAPE '\\' ORDER BY model LIMIT ?",
+            (prefix, limit))]
+        if len(hits) < limit:
+            hits += [row[0] for row in connection.execute(
+                f"SELECT DISTINCT model FROM {_quote(table)} WHERE model LIKE ? ESCAPE '\\' "
+                f"AND model NOT LIKE ? ESCAPE '\\' ORDER BY model LIMIT ?",
+                ('%' + _like(query) + '%', prefix, limit - len(hits)))]
+    return hits
@@ -0,0 +1,235 @@
+"""写回存储：原子替换、跨进程文件锁和乐观并发检查
+
+两个工作簿作为一个整体加锁；写入先落到同目录的临时文件，再用 os.replace 原子替换，
+崩溃或并发读取时只会看到旧文件或新文件，不会看到写了一半的文件。
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from rename import columnar, sqlstore, timing
+from rename.config import settings
+from rename.loader import fingerprint, read_table, refresh_sidecar, workbook_cache
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_FILE = '.rename.lock'
+LOCK_POLL_INTERVAL = 0.05
+
+
+class StorageError(Exception):
+    """写回存储失败"""
+
+
+class ConflictError(StorageError):
+    """文件在读取之后被其他会话或进程修改过"""
+
+    def __init__(self, paths):
+        self.paths = paths
+        super().__init__(f"文件已被其他会话修改: {', '.join(os.path.basename(p) for p in paths)}")
+
+
+class LockTimeout(StorageError):
+    """等待工作簿锁超时"""
+
+
+class StorageStats:
+    """锁等待时间和冲突次数统计（进程内所有会话共享）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        self.total_wait = 0.0
+        self.last_wait = 0.0
+        self.max_wait = 0.0
+        self.conflicts = 0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.acquisitions += 1
+            self.total_wait += seconds
+            self.last_wait = seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def record_conflict(self):
+        with self._lock:
+            self.conflicts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'acquisitions': self.acquisitions,
+                'total_wait': self.total_wait,
+                'last_wait': self.last_wait,
+                'max_wait': self.max_wait,
+                'conflicts': self.conflicts,
+            }
+
+
+storage_stats = StorageStats()
+
+
+def _try_lock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    else:
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def workbook_lock(directory='.', timeout=30.0):
+    """对目录下的所有工作簿加独占的建议锁（跨进程、跨会话）"""
+    fd = os.open(os.path.join(directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+    started = time.perf_counter()
+    try:
+        while True:
+            try:
+                _try_lock(fd)
+                break
+            except OSError:
+                if time.perf_counter() - started >= timeout:
+                    raise LockTimeout(f"等待工作簿锁超过 {timeout:g} 秒")
+                time.sleep(LOCK_POLL_INTERVAL)
+        storage_stats.record_wait(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            _unlock(fd)
+    finally:
+        os.close(fd)
+
+
+def _temp_path(path):
+    # 保留原扩展名，pandas/openpyxl按扩展名选择写入格式
+    directory, filename = os.path.split(os.path.abspath(path))
+    stem, ext = os.path.splitext(filename)
+    return os.path.join(directory, f".{stem}.{os.getpid()}.{threading.get_ident()}.tmp{ext}")
+
+
+@contextmanager
+def atomic_output(path):
+    """给出同目录下的临时文件路径，写入成功后原子替换path，失败则删除临时文件"""
+    tmp = _temp_path(path)
+    try:
+        yield tmp
+        with open(tmp, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def check_versions(versions):
+    """确认文件仍是读取时的版本，否则抛出ConflictError（需在持有锁时调用）"""
+    changed = [path for path, fp in versions.items() if fingerprint(path) != fp]
+    if changed:
+        storage_stats.record_conflict()
+        raise ConflictError(changed)
+
+
+def _columnar_primary():
+    return settings.columnar_primary and columnar.available()
+
+
+def transaction(directory):
+    """sqlite主存储模式下，其中各表的写入在一个事务中提交；其他模式下各文件分别原子替换"""
+    if settings.sqlite_primary:
+        return sqlstore.transaction(directory)
+    return nullcontext()
+
+
+def _finish(df, path):
+    if not _columnar_primary() and not settings.sqlite_primary:
+        refresh_sidecar(df, path, columnar.source_stamp(path))
+    workbook_cache.invalidate(path)
+
+
+def replace_table(df, path):
+    """整表写回（数据不来自该文件时使用，例如上传的文件）"""
+    with timing.section(f"write {os.path.basename(path)}"):
+        if settings.sqlite_primary:
+            sqlstore.write_table(df, path)
+        elif _columnar_primary():
+            columnar.write_sidecar(df, path)
+        else:
+            with atomic_output(path) as tmp:
+                df.to_excel(tmp, index=False, engine='openpyxl')
+        _finish(df, path)
+
+
+def patch_table(df, path, changes, key_column='id', column='model', value_column='new_model'):
+    """只写回变化的单元格；df为修改后的完整表（行位置与文件一致），用于同步列式副本和缓存"""
+    with timing.section(f"write {os.path.basename(path)}"):
+        if settings.sqlite_primary:
+            sqlstore.update_cells(path, key_column, column,
+                                  list(zip(changes[key_column].tolist(), changes[value_column].tolist())))
+        elif _columnar_primary():
+            columnar.write_sidecar(df, path)
+        else:
+            from rename.writer import patch_cells
+
+            # 变更集的索引即原表中的行位置，第一条数据在xlsx第2行
+            row_hints = df.index.get_indexer(changes.index) + 2
+            updates = list(zip(row_hints.tolist(), changes[key_column].tolist(), changes[value_column].tolist()))
+            with atomic_output(path) as tmp:
+                patch_cells(path, key_column, column, updates, output=tmp)
+        _finish(df, path)
+
+
+def append_table(df, path, new_rows):
+    """只向文件追加新行；df为追加后的完整表，用于同步列式副本和缓存"""
+    with timing.section(f"write {os.path.basename(path)}"):
+        if settings.sqlite_primary:
+            sqlstore.append_rows(path, new_rows)
+        elif _columnar_primary():
+            columnar.write_sidecar(df, path)
+        else:
+            from rename.writer import append_rows
+
+            with atomic_output(path) as tmp:
+                append_rows(path, new_rows, output=tmp)
+        _finish(df, path)
+
+
+def edit_table(df, path, replacements=(), deletions=(), key_column='model'):
+    """整行替换或删除行；df为修改后的完整表，用于同步列式副本和缓存
+
+    replacements为 [(原表行位置, 主键值, {列名: 新值}), ...]，deletions为 [(原表行位置, 主键值), ...]。
+    """
+    with timing.section(f"write {os.path.basename(path)}"):
+        if settings.sqlite_primary:
+            sqlstore.edit_rows(path, key_column, replacements, deletions)
+        elif _columnar_primary():
+            columnar.write_sidecar(df, path)
+        else:
+            from rename.writer import edit_rows
+
+            # 第一条数据在xlsx第2行
+            with atomic_output(path) as tmp:
+                edit_rows(path, key_column,
+                          [(position + 2, key, values) for position, key, values in replacements],
+                          [(position + 2, key) for position, key in deletions],
+                          output=tmp)
+        _finish(df, path)
+
+
+def export_table(path):
+    """列式/sqlite主存储模式下把当前数据导出为xlsx（xlsx仅在导出时生成）"""
+    df = read_table(path)
+    with timing.section(f"write {os.path.basename(path)}"), atomic_output(path) as tmp:
+        df.to_excel(tmp, index=False, engine='openpyxl')
+    return df
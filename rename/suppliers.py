@@ -0,0 +1,30 @@
+"""供应商名称索引"""
+
+
+class SupplierIndex:
+    """supplier_id → supplier_name 的查找索引，每份supplier表构建一次；名称的大小写等规范化由命名规则处理"""
+
+    def __init__(self, supplier_df):
+        names = {}
+        for supplier_id, supplier_name in zip(supplier_df['id'].tolist(), supplier_df['supplier_name'].tolist()):
+            # 与逐行筛选取 iloc[0] 的行为一致：重复的id以第一条为准
+            names.setdefault(supplier_id, str(supplier_name))
+        self._names = names
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, supplier_id):
+        return supplier_id in self._names
+
+    def name(self, supplier_id):
+        """根据supplier_id获取supplier_name，找不到时返回 unknown-<id>"""
+        return self._names.get(supplier_id, f"unknown-{supplier_id}")
+
+    def map(self, supplier_ids):
+        """批量把一列supplier_id映射为supplier_name，返回与输入同索引的Series"""
+        names = supplier_ids.map(self._names).astype(object)
+        missing = names.isna()
+        if missing.any():
+            names[missing] = [f"unknown-{supplier_id}" for supplier_id in supplier_ids[missing]]
+        return names
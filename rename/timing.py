@@ -0,0 +1,83 @@
+"""轻量计时：按一次运行（整页rerun或单个片段）记录各环节耗时，不依赖Streamlit
+
+运行状态保存在线程局部变量中（Streamlit每个会话的脚本在各自线程运行），
+没有正在进行的运行时 section() 不做任何事，因此可以放心地嵌在存储层里。
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+_sink_lock = threading.Lock()
+
+
+class RunTimer:
+    """一次运行的计时结果，嵌套的环节名用 / 连接"""
+
+    def __init__(self, label):
+        self.label = label
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self._stack = []
+        self.sections = {}
+
+    def record(self):
+        return {
+            'label': self.label,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'total': time.perf_counter() - self._start,
+            'sections': dict(self.sections),
+        }
+
+
+def active():
+    """当前线程是否有正在计时的运行"""
+    return getattr(_local, 'run', None) is not None
+
+
+def begin(label):
+    _local.run = RunTimer(label)
+    return _local.run
+
+
+def end():
+    """结束当前运行并返回记录 {'label', 'started', 'total', 'sections'}"""
+    run = getattr(_local, 'run', None)
+    _local.run = None
+    if run is None:
+        return None
+    record = run.record()
+    logger.debug("%s 用时 %.1f ms: %s", record['label'], record['total'] * 1000,
+                 {name: round(seconds * 1000, 1) for name, seconds in record['sections'].items()})
+    return record
+
+
+@contextmanager
+def section(name):
+    """记录一个环节的耗时，同一运行内同名环节累加"""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        yield
+        return
+    run._stack.append(name)
+    key = '/'.join(run._stack)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        run.sections[key] = run.sections.get(key, 0.0) + time.perf_counter() - start
+        run._stack.pop()
+
+
+def write_jsonl(record, path):
+    """把一条记录追加到JSONL文件，写失败只记录日志"""
+    try:
+        with _sink_lock, open(os.path.expanduser(path), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError as e:
+        logger.warning("写入性能日志 %s 失败: %s", path, e)
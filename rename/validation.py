@@ -0,0 +1,178 @@
+"""提交前校验：检查重命名/复制产生的model名称冲突、重复复制和无变化的操作"""
+from dataclasses import dataclass, replace
+
+import pandas as pd
+
+from rename.engine import CloneResult, RenameResult
+from rename.schema import derive
+
+POLICIES = ('skip', 'overwrite', 'fail')
+"""冲突处理策略：跳过冲突项 / 覆盖已有项 / 存在冲突时整体失败"""
+POLICY_LABELS = {
+    'skip': '跳过冲突项',
+    'overwrite': '覆盖已有项',
+    'fail': '中止执行',
+}
+ISSUE_COLUMNS = ['table', 'kind', 'model', 'supplier_id', 'source']
+ISSUE_KINDS = {
+    'exists': '与已有model重名',
+    'duplicate': '本次操作内重复',
+    'noop': '已是目标状态，无需修改',
+}
+
+
+class ValidationError(Exception):
+    """fail策略下存在冲突"""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(f"发现 {report.blocking_count} 处model名称冲突")
+
+
+@dataclass
+class ValidationReport:
+    """校验结果，issues每行一个问题，列为 ISSUE_COLUMNS，index为对应变更集中的行号"""
+
+    rename_issues: pd.DataFrame
+    clone_issues: pd.DataFrame
+
+    @property
+    def issues(self):
+        return pd.concat([self.rename_issues, self.clone_issues], ignore_index=True)
+
+    @property
+    def blocking_count(self):
+        """冲突数（不含无变化的操作）"""
+        return int((self.rename_issues['kind'] != 'noop').sum() + (self.clone_issues['kind'] != 'noop').sum())
+
+    def counts(self):
+        """{(table, kind): 数量}"""
+        return self.issues.groupby(['table', 'kind'], sort=False).size().to_dict()
+
+
+def _issues(table, kinds, frame, model_column, source_column=None):
+    flagged = kinds.notna()
+    return pd.DataFrame({
+        'table': table,
+        'kind': kinds[flagged],
+        'model': frame.loc[flagged, model_column],
+        'supplier_id': frame.loc[flagged, 'supplier_id'],
+        'source': frame.loc[flagged, source_column] if source_column else frame.loc[flagged, 'old_model'],
+    }, columns=ISSUE_COLUMNS)
+
+
+def _rename_kinds(model_suppliers_df, changes):
+    """变更集每行的问题类型：noop / exists（与未修改行重名）/ duplicate（与本次其他修改重名）"""
+    untouched = set(model_suppliers_df['model'].drop(index=changes.index).dropna())
+    kinds = pd.Series(None, index=changes.index, dtype=object)
+    duplicate = changes['new_model'].duplicated(keep='first')
+    kinds[duplicate] = 'duplicate'
+    kinds[changes['new_model'].isin(untouched)] = 'exists'
+    kinds[changes['old_model'] == changes['new_model']] = 'noop'
+    return kinds
+
+
+def _clone_kinds(model_configs_df, clone, config_index):
+    """新增配置每行的问题类型：noop（已存在且内容相同）/ exists（已存在但内容不同）/ duplicate"""
+    changes = clone.changes
+    kinds = pd.Series(None, index=changes.index, dtype=object)
+    if changes.empty:
+        return kinds
+    kinds[changes['new_model'].duplicated(keep='first')] = 'duplicate'
+
+    existing = changes['new_model'].map(lambda model: model in config_index)
+    if existing.any():
+        # 已存在的model比较整行哈希，内容一致即视为重复执行
+        positions = [config_index.first_position(model) for model in changes.loc[existing, 'new_model']]
+        current = pd.util.hash_pandas_object(model_configs_df.iloc[positions], index=False).to_numpy()
+        cloned = pd.util.hash_pandas_object(clone.frame[existing.to_numpy()], index=False).to_numpy()
+        kinds[existing] = ['noop' if same else 'exists' for same in current == cloned]
+    return kinds
+
+
+def validate(plan, config_index):
+    """校验执行计划，返回ValidationReport
+
+    已有model名称用集合/索引做成员判断，整体为O(n)。
+    """
+    rename_kinds = _rename_kinds(plan.rename.frame, plan.rename.changes)
+    clone_kinds = _clone_kinds(plan.model_configs_df, plan.clone, config_index)
+    return ValidationReport(
+        rename_issues=_issues('model_suppliers', rename_kinds, plan.rename.changes, 'new_model'),
+        clone_issues=_issues('model_configs', clone_kinds, plan.clone.changes, 'new_model', 'source_model'),
+    )
+
+
+def resolve(plan, report, policy='skip'):
+    """按策略处理冲突，返回新的执行计划，无变化的操作总是被去掉
+
+    skip: 去掉冲突的修改和新增（被跳过的重命名对应的新增配置一并去掉）；
+    overwrite: 重命名照常执行，同名配置用新配置覆盖（同名的多个新增以最后一个为准）；
+    fail: 存在冲突时抛出ValidationError。
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"未知的冲突处理策略: {policy}")
+    if policy == 'fail' and report.blocking_count:
+        raise ValidationError(report)
+
+    rename_kinds = report.rename_issues['kind']
+    clone_kinds = report.clone_issues['kind']
+    if policy == 'skip':
+        dropped_renames = rename_kinds.index
+        dropped_clones = clone_kinds.index
+    else:
+        dropped_renames = rename_kinds.index[rename_kinds == 'noop']
+        dropped_clones = clone_kinds.index[clone_kinds == 'noop']
+
+    rename_frame = plan.rename.frame
+    rename_changes = plan.rename.changes
+    reverted = rename_changes.loc[dropped_renames]
+    reverted = reverted[reverted['old_model'] != reverted['new_model']]
+    if not reverted.empty:
+        rename_frame = derive(rename_frame)
+        rename_frame.loc[reverted.index, 'model'] = reverted['old_model']
+    rename_changes = rename_changes.drop(index=dropped_renames)
+
+    clone_changes = plan.clone.changes
+    keep = ~clone_changes.index.isin(dropped_clones)
+    if not reverted.empty:
+        target_keys = ['supplier_id', 'new_model']
+        keep &= ~pd.MultiIndex.from_frame(clone_changes[target_keys]).isin(
+            pd.MultiIndex.from_frame(reverted[target_keys]))
+
+    model_configs_df = plan.model_configs_df
+    rewrite_configs = plan.rewrite_configs
+    overwritten_changes = plan.overwritten
+    replaced = plan.replaced
+    if policy == 'overwrite':
+        # 同名新增保留最后一个；与已有配置同名的写回原位置，其余追加
+        keep &= ~clone_changes['new_model'].duplicated(keep='last').to_numpy()
+        existing = clone_changes['new_model'].isin(set(model_configs_df['model'].dropna())).to_numpy()
+        overwritten = keep & existing
+        if overwritten.any():
+            positions = {}
+            for position, model in enumerate(model_configs_df['model'].tolist()):
+                positions.setdefault(model, position)
+            replaced_positions = [positions[model] for model in clone_changes.loc[overwritten, 'new_model']]
+            replaced = model_configs_df.iloc[replaced_positions]
+            model_configs_df = derive(model_configs_df)
+            for row, model in zip(plan.clone.frame[overwritten].itertuples(index=False),
+                                  clone_changes.loc[overwritten, 'new_model']):
+                model_configs_df.iloc[positions[model]] = list(row)
+            overwritten_changes = clone_changes[overwritten].reset_index(drop=True)
+            keep &= ~existing
+            rewrite_configs = True
+
+    clone = CloneResult(
+        frame=plan.clone.frame[keep].reset_index(drop=True),
+        changes=clone_changes[keep].reset_index(drop=True),
+    )
+    return replace(
+        plan,
+        rename=RenameResult(frame=rename_frame, changes=rename_changes),
+        clone=clone,
+        model_configs_df=model_configs_df,
+        rewrite_configs=rewrite_configs,
+        overwritten=overwritten_changes,
+        replaced=replaced,
+    )
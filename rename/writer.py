@@ -0,0 +1,104 @@
+"""xlsx增量写入：只追加新行、只修改变化的单元格，保留原有格式和列顺序"""
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+HEADER_ROW = 1
+
+
+def _cell_value(value):
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value
+
+
+def _header(ws):
+    return [cell.value for cell in ws[HEADER_ROW]]
+
+
+def append_rows(path, rows, output=None):
+    """把rows按工作表表头的列顺序追加到第一个工作表末尾，结果保存到output（默认覆盖path）"""
+    if rows.empty:
+        return 0
+    wb = load_workbook(path)
+    ws = wb.worksheets[0]
+    header = _header(ws)
+    for values in rows.reindex(columns=header).itertuples(index=False, name=None):
+        ws.append([_cell_value(value) for value in values])
+    wb.save(output or path)
+    return len(rows)
+
+
+def _row_locator(ws, path, key_column, key_index):
+    """返回 locate(行号提示, 主键值) → 行号；提示行的主键不符时才扫描主键列建立 主键→行号 索引"""
+    row_by_key = None
+
+    def locate(row_hint, key):
+        nonlocal row_by_key
+        if row_hint is not None and ws.cell(row=row_hint, column=key_index).value == key:
+            return row_hint
+        if row_by_key is None:
+            row_by_key = {}
+            for (cell,) in ws.iter_rows(min_row=HEADER_ROW + 1, min_col=key_index, max_col=key_index):
+                row_by_key.setdefault(cell.value, cell.row)
+        row = row_by_key.get(key)
+        if row is None:
+            raise KeyError(f"{path} 中找不到 {key_column}={key} 的行")
+        return row
+
+    return locate
+
+
+def patch_cells(path, key_column, column, updates, output=None):
+    """按主键修改单元格，结果保存到output（默认覆盖path）
+
+    updates为 [(行号提示, 主键值, 新值), ...]，行号提示一般由DataFrame中的位置换算得到
+    （第一条数据在第2行）；提示行的主键不符时才扫描主键列建立 主键→行号 索引。
+    """
+    if not updates:
+        return 0
+    wb = load_workbook(path)
+    ws = wb.worksheets[0]
+    header = _header(ws)
+    locate = _row_locator(ws, path, key_column, header.index(key_column) + 1)
+    column_index = header.index(column) + 1
+    for row_hint, key, value in updates:
+        ws.cell(row=locate(row_hint, key), column=column_index).value = _cell_value(value)
+    wb.save(output or path)
+    return len(updates)
+
+
+def edit_rows(path, key_column, replacements=(), deletions=(), output=None):
+    """按主键整行替换或删除行，结果保存到output（默认覆盖path）
+
+    replacements为 [(行号提示, 主键值, {列名: 新值}), ...]，deletions为 [(行号提示, 主键值), ...]，
+    行号提示的含义同 patch_cells。先替换，再从下往上删除，连续的行一次删除。
+    """
+    if not replacements and not deletions:
+        return 0
+    wb = load_workbook(path)
+    ws = wb.worksheets[0]
+    header = _header(ws)
+    locate = _row_locator(ws, path, key_column, header.index(key_column) + 1)
+    # 先全部定位再修改，删除会使后面的行号变化
+    replace_at = [(locate(row_hint, key), values) for row_hint, key, values in replacements]
+    delete_at = sorted({locate(row_hint, key) for row_hint, key in deletions}, reverse=True)
+
+    for row, values in replace_at:
+        for column_index, column in enumerate(header, start=1):
+            if column in values:
+                ws.cell(row=row, column=column_index).value = _cell_value(values[column])
+
+    runs = []
+    for row in delete_at:
+        if runs and runs[-1][0] == row + 1:
+            runs[-1][0] = row
+            runs[-1][1] += 1
+        else:
+            runs.append([row, 1])
+    for row, amount in runs:
+        ws.delete_rows(row, amount)
+    wb.save(output or path)
+    return len(replace_at) + len(delete_at)